@@ -0,0 +1,216 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from glob import glob
+import numpy as np
+import pandas as pd
+
+import feature_store
+import pitching_logs
+import rolling_features
+import statcast_starts
+import strikeout_dist
+from find_best_lines import calculate_edges, implied_prob, load_slate
+
+"""
+Walk-forward replay of the predictors over every stored slate.
+For each date the features are rebuilt from only the logs before that date, the
+models are refit on them, and every strategy's picks are graded against what
+actually happened. Dates are independent, so they're spread over a process pool.
+
+Strategies: odds (calculate_edges on every row), stat (its top 5 a day, what
+best_lines gets), rf (predict_strikeouts) and xgb (ml_preds). Thresholds are swept
+after the fact: `tol` for calculate_edges, `band` for the models' NO BET band.
+"""
+
+SLATE_PATTERN = "data/mlb_slates/mlb_pitcher_slate_*.csv"
+STRATEGIES = ("odds", "stat", "rf", "xgb")
+TOP_N = 5
+# Flat price every pick is settled at for ROI; -119 breaks even at 54.3%, about what PrizePicks flex plays need
+DEFAULT_PRICE = -119
+CALIBRATION_BINS = [0, 0.45, 0.5, 0.55, 0.6, 0.65, 0.7, 1]
+
+# Per-process copy of the pitching logs, Savant table and Statcast starts, loaded once by _init_worker
+_logs = None
+_statcast = None
+_rolling = None
+_starts = None
+
+
+def slate_dates(start=None, end=None):
+    dates = []
+    for path in glob(SLATE_PATTERN):
+        m = re.search(r"(\d{4}-\d{2}-\d{2})\.csv$", path)
+        if m and (start is None or m.group(1) >= str(start)) and (end is None or m.group(1) <= str(end)):
+            dates.append(m.group(1))
+    return sorted(dates)
+
+
+def _init_worker(end):
+    global _logs, _statcast, _rolling, _starts
+    _logs = pitching_logs.load_days(feature_store.HISTORY_START, end)
+    _statcast = pd.read_csv(feature_store.STATCAST_PATH)
+    _starts = statcast_starts.load(end=end)
+    # Dates are submitted in order, so a worker's rolling state mostly just moves forward
+    _rolling = rolling_features.RollingState()
+
+
+def actual_strikeouts(day, slate):
+    # Daily log store first, then whatever a graded slate file already carries
+    logs = _logs[(_logs['date'] == day) & ((_logs['GS'] > 0) | (_logs['IP'] > 0))].dropna(subset=['mlbID'])
+    so = pd.Series(pd.to_numeric(logs['SO'], errors='coerce').to_numpy(), index=logs['mlbID'].astype(int))
+    so = so[~so.index.duplicated()]
+    actual = slate['player_id'].map(so)
+    if 'Actual_SO' in slate.columns:
+        actual = actual.fillna(pd.to_numeric(slate['Actual_SO'], errors='coerce'))
+    return actual.to_numpy(dtype=float)
+
+
+def score_day(day, tols, strategies):
+    slate = load_slate(day)
+    for col in ['dk_line', 'dk_odds', 'dk_label', 'line_ud', 'over_odds_ud', 'under_odds_ud']:
+        if col not in slate.columns:
+            slate[col] = np.nan
+    base = pd.DataFrame({
+        'date': day,
+        'player_id': slate['player_id'].to_numpy(),
+        'player': slate['player_pp'].to_numpy(),
+        'line': slate['prizepicks_line'].to_numpy(dtype=float),
+        'actual_so': actual_strikeouts(day, slate),
+    })
+
+    frames = []
+    if 'odds' in strategies or 'stat' in strategies:
+        for tol in tols:
+            edges = calculate_edges(slate, tol=tol)
+            # Price of the pick is the book average when there is one, otherwise the best single price
+            prob = np.where(edges['avg_line'].notna(), implied_prob(edges['avg_line']), edges['edge'] + 0.5)
+            frames.append(base.assign(
+                strategy='odds', param=tol, pick=edges['best_bet'].to_numpy(),
+                score=edges['edge'].to_numpy(), prob=prob,
+            )[edges['edge'].notna().to_numpy()])
+
+    models = [s for s in ('rf', 'xgb') if s in strategies]
+    if models:
+        feats = feature_store.features_as_of(day, _logs, _statcast, _rolling, _starts)
+        rows = base[['player_id']].merge(feats, on='player_id', how='left')
+        for name in models:
+            pred = _predict(name, feats, rows)
+            if pred is not None:
+                frames.append(base.assign(strategy=name, param=np.nan, pred=pred))
+
+    return pd.concat(frames, ignore_index=True) if frames else base.assign(strategy=None, param=np.nan).iloc[0:0]
+
+
+def _predict(name, feats, rows):
+    if name == 'rf':
+        import predict_strikeouts as ps
+        if feats[ps.TARGET].notna().sum() == 0:
+            return None
+        artifact, _ = ps.train_model(feats)
+        return artifact['model'].predict(rows[ps.FEATURE_COLS].fillna(artifact['fill']))
+
+    import ml_preds
+    if feats.dropna(subset=ml_preds.FEATURES + ['SO_per_game']).shape[0] < 10:
+        return None
+    model, _ = ml_preds.train_model(feats)
+    # predict_today only scores pitchers with every feature present
+    known = rows[ml_preds.FEATURES].notna().all(axis=1).to_numpy()
+    pred = np.full(len(rows), np.nan)
+    if known.any():
+        pred[known] = model.predict(rows.loc[known, ml_preds.FEATURES])
+    return pred
+
+
+def poisson_side_prob(mean, line, over):
+    # P(K > line) or P(K < line) with K ~ Poisson(mean)
+    p_over, p_under = strikeout_dist.side_probs(mean, line)
+    return np.where(over, p_over, p_under)
+
+
+def apply_thresholds(raw, bands, strategies, top_n=TOP_N):
+    picks = []
+    odds = raw[raw['strategy'] == 'odds']
+    if 'odds' in strategies:
+        picks.append(odds)
+    if 'stat' in strategies and not odds.empty:
+        top = odds.sort_values('score', ascending=False).groupby(['date', 'param'], sort=False).head(top_n)
+        picks.append(top.assign(strategy='stat'))
+
+    models = raw[raw['strategy'].isin(['rf', 'xgb']) & raw['pred'].notna()] if 'pred' in raw.columns else raw.iloc[0:0]
+    for band in bands:
+        margin = models['pred'] - models['line']
+        m = models[margin.abs() > band].copy()
+        over = (m['pred'] > m['line']).to_numpy()
+        m['param'] = band
+        m['pick'] = np.where(over, 'OVER', 'UNDER')
+        m['score'] = (m['pred'] - m['line']).abs()
+        m['prob'] = poisson_side_prob(m['pred'], m['line'], over)
+        picks.append(m)
+
+    if not picks:
+        return raw.iloc[0:0]
+    picks = pd.concat(picks, ignore_index=True)
+    from post_game_evaluation import grade
+    picks['result'] = grade(picks['actual_so'], picks['line'], picks['pick'])
+    return picks
+
+
+def payout(price):
+    return 100 / -price if price < 0 else price / 100
+
+
+def summarize(picks, price=DEFAULT_PRICE):
+    settled = picks[picks['result'].isin(['HIT', 'MISS', 'PUSH'])].copy()
+    settled['hit'] = (settled['result'] == 'HIT').astype(float)
+    settled['miss'] = (settled['result'] == 'MISS').astype(float)
+    settled['push'] = (settled['result'] == 'PUSH').astype(float)
+    decided = settled[settled['result'] != 'PUSH']
+    settled['sq_err'] = np.nan
+    settled.loc[decided.index, 'sq_err'] = (decided['prob'] - decided['hit']) ** 2
+
+    summary = settled.groupby(['strategy', 'param'], dropna=False).agg(
+        days=('date', 'nunique'), picks=('result', 'size'),
+        hit=('hit', 'sum'), miss=('miss', 'sum'), push=('push', 'sum'),
+        brier=('sq_err', 'mean'), mean_prob=('prob', 'mean'),
+    )
+    summary['hit_rate'] = summary['hit'] / (summary['hit'] + summary['miss'])
+    summary['roi'] = (summary['hit'] * payout(price) - summary['miss']) / summary['picks']
+    return summary.round(4).reset_index()
+
+
+def calibration(picks, bins=CALIBRATION_BINS):
+    # Stated probability against how often the pick actually hit
+    decided = picks[picks['result'].isin(['HIT', 'MISS'])].copy()
+    decided['bin'] = pd.cut(decided['prob'], bins)
+    decided['hit'] = (decided['result'] == 'HIT').astype(float)
+    table = decided.groupby(['strategy', 'param', 'bin'], dropna=False, observed=True).agg(
+        picks=('hit', 'size'), mean_prob=('prob', 'mean'), hit_rate=('hit', 'mean'),
+    )
+    return table.round(4).reset_index()
+
+
+def run(start=None, end=None, tols=(0.5,), bands=(0.5,), strategies=STRATEGIES, workers=None):
+    dates = slate_dates(start, end)
+    if not dates:
+        raise ValueError("No stored slates in that range")
+
+    frames = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(dates[-1],)) as pool:
+        futures = {pool.submit(score_day, d, list(tols), list(strategies)): d for d in dates}
+        for future in as_completed(futures):
+            try:
+                frames.append(future.result())
+            except Exception as e:
+                # One unreadable day shouldn't sink the whole replay
+                print(f"Skipping {futures[future]}: {e}")
+    raw = pd.concat(frames, ignore_index=True).sort_values(['date', 'strategy'], kind='stable')
+    picks = apply_thresholds(raw, bands, strategies)
+    return picks, summarize(picks), calibration(picks)
+
+
+def save(picks, summary, calib, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    picks.to_csv(os.path.join(out_dir, "picks.csv"), index=False)
+    summary.to_csv(os.path.join(out_dir, "summary.csv"), index=False)
+    calib.to_csv(os.path.join(out_dir, "calibration.csv"), index=False)
@@ -0,0 +1,339 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+
+"""
+Times the slate pipeline on synthetic data so we can see which stage gives out first
+as the number of props grows. Payloads are shaped like the real PrizePicks,
+DraftKings and Underdog responses and go through the real scrapers' parsing,
+then through the merge, edge, model and grading code. Each stage is timed (best
+of `repeat`) and then rerun under tracemalloc for its peak allocation.
+Results are written as JSON under data/benchmarks; `compare` diffs two runs.
+"""
+
+RESULTS_DIR = "data/benchmarks"
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+# (PrizePicks, DraftKings, Underdog) names. The first is strikeouts as the books spell it; the rest
+# use the PrizePicks name everywhere, which markets.market_names passes through, so they join across
+# books like strikeouts do. The scrapers' filters are widened to all of them while benchmarking.
+STAT_TYPES = [
+    ("Pitcher Strikeouts", "Strikeouts Thrown O/U", "strikeouts"),
+    ("Hits Allowed", "Hits Allowed", "Hits Allowed"),
+    ("Earned Runs Allowed", "Earned Runs Allowed", "Earned Runs Allowed"),
+    ("Pitching Outs", "Pitching Outs", "Pitching Outs"),
+    ("Walks Allowed", "Walks Allowed", "Walks Allowed"),
+    ("Hits+Runs+RBIs", "Hits+Runs+RBIs", "Hits+Runs+RBIs"),
+    ("Total Bases", "Total Bases", "Total Bases"),
+    ("Fantasy Score", "Fantasy Score", "Fantasy Score"),
+]
+TEAMS = ["NYY", "BOS", "TOR", "TB", "BAL", "CLE", "DET", "KC", "MIN", "CWS", "HOU", "SEA", "TEX", "LAA", "ATH",
+         "ATL", "PHI", "NYM", "MIA", "WSH", "CHC", "MIL", "STL", "CIN", "PIT", "LAD", "SD", "SF", "ARI", "COL"]
+PP_PAGE_SIZE = 250
+
+
+# --- synthetic data ---------------------------------------------------------
+
+def synthetic_players(n, rng):
+    # Real pitcher names first so the index resolves some of them, made-up ones for the rest
+    from player_index import INDEX_PATH
+    known = pd.read_csv(INDEX_PATH)
+    names = list(known.loc[known['alias_type'] == 'name', 'name'].drop_duplicates())
+    names = names[:n] + [f"synth player{i}" for i in range(max(0, n - len(names)))]
+    return pd.DataFrame({
+        'name': names[:n],
+        'team': rng.choice(TEAMS, n),
+        'line': rng.integers(2, 9, n) + rng.choice([0.0, 0.5], n),
+    })
+
+
+def _american(prob):
+    prob = np.clip(prob, 0.05, 0.95)
+    return np.where(prob >= 0.5, -100 * prob / (1 - prob), 100 * (1 - prob) / prob).round().astype(int)
+
+
+def prizepicks_pages(players, stat_types, rng):
+    # Like the real feed, each page only carries the players its projections point at
+    data, included = [], {}
+    shifts = iter(rng.integers(-1, 2, len(players) * len(stat_types)).tolist())
+    for i, p in enumerate(players.itertuples()):
+        included[str(i)] = {"type": "new_player", "id": str(i), "attributes": {"name": p.name, "team": p.team}}
+        for pp_stat, _, _ in stat_types:
+            data.append({
+                "type": "projection", "id": str(len(data) + 1),
+                "attributes": {"stat_type": pp_stat, "odds_type": "standard",
+                               "line_score": float(p.line + next(shifts))},
+                "relationships": {"new_player": {"data": {"type": "new_player", "id": str(i)}}},
+            })
+    pages = [data[i:i + PP_PAGE_SIZE] for i in range(0, max(len(data), 1), PP_PAGE_SIZE)]
+    return [{
+        "data": page,
+        "included": [included[pid] for pid in dict.fromkeys(d["relationships"]["new_player"]["data"]["id"] for d in page)],
+        "meta": {"total_pages": len(pages)},
+    } for page in pages]
+
+
+def draftkings_payload(players, stat_types, rng):
+    markets, selections = [], []
+    n = len(players) * len(stat_types)
+    over_odds = iter(_american(rng.uniform(0.4, 0.65, n)).tolist())
+    under_odds = iter(_american(rng.uniform(0.35, 0.6, n)).tolist())
+    shifts = iter(rng.choice([-0.5, 0.0, 0.5], n).tolist())
+    for i, p in enumerate(players.itertuples()):
+        for _, dk_market, _ in stat_types:
+            market_id = f"{i}-{dk_market}"
+            markets.append({"id": market_id, "name": dk_market})
+            line = float(p.line + next(shifts))
+            for label, odds in (("Over", next(over_odds)), ("Under", next(under_odds))):
+                selections.append({
+                    "marketId": market_id, "label": label, "points": line,
+                    "participants": [{"name": p.name}],
+                    "displayOdds": {"american": f"{odds:+d}".replace("-", "−")},
+                })
+    return {"markets": markets, "selections": selections}
+
+
+def underdog_payload(players, stat_types, rng):
+    lines = []
+    n = len(players) * len(stat_types)
+    over = rng.uniform(0.4, 0.65, n)
+    prices = iter(zip(_american(over).tolist(), _american(1 - over).tolist()))
+    shifts = iter(rng.choice([-0.5, 0.0, 0.5], n).tolist())
+    for p in players.itertuples():
+        for _, _, ud_stat in stat_types:
+            over_odds, under_odds = next(prices)
+            lines.append({
+                "stat_value": str(p.line + next(shifts)),
+                "over_under": {"appearance_stat": {"stat": ud_stat}},
+                "options": [
+                    {"choice": "higher", "selection_header": p.name, "american_price": str(over_odds), "payout_multiplier": "1.0"},
+                    {"choice": "lower", "selection_header": p.name, "american_price": str(under_odds), "payout_multiplier": "1.0"},
+                ],
+            })
+    return {"over_under_lines": lines}
+
+
+def synthetic_features(player_ids, rng):
+    from predict_strikeouts import FEATURE_COLS, TARGET
+    n = len(player_ids)
+    feats = pd.DataFrame({'player_id': player_ids})
+    for col in FEATURE_COLS:
+        feats[col] = rng.normal(1.0, 0.3, n).astype(np.float32)
+    feats[TARGET] = rng.uniform(2, 9, n).astype(np.float32)
+    return feats
+
+
+def synthetic_logs(player_ids, days, rng):
+    from pitching_logs import COLUMN_ORDER, COUNT_COLS, date_range
+    dates = date_range("2025-04-01", date(2025, 4, 1) + timedelta(days=days - 1))
+    n = len(player_ids) * len(dates)
+    logs = pd.DataFrame({'mlbID': np.repeat(player_ids, len(dates)), 'date': np.tile(dates, len(player_ids))})
+    for col in COUNT_COLS:
+        logs[col] = rng.integers(0, 6, n)
+    logs['GS'] = 1
+    logs['IP'] = rng.integers(3, 8, n) + rng.integers(0, 3, n) / 10
+    for col in ['Str', 'StL', 'StS', 'GB/FB', 'LD', 'PU']:
+        logs[col] = rng.uniform(0, 1, n).round(2)
+    logs['Name'], logs['Age'], logs['Lev'], logs['Tm'] = 'synthetic', 28, 'Maj-AL', 'Seattle'
+    return logs.reindex(columns=COLUMN_ORDER + ['date'])
+
+
+# --- measurement ------------------------------------------------------------
+
+@contextmanager
+def serving(payloads, stat_types):
+    # Point every scraper's fetch_json at the in-memory payloads instead of the network,
+    # and let every benchmarked stat type through their filters
+    from scrapes import scrape_draftkings, scrape_prizepicks, scrape_underdog
+
+    def fake_fetch(book, url, params=None, headers=None, timeout=None):
+        if book == "prizepicks":
+            return payloads["prizepicks"][int((params or {}).get("page", 1)) - 1]
+        return payloads[book]
+
+    filters = [(scrape_prizepicks, "DESIRED_STATS", [s[0] for s in stat_types]),
+               (scrape_draftkings, "DESIRED_MARKETS", [s[1] for s in stat_types]),
+               (scrape_underdog, "DESIRED_STATS", [s[2] for s in stat_types])]
+    modules = [scrape_prizepicks, scrape_draftkings, scrape_underdog]
+    saved = [m.fetch_json for m in modules]
+    saved_filters = [getattr(m, name) for m, name, _ in filters]
+    for m in modules:
+        m.fetch_json = fake_fetch
+    for m, name, wanted in filters:
+        setattr(m, name, wanted)
+    try:
+        yield
+    finally:
+        for m, f in zip(modules, saved):
+            m.fetch_json = f
+        for (m, name, _), f in zip(filters, saved_filters):
+            setattr(m, name, f)
+
+
+def measure(func, repeat):
+    gc.collect()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = func()
+        times.append(time.perf_counter() - start)
+    del out
+    gc.collect()
+    tracemalloc.start()
+    out = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, min(times), peak / 2 ** 20
+
+
+def bench_size(n_props, n_stat_types, repeat, seed):
+    import find_best_lines
+    import markets
+    import merged_props
+    import post_game_evaluation
+    import predict_strikeouts
+    import pitching_logs
+    import prediction_log
+    from player_index import INDEX_PATH, PlayerIndex
+    from scrapes.scrape_draftkings import scrape_draftkings_mlb
+    from scrapes.scrape_prizepicks import scrape_prizepicks_mlb
+    from scrapes.scrape_underdog import scrape_underdog_mlb
+
+    rng = np.random.default_rng(seed)
+    stat_types = STAT_TYPES[:n_stat_types]
+    players = synthetic_players(max(2, n_props // n_stat_types), rng)
+    payloads = {
+        "prizepicks": prizepicks_pages(players, stat_types, rng),
+        "draftkings": draftkings_payload(players, stat_types, rng),
+        "underdog": underdog_payload(players, stat_types, rng),
+    }
+
+    results = []
+    def record(stage, func, rows_in):
+        out, seconds, peak = measure(func, repeat)
+        results.append({
+            "props": n_props, "stage": stage, "rows_in": int(rows_in),
+            "rows_out": int(len(out)) if hasattr(out, '__len__') else None,
+            "seconds": round(seconds, 6), "peak_mb": round(peak, 3),
+        })
+        return out
+
+    with serving(payloads, stat_types):
+        pp = record("parse_prizepicks", scrape_prizepicks_mlb, n_props)
+        dk = record("parse_draftkings", scrape_draftkings_mlb, 2 * len(players) * len(stat_types))
+        ud = record("parse_underdog", scrape_underdog_mlb, len(players) * len(stat_types))
+
+    # A fresh index every call so each timing pays for the fuzzy lookups, and nothing is saved
+    entries = pd.read_csv(INDEX_PATH)
+    slate = record("build_slate", lambda: merged_props.build_slate(pp.copy(), dk.copy(), ud.copy(), PlayerIndex(entries)), len(pp))
+
+    index = PlayerIndex(entries)
+    dk_ids = dk.assign(player_id=index.resolve_series(dk['player']))
+    record("pair_dk_markets", lambda: markets.draftkings(dk_ids), len(dk_ids))
+
+    edges = record("calculate_edges", lambda: find_best_lines.calculate_edges(slate), len(slate))
+
+    feats = synthetic_features(slate['player_id'].unique(), rng)
+    artifact, _ = record("train_rf", lambda: predict_strikeouts.train_model(feats), len(feats))
+    preds = record("predict_strikeouts", lambda: predict_strikeouts.predict(artifact, feats, slate), len(slate))
+    # The model predicts once per pitcher, whatever the number of stat types on the slate
+    per_pitcher = preds.drop_duplicates(subset=['player_id'])
+    record("get_top_model", lambda: find_best_lines.get_top_model(slate, per_pitcher), len(slate))
+
+    actuals = pd.DataFrame({'date': '2025-07-01', 'player_id': slate['player_id'].unique()})
+    actuals['Actual_SO'] = rng.integers(0, 12, len(actuals))
+    def grade_slate():
+        graded = post_game_evaluation.attach_actuals(slate.copy(), '2025-07-01', slate['player_id'], actuals)
+        graded['Result'] = post_game_evaluation.grade(graded['Actual_SO'], graded['prizepicks_line'], graded['dk_label'],
+                                                      over='Over', under='Under')
+        return graded
+    record("grade_slate", grade_slate, len(slate))
+
+    picks = pd.DataFrame({
+        'player_id': slate['player_id'], 'player_pp': slate['player_pp'], 'SO_pred': preds['predicted_ks'],
+        'prizepicks_line': slate['prizepicks_line'], 'edge': preds['predicted_ks'] - slate['prizepicks_line'],
+    })
+    picks['recommendation'] = np.where(picks['edge'] > 0, 'OVER', 'UNDER')
+    def log_and_backfill():
+        conn = prediction_log.connect(":memory:")
+        prediction_log.log_predictions(picks, '2025-07-01', conn=conn)
+        prediction_log.backfill_results(actuals, conn=conn)
+        out = prediction_log.load(conn=conn)
+        conn.close()
+        return out
+    record("log_and_backfill", log_and_backfill, len(picks))
+
+    logs = synthetic_logs(slate['player_id'].unique(), 30, rng)
+    record("aggregate_logs", lambda: pitching_logs.aggregate(logs, "2025-04-30"), len(logs))
+    return results
+
+
+def revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(sizes=DEFAULT_SIZES, n_stat_types=len(STAT_TYPES), repeat=3, seed=0, out_dir=RESULTS_DIR):
+    results = []
+    for n in sizes:
+        print(f"{n} props")
+        for r in bench_size(n, n_stat_types, repeat, seed):
+            print(f"  {r['stage']:<22} {r['seconds']:>10.4f}s {r['peak_mb']:>10.2f} MB  ({r['rows_in']} rows)")
+            results.append(r)
+
+    report = {
+        "revision": revision(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "config": {"sizes": list(sizes), "stat_types": n_stat_types, "repeat": repeat, "seed": seed},
+        "results": results,
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"bench_{report['created'].replace(':', '')}_{report['revision']}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {path}")
+    return path
+
+
+def compare(old_path, new_path):
+    frames = []
+    for path in (old_path, new_path):
+        with open(path) as f:
+            frames.append(pd.DataFrame(json.load(f)["results"]).set_index(["props", "stage"])[["seconds", "peak_mb"]])
+    old, new = frames
+    diff = old.join(new, lsuffix="_old", rsuffix="_new", how="inner")
+    diff["time_ratio"] = (diff["seconds_new"] / diff["seconds_old"]).round(2)
+    diff["mem_ratio"] = (diff["peak_mb_new"] / diff["peak_mb_old"]).round(2)
+    print(diff.to_string())
+    return diff
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command")
+    p = sub.add_parser("run")
+    p.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    p.add_argument("--stat-types", type=int, default=len(STAT_TYPES), choices=range(1, len(STAT_TYPES) + 1))
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--seed", type=int, default=0)
+    p = sub.add_parser("compare")
+    p.add_argument("old")
+    p.add_argument("new")
+    args = parser.parse_args()
+    if args.command == "compare":
+        compare(args.old, args.new)
+    else:
+        run(args.sizes, args.stat_types, args.repeat, args.seed) if args.command else run()
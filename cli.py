@@ -0,0 +1,256 @@
+import argparse
+import sys
+
+"""
+One entry point for the daily steps: python -m cli <command>.
+Nothing heavy is imported at module level. Each command loads its own modules,
+so `grade` or `scrape` never pays for sklearn/xgboost/matplotlib.
+"""
+
+
+def scrape(args):
+    from merged_props import SCRAPERS, fetch_all_books
+    from scrapes.fetch import replaying
+
+    books = args.books or list(SCRAPERS)
+    unknown = [b for b in books if b not in SCRAPERS]
+    if unknown:
+        sys.exit(f"Unknown book(s): {', '.join(unknown)}")
+    scrapers = {b: SCRAPERS[b] for b in books}
+    if args.date:
+        with replaying(f"{args.date}T23:59:59"):
+            frames = fetch_all_books(scrapers)
+    else:
+        frames = fetch_all_books(scrapers)
+    for book in books:
+        df = frames.get(book)
+        print(f"{book:<12} {'failed' if df is None else f'{len(df)} props'}")
+
+
+def merge(args):
+    import merged_props
+    merged_props.main(args.date)
+
+
+def stats(args):
+    import get_pitcher_data
+    get_pitcher_data.main()
+
+
+def statcast(args):
+    import statcast_starts
+    statcast_starts.ingest(args.start, args.end, args.chunk_days)
+
+
+def predict(args):
+    import ml_preds
+
+    if args.refresh_stats:
+        ml_preds.save_pitching_stats()
+    model, meta = ml_preds.get_model()
+    print("Test R²:", meta['metrics']['r2'])
+    print("Test MSE:", meta['metrics']['mse'])
+    ml_preds.predict_today(model)
+
+
+def pick(args):
+    import find_best_lines
+    find_best_lines.main()
+
+
+def _predicted_slate(model):
+    # Today's slate with the chosen model's strikeout prediction, and the column it's in
+    from datetime import date
+
+    today = date.today().isoformat()
+    if model == "xgb":
+        import ml_preds
+        xgb, _ = ml_preds.get_model()
+        return ml_preds.predict_slate(xgb, today), 'SO_pred'
+
+    from find_best_lines import load_slate
+    from predict_strikeouts import predict_strikeouts
+    props = load_slate(today)
+    preds = predict_strikeouts(props)[['player_id', 'predicted_ks']].drop_duplicates('player_id')
+    return props.merge(preds, on='player_id', how='left'), 'predicted_ks'
+
+
+def entries(args):
+    import entry_optimizer
+    import strikeout_dist
+
+    props, mean_col = _predicted_slate(args.model)
+    out = entry_optimizer.optimize(props, mean_col, sizes=args.sizes, modes=args.modes, top=args.top,
+                                   alpha=strikeout_dist.load_dispersion(), sims=args.sims, seed=args.seed)
+    print(out.drop(columns='player_ids').to_string(index=False))
+
+
+def prices(args):
+    import strikeout_dist
+
+    props, mean_col = _predicted_slate(args.model)
+    alpha = strikeout_dist.load_dispersion()
+    out = strikeout_dist.price_books(props, mean_col, alpha)
+    out['best_edge'] = out[['edge_over', 'edge_under']].max(axis=1)
+    print(f"Negative binomial dispersion {alpha:.3f}")
+    print(out.sort_values('best_edge', ascending=False).round(3).to_string(index=False))
+
+
+def grade(args):
+    import post_game_evaluation
+    post_game_evaluation.main()
+
+
+def backtest(args):
+    import backtest as bt
+
+    picks, _, calib = bt.run(args.start, args.end, args.tol, args.band, args.strategies, args.workers)
+    summary = bt.summarize(picks, args.price)
+    print(summary.to_string(index=False))
+    if args.out:
+        bt.save(picks, summary, calib, args.out)
+        print(f"Wrote {args.out}")
+
+
+def tune(args):
+    import tuning
+    tuning.tune(args.models, args.start, args.end, args.folds, args.test_days, args.limit, args.workers, write=not args.dry_run)
+
+
+def bench(args):
+    import benchmark
+    if args.compare:
+        benchmark.compare(*args.compare)
+    else:
+        benchmark.run(args.sizes, args.stat_types, args.repeat)
+
+
+def clv(args):
+    import line_history
+
+    picks = line_history.clv(args.start, args.end)
+    picks = picks[picks['clv'].notna()]
+    if picks.empty:
+        print("No picks with a recorded closing line in range")
+        return
+    summary = picks.groupby('source', observed=True)['clv'].agg(picks='size', mean_clv='mean', beat_close=lambda c: (c > 0).mean())
+    print(summary.round(3).to_string())
+
+
+def watch(args):
+    from line_watch import LineWatcher
+    LineWatcher().run(args.interval)
+
+
+def serve(args):
+    import serve as service
+    service.serve(args.host, args.port, args.ttl)
+
+
+def run(args):
+    import run_all
+    run_all.main(force=args.force)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m cli")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("scrape", help="fetch the books into the raw cache")
+    p.add_argument("books", nargs="*", metavar="book", help="prizepicks, draftkings, underdog (default: all)")
+    p.add_argument("--date", help="replay the cached payloads as of this date instead of hitting the books")
+    p.set_defaults(func=scrape)
+
+    p = sub.add_parser("merge", help="build the day's merged slate")
+    p.add_argument("--date", help="rebuild a past slate from the raw cache")
+    p.set_defaults(func=merge)
+
+    p = sub.add_parser("stats", help="refresh the 30-day pitching logs")
+    p.set_defaults(func=stats)
+
+    p = sub.add_parser("statcast", help="pitch-level Statcast into per-start aggregates, a few days at a time")
+    p.add_argument("--start", required=True)
+    p.add_argument("--end", help="last day (default: yesterday)")
+    p.add_argument("--chunk-days", type=int, default=3, help="days of pitches held in memory at once")
+    p.set_defaults(func=statcast)
+
+    p = sub.add_parser("predict", help="XGBoost strikeout picks for today")
+    p.add_argument("--refresh-stats", action="store_true", help="rebuild the 2023-to-date stats file first")
+    p.set_defaults(func=predict)
+
+    p = sub.add_parser("pick", help="write today's best_lines file")
+    p.set_defaults(func=pick)
+
+    p = sub.add_parser("entries", help="best 2-6 pick PrizePicks entries by simulated expected value")
+    p.add_argument("--model", choices=["xgb", "rf"], default="xgb", help="whose strikeout predictions to build legs from")
+    p.add_argument("--sizes", type=int, nargs="+", default=[2, 3, 4, 5, 6])
+    p.add_argument("--modes", nargs="+", choices=["power", "flex"], default=["power", "flex"])
+    p.add_argument("--top", type=int, default=5, help="entries to show per mode and size")
+    p.add_argument("--sims", type=int, default=10000)
+    p.add_argument("--seed", type=int)
+    p.set_defaults(func=entries)
+
+    p = sub.add_parser("prices", help="model P(over)/P(under) at every book's line against the implied odds")
+    p.add_argument("--model", choices=["xgb", "rf"], default="xgb")
+    p.set_defaults(func=prices)
+
+    p = sub.add_parser("grade", help="grade every finished slate and pick")
+    p.set_defaults(func=grade)
+
+    p = sub.add_parser("backtest", help="walk-forward replay of every strategy over the stored slates")
+    p.add_argument("--start")
+    p.add_argument("--end")
+    p.add_argument("--tol", type=float, nargs="+", default=[0.5], help="calculate_edges line tolerances to sweep")
+    p.add_argument("--band", type=float, nargs="+", default=[0.5], help="model NO BET bands to sweep")
+    p.add_argument("--strategies", nargs="+", default=["odds", "stat", "rf", "xgb"])
+    p.add_argument("--workers", type=int, help="processes to spread the dates over (default: all cores)")
+    p.add_argument("--price", type=int, default=-119, help="American odds every pick is settled at for ROI")
+    p.add_argument("--out", help="directory to write picks/summary/calibration CSVs to")
+    p.set_defaults(func=backtest)
+
+    p = sub.add_parser("tune", help="walk-forward hyperparameter search, winners go to model_config.json")
+    p.add_argument("--models", nargs="+", choices=["xgb", "rf"], default=["xgb", "rf"])
+    p.add_argument("--start", help="first day of logs to build rows from (default: the start of the log store)")
+    p.add_argument("--end", help="last day (default: yesterday)")
+    p.add_argument("--folds", type=int, default=6)
+    p.add_argument("--test-days", type=int, default=14, help="days in each out-of-sample block")
+    p.add_argument("--limit", type=int, help="race a random sample of this many configs instead of the whole grid")
+    p.add_argument("--workers", type=int, help="processes (default: all cores)")
+    p.add_argument("--dry-run", action="store_true", help="report the winners without writing model_config.json")
+    p.set_defaults(func=tune)
+
+    p = sub.add_parser("bench", help="time each stage on synthetic slates, results to data/benchmarks")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000], help="props per run")
+    p.add_argument("--stat-types", type=int, default=8, help="stat types per player (1-8)")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="diff two saved result files instead")
+    p.set_defaults(func=bench)
+
+    p = sub.add_parser("clv", help="closing-line value of the best_lines picks from the line history")
+    p.add_argument("--start")
+    p.add_argument("--end")
+    p.set_defaults(func=clv)
+
+    p = sub.add_parser("watch", help="poll the books and rescore the props whose lines move")
+    p.add_argument("--interval", type=int, help="seconds between polls (default: the fetch cache's freshness window)")
+    p.set_defaults(func=watch)
+
+    p = sub.add_parser("serve", help="local HTTP service for the slate, picks and projections")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--ttl", type=int, default=60, help="seconds before the slate file is checked for changes")
+    p.set_defaults(func=serve)
+
+    p = sub.add_parser("run", help="the whole daily pipeline")
+    p.add_argument("--force", action="store_true", help="rerun stages even if their outputs are fresh")
+    p.set_defaults(func=run)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
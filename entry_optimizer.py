@@ -0,0 +1,176 @@
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+
+import strikeout_dist
+
+"""
+Builds 2- to 6-pick PrizePicks entries from the model's strikeout predictions.
+Each prop's predicted strikeouts become a strikeout distribution (strikeout_dist),
+and the side with the better chance is the leg. Outcomes for every candidate are simulated together:
+a Gaussian copula with a slate-wide factor and a per-team factor, so same-day
+conditions move everyone's strikeouts a little and teammates' a bit more. Each
+simulated slate is reduced to one outcome code per leg (hit, miss or push), and an
+entry's payout per simulation is the sum of its legs' codes looked up in the payout table.
+
+The search grows entries one leg at a time and keeps the best `beam` per size by
+expected value, carrying each entry's per-simulation outcome codes forward, so
+adding a leg costs one vector add instead of re-summing the whole entry.
+While C(n, k) fits in the beam this is the exhaustive search.
+"""
+
+# Total return per 1 staked, by legs that count -> hits. A pushed leg drops out and
+# the entry pays as the next size down; one leg left is a refund.
+POWER = {2: {2: 3}, 3: {3: 5}, 4: {4: 10}, 5: {5: 20}, 6: {6: 37.5}}
+FLEX = {3: {3: 2.25, 2: 1.25}, 4: {4: 5, 3: 1.5}, 5: {5: 10, 4: 2, 3: 0.4}, 6: {6: 25, 5: 2, 4: 0.4}}
+PAYOUTS = {'power': POWER, 'flex': FLEX}
+SIZES = (2, 3, 4, 5, 6)
+
+SIMULATIONS = 10000
+# Matched the exhaustive top 10 at every size on a 36-prop slate
+BEAM = 100
+# Candidate entries scored per batch, bounds the chunk x sims working arrays
+CHUNK = 2048
+# Shared correlation of every pitcher's strikeouts on a slate, and extra for two from the same team
+SLATE_RHO = 0.05
+TEAM_RHO = 0.25
+
+
+def payout_matrix(mode):
+    # [legs that count, hits] -> total return, sizes below the table fall back to power
+    table = PAYOUTS[mode]
+    matrix = np.zeros((max(SIZES) + 1, max(SIZES) + 1))
+    matrix[:2] = 1
+    for size in range(2, max(SIZES) + 1):
+        rows = table.get(size) or POWER[size]
+        for hits, mult in rows.items():
+            matrix[size, hits] = mult
+    return matrix
+
+
+def legs(props, mean_col, alpha=0.0):
+    # One leg per player: the side the distribution favours, with its hit and push chances
+    props = props.dropna(subset=[mean_col, 'prizepicks_line'])
+    props = props[props['stat_type'] == 'Pitcher Strikeouts'] if 'stat_type' in props.columns else props
+    props = props.drop_duplicates(subset=['player_id'])
+    mean = props[mean_col].to_numpy(dtype=float)
+    line = props['prizepicks_line'].to_numpy(dtype=float)
+
+    p_over, p_under = strikeout_dist.side_probs(mean, line, alpha)
+    below, at_or_below = p_under, 1 - p_over
+    over = p_over >= p_under
+    return pd.DataFrame({
+        'player_id': props['player_id'].to_numpy(),
+        'player': props['player_pp'].to_numpy(),
+        'team': props['team'].to_numpy() if 'team' in props.columns else None,
+        'line': line,
+        'mean': mean,
+        'pick': np.where(over, 'OVER', 'UNDER'),
+        'p_hit': np.where(over, p_over, p_under),
+        'p_push': at_or_below - below,
+        'below': below,
+        'at_or_below': at_or_below,
+    }).sort_values('p_hit', ascending=False, ignore_index=True)
+
+
+def simulate(candidates, sims=SIMULATIONS, slate_rho=SLATE_RHO, team_rho=TEAM_RHO, seed=None):
+    # Outcome codes, legs x sims. Thresholds are moved into z-space once per leg
+    # so the draws never leave the normal scale.
+    rng = np.random.default_rng(seed)
+    n = len(candidates)
+    team_codes = pd.factorize(candidates['team'].fillna('').astype(str))[0] if n else np.array([], dtype=int)
+    z = (np.sqrt(slate_rho) * rng.standard_normal((sims, 1))
+         + np.sqrt(team_rho) * rng.standard_normal((sims, team_codes.max() + 1 if n else 0))[:, team_codes]
+         + np.sqrt(1 - slate_rho - team_rho) * rng.standard_normal((sims, n)))
+
+    inv = NormalDist().inv_cdf
+    eps = 1e-12
+    lo = np.array([inv(min(max(p, eps), 1 - eps)) for p in candidates['below']])
+    hi = np.array([inv(min(max(p, eps), 1 - eps)) for p in candidates['at_or_below']])
+    over = (candidates['pick'] == 'OVER').to_numpy()
+    hit = np.where(over, z > hi, z <= lo)
+    push = (z > lo) & (z <= hi)
+    # One code per leg and simulation, hit + 7 * push, so an entry's outcome is the sum of
+    # its legs' codes. Leg-major, so pulling an entry's legs reads whole contiguous rows.
+    return np.ascontiguousarray((hit + 7 * push).T, dtype=np.int8)
+
+
+def _lookup(size, matrix):
+    # Payout indexed by an entry's outcome code, hits + 7 * pushes
+    codes = np.arange(7 * 7)
+    pushes, hits = codes // 7, codes % 7
+    # Codes with more legs than the entry has can't occur, they just need a harmless slot
+    return matrix[np.clip(size - pushes, 0, None), np.minimum(hits, size)].astype(np.float32)
+
+
+def search(outcome, sizes, mode, beam=BEAM, chunk=CHUNK):
+    # Grows entries a leg at a time; returns {size: [(legs, ev, codes), ...]} best first
+    matrix = payout_matrix(mode)
+    n = outcome.shape[0]
+    # Size-1 "entries" are every candidate; codes holds one row per entry on the level
+    entries = [(i,) for i in range(n)]
+    codes = outcome
+    found = {}
+    for size in range(2, max(sizes) + 1):
+        seen, parents, cols = set(), [], []
+        for p, entry in enumerate(entries):
+            for j in range(n):
+                key = tuple(sorted(entry + (j,)))
+                if j not in entry and key not in seen:
+                    seen.add(key)
+                    parents.append(p)
+                    cols.append(j)
+        if not parents:
+            break
+        parents, cols = np.array(parents), np.array(cols)
+
+        # Children are scored in chunks so memory stays at chunk x sims
+        table = _lookup(size, matrix)
+        ev = np.empty(len(parents))
+        for lo in range(0, len(parents), chunk):
+            child = codes[parents[lo:lo + chunk]] + outcome[cols[lo:lo + chunk]]
+            ev[lo:lo + chunk] = np.take(table, child).mean(axis=1, dtype=np.float64)
+
+        keep = np.argsort(-ev, kind='stable')[:beam]
+        entries = [entries[i] + (j,) for i, j in zip(parents[keep], cols[keep])]
+        codes = codes[parents[keep]] + outcome[cols[keep]]
+        if size in sizes:
+            found[size] = [(entries[i], float(ev[k]), codes[i]) for i, k in enumerate(keep)]
+    return found
+
+
+def optimize(props, mean_col='SO_pred', sizes=SIZES, modes=('power', 'flex'), top=10, alpha=0.0,
+             sims=SIMULATIONS, beam=BEAM, slate_rho=SLATE_RHO, team_rho=TEAM_RHO, seed=None):
+    # Best `top` entries per (mode, size) by expected profit per unit staked
+    candidates = legs(props, mean_col, alpha)
+    if len(candidates) < min(sizes):
+        raise ValueError(f"Only {len(candidates)} props with a {mean_col}, need at least {min(sizes)}")
+    outcome = simulate(candidates, sims, slate_rho, team_rho, seed)
+    teams = candidates['team'].fillna('').astype(str).to_numpy()
+
+    rows = []
+    for mode in modes:
+        valid = [s for s in sizes if s in PAYOUTS[mode]]
+        if not valid:
+            continue
+        for size, entries in search(outcome, valid, mode, beam).items():
+            kept = 0
+            for entry, ev, codes in entries:
+                # PrizePicks won't take an entry drawn from a single team
+                if len(set(teams[list(entry)])) < 2:
+                    continue
+                returns = _lookup(size, payout_matrix(mode))[codes]
+                hits = codes % 7
+                chosen = candidates.iloc[list(entry)]
+                rows.append({
+                    'mode': mode, 'size': size,
+                    'entry': ' / '.join(f"{r.player} {r.pick} {r.line:g}" for r in chosen.itertuples()),
+                    'ev': round(ev - 1, 4),
+                    'p_profit': round(float((returns > 1).mean()), 4),
+                    'p_all_hit': round(float((hits == size).mean()), 4),
+                    'player_ids': [int(p) for p in chosen['player_id']],
+                })
+                kept += 1
+                if kept == top:
+                    break
+    return pd.DataFrame(rows, columns=['mode', 'size', 'entry', 'ev', 'p_profit', 'p_all_hit', 'player_ids'])
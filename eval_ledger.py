@@ -0,0 +1,96 @@
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+from model_registry import file_digest
+
+"""
+Which graded artifacts (best-lines / slate CSVs) have already been evaluated,
+and what they looked like when we finished with them. A file is only reopened
+when it's new or its contents changed since it was graded. Tries that found no
+actuals are kept too, so a date that never gets any is given up on after
+RETRY_DAYS instead of being reread and refetched on every run.
+"""
+
+LEDGER_PATH = "data/eval_ledger.sqlite"
+RETRY_DAYS = 7
+
+
+def connect(path=LEDGER_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS graded (
+            path TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            slate_date TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            sha256 TEXT NOT NULL,
+            graded_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS graded_by_date ON graded (slate_date, kind)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS attempts (
+            path TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            slate_date TEXT NOT NULL,
+            first_tried TEXT NOT NULL,
+            last_tried TEXT NOT NULL,
+            tries INTEGER NOT NULL
+        )
+    """)
+    return conn
+
+
+def is_graded(conn, path):
+    row = conn.execute("SELECT size, mtime, sha256 FROM graded WHERE path = ?", (path,)).fetchone()
+    if row is None:
+        return False
+    size, mtime, sha = row
+    st = os.stat(path)
+    if st.st_size == size and st.st_mtime == mtime:
+        return True
+
+    # Touched since grading; only a content change counts
+    if st.st_size == size and file_digest(path) == sha:
+        conn.execute("UPDATE graded SET mtime = ? WHERE path = ?", (st.st_mtime, path))
+        conn.commit()
+        return True
+    return False
+
+
+def mark_graded(conn, path, kind, slate_date):
+    st = os.stat(path)
+    conn.execute(
+        "INSERT OR REPLACE INTO graded (path, kind, slate_date, size, mtime, sha256, graded_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (path, kind, slate_date, st.st_size, st.st_mtime, file_digest(path), datetime.now().isoformat(timespec="seconds")),
+    )
+    conn.execute("DELETE FROM attempts WHERE path = ?", (path,))
+    conn.commit()
+
+
+def record_attempt(conn, path, kind, slate_date):
+    # A grading pass that found no actuals for `path` (a file, or any key naming what was graded)
+    now = datetime.now().isoformat(timespec="seconds")
+    conn.execute(
+        "INSERT INTO attempts (path, kind, slate_date, first_tried, last_tried, tries) VALUES (?, ?, ?, ?, ?, 1) "
+        "ON CONFLICT (path) DO UPDATE SET last_tried = excluded.last_tried, tries = tries + 1",
+        (path, kind, slate_date, now, now),
+    )
+    conn.commit()
+
+
+def gave_up(conn, path, days=RETRY_DAYS):
+    # Still without actuals `days` after the first try
+    row = conn.execute("SELECT first_tried FROM attempts WHERE path = ?", (path,)).fetchone()
+    return row is not None and datetime.fromisoformat(row[0]) < datetime.now() - timedelta(days=days)
+
+
+def graded_dates(conn, kind=None):
+    if kind is None:
+        rows = conn.execute("SELECT DISTINCT slate_date FROM graded ORDER BY slate_date")
+    else:
+        rows = conn.execute("SELECT DISTINCT slate_date FROM graded WHERE kind = ? ORDER BY slate_date", (kind,))
+    return [r[0] for r in rows]
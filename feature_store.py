@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import shutil
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+
+from model_registry import file_digest
+import pitching_logs
+import rolling_features
+import statcast_starts
+
+"""
+One per-pitcher feature table shared by ml_preds and predict_strikeouts.
+Each date gets its own partition under data/features/date=YYYY-MM-DD with one
+.npy file per column, so a predictor memory-maps just the columns it needs.
+A partition is only rebuilt when the stats files it was built from change.
+Rolling last-3/5/10-start form comes from rolling_features' saved state, which
+only reads the log days it hasn't seen yet, and pitch-level form (CSW%, whiff%
+by pitch group, velocity trend) from the per-start Statcast aggregates.
+"""
+
+STORE_DIR = "data/features"
+STATS_PATH = "data/pitcher_stats/pitching_stats_2023-2025.csv"
+LOGS_PATH = "data/pitcher_stats/logs_last_30_days.csv"
+STATCAST_PATH = "data/pitcher_stats/pitcher_stats.csv"
+SOURCES = [STATS_PATH, LOGS_PATH, STATCAST_PATH, rolling_features.STATE_PATH]
+# First day of the stored pitching logs, what STATS_PATH aggregates from
+HISTORY_START = "2023-04-01"
+
+
+def _partition(as_of):
+    return os.path.join(STORE_DIR, f"date={as_of}")
+
+
+def sources_digest():
+    h = hashlib.sha256()
+    for path in SOURCES:
+        if os.path.exists(path):
+            h.update(file_digest(path).encode())
+    # Statcast partitions are written once per date, so which dates exist says what's in them
+    h.update(",".join(sorted(statcast_starts.stored_dates())).encode())
+    return h.hexdigest()[:16]
+
+
+def season_features(stats):
+    # Season-to-date line from pitching_stats_2023-2025.csv, most recent row per pitcher
+    stats = stats.dropna(subset=['mlbID']).copy()
+    stats['player_id'] = stats['mlbID'].astype(int)
+    stats = stats.sort_values('#days').drop_duplicates(subset=['player_id'])
+
+    feats = stats[['player_id', 'Age', '#days', 'SO9', 'GB/FB', 'IP', 'ERA', 'WHIP']].copy()
+    feats['SO_per_IP'] = stats['SO'] / stats['IP'].replace(0, np.nan)
+    feats['K_BB_ratio'] = stats['SO'] / stats['BB'].replace(0, np.nan)
+    feats['SO_per_game'] = stats['SO'] / stats['G'].replace(0, np.nan)
+    return feats
+
+
+def last30_features(logs):
+    # Starters over the last 30 days, prefixed l30_
+    logs = logs[logs['GS'] > 0].dropna(subset=['mlbID']).copy()
+    logs['player_id'] = logs['mlbID'].astype(int)
+    agg = logs.groupby('player_id').agg({
+        'SO': 'sum',
+        'G': 'sum',
+        'IP': 'mean',
+        'ERA': 'mean',
+        'WHIP': 'mean',
+        'SO9': 'mean'
+    })
+    agg['SO_avg'] = agg['SO'] / agg['G']
+    return agg[['IP', 'ERA', 'WHIP', 'SO9', 'SO_avg']].add_prefix('l30_').reset_index()
+
+
+def statcast_features(statcast):
+    # Latest season's Savant numbers, plus the average across every season on file
+    statcast = statcast.copy()
+    cols = ['k_percent', 'whiff_percent', 'woba', 'barrel_batted_rate']
+    for col in cols:
+        statcast[col] = pd.to_numeric(statcast[col], errors='coerce')
+
+    latest = statcast.sort_values('year').groupby('player_id')[['whiff_percent', 'barrel_batted_rate', 'k_percent']].last()
+    means = statcast.groupby('player_id')[['k_percent', 'whiff_percent', 'woba']].mean().add_suffix('_mean')
+    return latest.join(means).reset_index()
+
+
+def _combine(frames):
+    feats = frames[0]
+    for frame in frames[1:]:
+        feats = feats.merge(frame, on='player_id', how='outer')
+    return feats.replace([np.inf, -np.inf], np.nan).sort_values('player_id').reset_index(drop=True)
+
+
+def build_features(as_of=None):
+    season = season_features(pd.read_csv(STATS_PATH))
+    statcast = statcast_features(pd.read_csv(STATCAST_PATH))
+    frames = [season, statcast, rolling_features.current(as_of), statcast_starts.form(as_of)]
+    if os.path.exists(LOGS_PATH):
+        frames.append(last30_features(pd.read_csv(LOGS_PATH)))
+
+    return _combine(frames)
+
+
+def features_as_of(day, logs, statcast, rolling=None, starts=None):
+    # build_features as it would have looked the morning of `day`: logs strictly before it,
+    # and only finished Savant seasons since the current year's row includes games after `day`.
+    # Pass the same RollingState for increasing days and each call only applies the days in between,
+    # and a statcast_starts.load() frame to take pitch-level form from without rereading the store.
+    day = pitching_logs._to_date(day)
+    prev = (day - timedelta(days=1)).isoformat()
+    prior = logs[logs['date'] < day.isoformat()]
+    recent = prior[prior['date'] >= (day - timedelta(days=30)).isoformat()]
+
+    return _combine([
+        season_features(pitching_logs.aggregate(prior, prev)),
+        statcast_features(statcast[statcast['year'] < day.year]),
+        last30_features(pitching_logs.aggregate(recent, prev)),
+        (rolling or rolling_features.RollingState()).advance(prior, prev).frame(day),
+        statcast_starts.form(day.isoformat(), history=starts),
+    ])
+
+
+def materialize(as_of=None, force=False):
+    as_of = as_of or date.today().isoformat()
+    path = _partition(as_of)
+    if as_of == date.today().isoformat():
+        # New log days go into the rolling state first, so the digest below sees them
+        rolling_features.update()
+    digest = sources_digest()
+    meta_path = os.path.join(path, "meta.json")
+    if not force and os.path.exists(meta_path):
+        # Past partitions are history, only today's gets refreshed when the stats files change
+        if as_of != date.today().isoformat():
+            return path
+        with open(meta_path) as f:
+            if json.load(f).get("sources") == digest:
+                return path
+
+    feats = build_features(as_of)
+    tmp = f"{path}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, "player_id.npy"), feats['player_id'].to_numpy(dtype=np.int64))
+    columns = [c for c in feats.columns if c != 'player_id']
+    for i, col in enumerate(columns):
+        np.save(os.path.join(tmp, f"{i}.npy"), feats[col].to_numpy(dtype=np.float32))
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({"as_of": as_of, "sources": digest, "columns": columns, "rows": len(feats)}, f, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+    return path
+
+
+def partition_digest(as_of=None):
+    # Sources digest of the partition load(as_of) reads, what a model trained on it should be keyed on
+    with open(os.path.join(materialize(as_of), "meta.json")) as f:
+        return json.load(f)["sources"]
+
+
+def load(as_of=None, columns=None):
+    # One row per player_id for the given date, only the requested columns are read
+    path = materialize(as_of)
+    with open(os.path.join(path, "meta.json")) as f:
+        stored = json.load(f)["columns"]
+    wanted = stored if columns is None else [c for c in columns if c in stored]
+
+    data = {"player_id": np.load(os.path.join(path, "player_id.npy"), mmap_mode='r')}
+    for col in wanted:
+        data[col] = np.load(os.path.join(path, f"{stored.index(col)}.npy"), mmap_mode='r')
+    return pd.DataFrame(data)
+
+
+def stored_dates():
+    if not os.path.isdir(STORE_DIR):
+        return []
+    return sorted(d[len("date="):] for d in os.listdir(STORE_DIR) if d.startswith("date=") and not d.endswith(".tmp"))
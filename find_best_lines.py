@@ -1,100 +1,94 @@
+import numpy as np
 import pandas as pd
 import os
 from datetime import date
-from predict_strikeouts import predict_strikeouts, normalize_name  
+from player_index import resolve_ids
+import history_store
 
-def odds_to_prob(odds):
-    try:
-        o = int(str(odds).replace('−', '-'))
-    except:
-        return None
-    return 100 / (o + 100) if o > 0 else -o / (-o + 100)
+def parse_odds(values):
+    # American odds -> float array, NaN when missing. DK sends a unicode minus.
+    s = pd.Series(values)
+    if not pd.api.types.is_numeric_dtype(s):
+        s = s.astype(str).str.replace('−', '-', regex=False).str.strip()
+    return pd.to_numeric(s, errors='coerce').to_numpy(dtype=float)
+
+
+def implied_prob(odds):
+    odds = np.asarray(odds, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(odds > 0, 100 / (odds + 100), -odds / (-odds + 100))
+
+
+def prob_to_odds(prob):
+    # Implied probability -> American odds, favourites negative; 0.5 is -100
+    prob = np.asarray(prob, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(prob >= 0.5, -100 * prob / (1 - prob), 100 * (1 - prob) / prob)
 
 
 def average_odds(o1, o2):
-    vals = []
-    for o in (o1, o2):
-        try:
-            vals.append(int(str(o).replace('−', '-')))
-        except:
-            pass
-    return int(round(sum(vals) / len(vals))) if vals else None
+    # Mean of whichever of the two odds exist, taken over implied probability (American odds jump
+    # from -100 to +100, so -110 and +110 would otherwise average to 0), rounded half to even; NaN if neither
+    p1 = implied_prob(o1)
+    p2 = implied_prob(o2)
+    count = (~np.isnan(p1)).astype(int) + (~np.isnan(p2)).astype(int)
+    total = np.nan_to_num(p1) + np.nan_to_num(p2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(count > 0, np.round(prob_to_odds(total / count)), np.nan)
+
+
+ODDS_COLUMNS = {'dk_odds': 'dk_odds_am', 'over_odds_ud': 'over_odds_ud_am', 'under_odds_ud': 'under_odds_ud_am'}
+
+def add_parsed_odds(df):
+    # Parse the odds strings once per slate instead of once per row per pass
+    for col, parsed in ODDS_COLUMNS.items():
+        if parsed not in df.columns:
+            df[parsed] = parse_odds(df[col]) if col in df.columns else np.nan
+    return df
 
 
 def load_slate(today):
     path = f"data/mlb_slates/mlb_pitcher_slate_{today}.csv"
     df = pd.read_csv(path)
-    df['player_norm'] = df['player_pp'].apply(normalize_name)
-    return df
+    if 'player_id' not in df.columns:
+        df['player_id'] = resolve_ids(df['player_pp'], df['team'])
+    return add_parsed_odds(df)
 
 
 def calculate_edges(df, tol=0.5):
-    df = df.copy()
+    df = add_parsed_odds(df.copy())
     df['dk_line_diff'] = (df['dk_line'] - df['prizepicks_line']).abs()
     df['ud_line_diff'] = (df['line_ud'] - df['prizepicks_line']).abs()
     df['dk_ok'] = df['dk_line_diff'] <= tol
     df['ud_ok'] = df['ud_line_diff'] <= tol
 
-    def pick_edge(r):
-        edges = {}
-
-        try:
-            dk_odds = int(str(r['dk_odds']).replace('−', '-'))
-        except:
-            dk_odds = None
-
-        try:
-            over_ud_odds = int(str(r['over_odds_ud']).replace('−', '-'))
-        except:
-            over_ud_odds = None
-
-        try:
-            under_ud_odds = int(str(r['under_odds_ud']).replace('−', '-'))
-        except:
-            under_ud_odds = None
-
-        best_bet = None
-        best_odds = None
-        edge = None
-
-        # Evaluate DK signal
-        if dk_odds is not None:
-            direction = r['dk_label'].upper() if pd.notna(r['dk_label']) else None
-            if direction in ("OVER", "UNDER"):
-                best_bet = direction
-                best_odds = dk_odds
-
-        # Evaluate UD signals
-        if over_ud_odds is not None:
-            if best_odds is None or abs(over_ud_odds) > abs(best_odds):
-                best_bet = "OVER"
-                best_odds = over_ud_odds
-
-        if under_ud_odds is not None:
-            if best_odds is None or abs(under_ud_odds) > abs(best_odds):
-                best_bet = "UNDER"
-                best_odds = under_ud_odds
-
-        # Final edge calculation
-        if best_odds is not None:
-            prob = odds_to_prob(best_odds)
-            if prob is not None:
-                edge = prob - 0.5
-
-        edges['best_bet'] = best_bet
-        edges['edge'] = edge
-        return pd.Series(edges)
-
-
-
-    df[['best_bet', 'edge']] = df.apply(pick_edge, axis=1)
-    df['avg_line'] = df.apply(
-        lambda r: average_odds(
-            r['dk_odds'] if r.dk_ok else None,
-            (r['over_odds_ud'] if r.best_bet == 'OVER' else
-             r['under_odds_ud'] if r.best_bet == 'UNDER' else None)
-        ), axis=1
-    )
+    dk_odds = df['dk_odds_am'].to_numpy()
+    over_ud = df['over_odds_ud_am'].to_numpy()
+    under_ud = df['under_odds_ud_am'].to_numpy()
+
+    # No-vig probabilities where the book priced both sides; older slates don't have them
+    fair = {col: df[col].to_numpy(dtype=float) if col in df.columns else np.full(len(df), np.nan)
+            for col in ('dk_fair_over', 'dk_fair_under', 'ud_fair_over', 'ud_fair_under')}
+
+    # DK signal first, then an Underdog side replaces it if its price is further from even
+    dk_dir = df['dk_label'].astype(str).str.upper().to_numpy(dtype=object)
+    dk_valid = ~np.isnan(dk_odds) & np.isin(dk_dir, ['OVER', 'UNDER']) & df['dk_label'].notna().to_numpy()
+    best_bet = np.where(dk_valid, dk_dir, None)
+    best_odds = np.where(dk_valid, dk_odds, np.nan)
+    best_fair = np.where(dk_valid, np.where(dk_dir == 'OVER', fair['dk_fair_over'], fair['dk_fair_under']), np.nan)
+
+    for side, odds, side_fair in (('OVER', over_ud, fair['ud_fair_over']), ('UNDER', under_ud, fair['ud_fair_under'])):
+        take = ~np.isnan(odds) & (np.isnan(best_odds) | (np.abs(odds) > np.abs(best_odds)))
+        best_bet = np.where(take, side, best_bet)
+        best_odds = np.where(take, odds, best_odds)
+        best_fair = np.where(take, side_fair, best_fair)
+
+    df['best_bet'] = best_bet
+    # Fair probability of the chosen side when there is one, so the book's vig isn't counted as edge
+    df['edge'] = np.where(np.isnan(best_fair), implied_prob(best_odds), best_fair) - 0.5
+
+    ud_side = np.where(best_bet == 'OVER', over_ud, np.where(best_bet == 'UNDER', under_ud, np.nan))
+    df['avg_line'] = average_odds(np.where(df['dk_ok'], dk_odds, np.nan), ud_side)
     return df
 
 
@@ -102,9 +96,7 @@ def get_top_stat(df, n=5):
     df2 = calculate_edges(df).dropna(subset=['edge'])
     top = df2.nlargest(n, 'edge').copy()
     top['Edge'] = (top['edge'] * 100).round(1).astype(str) + '%'
-    top['Average Odds'] = top['avg_line'].apply(
-        lambda x: f"{x:+.0f}" if x is not None else None
-    )
+    top['Average Odds'] = top['avg_line'].apply(lambda x: f"{x:+.0f}")
     return top.rename(columns={
         'player_pp': 'Player', 'team': 'Team',
         'prizepicks_line': 'Line (PP)', 'dk_line': 'Line (DK)',
@@ -116,43 +108,41 @@ def get_top_stat(df, n=5):
 
 
 def get_top_model(slate, preds, n=5):
-    df = slate.copy()
-    df['player_norm'] = df['player_pp'].apply(normalize_name)
-    df = df.merge(preds[['player_norm', 'predicted_ks']], on='player_norm', how='left')
+    df = add_parsed_odds(slate.copy())
+    df = df.merge(preds[['player_id', 'predicted_ks']], on='player_id', how='left')
 
     df['predicted_ks'] = df['predicted_ks'].fillna(df['prizepicks_line'])
     df['Predicted Ks'] = df['predicted_ks'].round(2)
 
-    df['Pick'] = df.apply(
-        lambda r: 'OVER' if r.predicted_ks > r.prizepicks_line else 'UNDER',
-        axis=1
-    )
+    over = (df['predicted_ks'] > df['prizepicks_line']).to_numpy()
+    df['Pick'] = np.where(over, 'OVER', 'UNDER')
     df['Edge'] = (df['predicted_ks'] - df['prizepicks_line']).round(2)
 
-    def model_avg_odds(r):
-        dk_ok = abs(r['dk_line'] - r['prizepicks_line']) <= 0.5
-        dk = r['dk_odds'] if dk_ok else None
-        ud = r['over_odds_ud'] if r['Pick'] == 'OVER' else r['under_odds_ud']
-        avg = average_odds(dk, ud)
-        return f"{avg:+d}" if avg is not None else None
-
-    df['Average Odds'] = df.apply(model_avg_odds, axis=1)
+    dk_ok = ((df['dk_line'] - df['prizepicks_line']).abs() <= 0.5).to_numpy()
+    dk = np.where(dk_ok, df['dk_odds_am'], np.nan)
+    ud = np.where(over, df['over_odds_ud_am'], df['under_odds_ud_am'])
+    df['model_avg_odds'] = average_odds(dk, ud)
 
     top = df.nlargest(n, 'Edge').copy()
+    # Only the rows we keep get formatted
+    top['Average Odds'] = [f"{int(x):+d}" if not np.isnan(x) else None for x in top['model_avg_odds']]
     return top.rename(columns={'player_pp': 'Player', 'team': 'Team'})[
         ['Player', 'Team', 'prizepicks_line', 'Predicted Ks', 'Pick', 'Average Odds', 'Edge']
     ].rename(columns={'prizepicks_line': 'Line (PP)'}).assign(Source='Model')
 
 
-def main():
+def main(slate=None):
+    # Pulls in sklearn, so it's only loaded when picks are actually being made
+    from predict_strikeouts import predict_strikeouts
+
     today = date.today().isoformat()
-    slate = load_slate(today)
+    # The pipeline hands over the slate it just built, standalone runs read it from disk
+    slate = load_slate(today) if slate is None else add_parsed_odds(slate.copy())
 
     stat5 = get_top_stat(slate, n=5)
 
-    model_preds = predict_strikeouts(f"data/mlb_slates/mlb_pitcher_slate_{today}.csv")
+    model_preds = predict_strikeouts(slate)
     #print(model_preds)
-    model_preds['player_norm'] = model_preds['player_pp'].apply(normalize_name)
     model5 = get_top_model(slate, model_preds, n=5)
 
     divider = pd.DataFrame([{
@@ -163,7 +153,9 @@ def main():
     out = pd.concat([stat5, divider, model5], ignore_index=True)
     os.makedirs("best_lines", exist_ok=True)
     out.to_csv(f"best_lines/best_lines_{today}.csv", index=False)
+    history_store.write_picks(out, today)
     print("best_lines updated:", f"best_lines/best_lines_{today}.csv")
+    return out
 
 
 if __name__ == '__main__':
@@ -1,18 +1,31 @@
-from pybaseball import pitching_stats_range
-import pandas as pd
 from datetime import datetime, timedelta
 import os
+from pitching_logs import pitching_range
+import rolling_features
 
-end_date = datetime.today()
-start_date = end_date - timedelta(days=30)
-start_str = start_date.strftime('%Y-%m-%d')
-end_str = end_date.strftime('%Y-%m-%d')
+def main():
+    end_date = datetime.today()
+    start_date = end_date - timedelta(days=30)
+    start_str = start_date.strftime('%Y-%m-%d')
+    end_str = end_date.strftime('%Y-%m-%d')
 
-df = pitching_stats_range(start_str, end_str)
-df = df[df['GS'] > 0]  
+    # Only days we haven't stored yet get fetched, the 30-day view is rebuilt from disk
+    df = pitching_range(start_str, end_str)
+    df = df[df['GS'] > 0]
 
-os.makedirs("data/pitcher_stats", exist_ok=True)
+    os.makedirs("data/pitcher_stats", exist_ok=True)
 
-output_path = "data/pitcher_stats/logs_last_30_days.csv"
-df.to_csv(output_path, index=False)
-print(f"Saved logs ({start_str} → {end_str})")
+    output_path = "data/pitcher_stats/logs_last_30_days.csv"
+    # Written aside and swapped in, so nothing reading it mid-run sees half a file
+    tmp = f"{output_path}.tmp"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, output_path)
+    print(f"Saved logs ({start_str} → {end_str})")
+
+    # Just the newly stored days get folded into the rolling last-3/5/10 start features
+    state = rolling_features.update()
+    print(f"Rolling features through {state.through} for {len(state.ids)} pitchers")
+    return df
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import os
+import re
+import shutil
+from glob import glob
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from player_index import resolve_ids
+
+"""
+Typed, date-partitioned Parquet copies of the daily slates and best-lines picks.
+data/history/<table>/date=YYYY-MM-DD/part-0.parquet, odds stored as int16 and
+lines as float32, so season-long reads only touch the partitions and columns asked for.
+"""
+
+HISTORY_DIR = "data/history"
+
+SCHEMAS = {
+    "slates": pa.schema([
+        ("player_id", pa.int64()),
+        ("player", pa.string()),
+        ("team", pa.dictionary(pa.int8(), pa.string())),
+        ("stat_type", pa.dictionary(pa.int8(), pa.string())),
+        ("prizepicks_line", pa.float32()),
+        ("dk_line", pa.float32()),
+        ("dk_odds", pa.int16()),
+        ("dk_label", pa.dictionary(pa.int8(), pa.string())),
+        ("line_ud", pa.float32()),
+        ("over_odds_ud", pa.int16()),
+        ("under_odds_ud", pa.int16()),
+        ("actual_so", pa.float32()),
+        ("result", pa.dictionary(pa.int8(), pa.string())),
+    ]),
+    "picks": pa.schema([
+        ("player_id", pa.int64()),
+        ("player", pa.string()),
+        ("team", pa.dictionary(pa.int8(), pa.string())),
+        ("source", pa.dictionary(pa.int8(), pa.string())),
+        ("line_pp", pa.float32()),
+        ("line_dk", pa.float32()),
+        ("line_ud", pa.float32()),
+        ("pick", pa.dictionary(pa.int8(), pa.string())),
+        ("avg_odds", pa.int16()),
+        ("edge", pa.float32()),
+        ("predicted_ks", pa.float32()),
+        ("actual_so", pa.float32()),
+        ("result", pa.dictionary(pa.int8(), pa.string())),
+    ]),
+}
+
+# CSV column -> dataset column
+SLATE_COLUMNS = {
+    "player_id": "player_id", "player_pp": "player", "team": "team", "stat_type": "stat_type",
+    "prizepicks_line": "prizepicks_line", "dk_line": "dk_line", "dk_odds": "dk_odds", "dk_label": "dk_label",
+    "line_ud": "line_ud", "over_odds_ud": "over_odds_ud", "under_odds_ud": "under_odds_ud",
+    "Actual_SO": "actual_so", "Result": "result",
+}
+PICK_COLUMNS = {
+    "player_id": "player_id", "Player": "player", "Team": "team", "Source": "source",
+    "Line (PP)": "line_pp", "Line (DK)": "line_dk", "Line (UD)": "line_ud", "Pick": "pick", "Best Bet": "pick",
+    "Average Odds": "avg_odds", "Edge": "edge", "Predicted Ks": "predicted_ks",
+    "Actual_SO": "actual_so", "Result": "result",
+}
+ODDS_COLUMNS = {"dk_odds", "over_odds_ud", "under_odds_ud", "avg_odds"}
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+
+
+def _odds(values):
+    s = pd.Series(values)
+    if not pd.api.types.is_numeric_dtype(s):
+        s = s.astype(str).str.replace('−', '-', regex=False).str.strip()
+    return pd.to_numeric(s, errors='coerce').round().astype("Int16")
+
+
+def _edge(values):
+    # Stat picks store "13.8%", model picks a strikeout difference; keep both as plain numbers
+    s = pd.Series(values).astype(str).str.strip()
+    pct = s.str.endswith('%')
+    num = pd.to_numeric(s.str.rstrip('%'), errors='coerce')
+    return num.where(~pct, num / 100)
+
+
+def to_table(df, table):
+    schema = SCHEMAS[table]
+    mapping = SLATE_COLUMNS if table == "slates" else PICK_COLUMNS
+    df = df.rename(columns={k: v for k, v in mapping.items() if k in df.columns})
+    if table == "picks":
+        # Drop the "─── MODEL PICKS ───" divider rows
+        df = df[df["player"].notna() & ~df["player"].astype(str).str.startswith("─")]
+
+    arrays = []
+    for field in schema:
+        col = df[field.name] if field.name in df.columns else pd.Series([None] * len(df), index=df.index)
+        if field.name in ODDS_COLUMNS:
+            col = _odds(col)
+        elif field.name == "edge":
+            col = _edge(col)
+        elif pa.types.is_floating(field.type) or pa.types.is_integer(field.type):
+            col = pd.to_numeric(col, errors='coerce')
+        else:
+            col = col.where(col.notna() & (col.astype(str).str.strip() != ""), None).astype(object)
+        arrays.append(pa.array(col, type=field.type, from_pandas=True))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def write_partition(df, table, date):
+    # One file per (table, date); rewriting a day replaces its partition
+    path = os.path.join(HISTORY_DIR, table, f"date={date}")
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    pq.write_table(to_table(df, table), os.path.join(path, "part-0.parquet"))
+    return path
+
+
+def write_slate(df, date):
+    if 'player_id' not in df.columns:
+        df = df.assign(player_id=resolve_ids(df['player_pp'], df['team']))
+    return write_partition(df, "slates", date)
+
+
+def write_picks(df, date):
+    if 'player_id' not in df.columns:
+        df = df.assign(player_id=resolve_ids(df['Player'], df.get('Team')))
+    return write_partition(df, "picks", date)
+
+
+def dataset(table):
+    return ds.dataset(os.path.join(HISTORY_DIR, table), format="parquet", partitioning=PARTITIONING)
+
+
+def load(table, start=None, end=None, players=None, stat_types=None, columns=None):
+    # Filters are pushed down to the partition/row-group scan
+    path = os.path.join(HISTORY_DIR, table)
+    if not os.path.isdir(path):
+        return pd.DataFrame(columns=["date"] + SCHEMAS[table].names)
+
+    expr = None
+    def _and(e):
+        nonlocal expr
+        expr = e if expr is None else expr & e
+
+    if start is not None:
+        _and(ds.field("date") >= str(start))
+    if end is not None:
+        _and(ds.field("date") <= str(end))
+    if players is not None:
+        ids = [p for p in players if isinstance(p, (int, np.integer))]
+        names = [p for p in players if not isinstance(p, (int, np.integer))]
+        player_expr = None
+        if ids:
+            player_expr = ds.field("player_id").isin(ids)
+        if names:
+            name_expr = ds.field("player").isin(names)
+            player_expr = name_expr if player_expr is None else player_expr | name_expr
+        _and(player_expr)
+    if stat_types is not None and "stat_type" in SCHEMAS[table].names:
+        _and(ds.field("stat_type").isin(list(stat_types)))
+
+    if columns is not None:
+        columns = ["date"] + [c for c in columns if c != "date"]
+    # Keep int16 odds as nullable ints instead of letting pandas widen them to float64
+    types = {pa.int16(): pd.Int16Dtype()}
+    return dataset(table).to_table(columns=columns, filter=expr).to_pandas(types_mapper=types.get)
+
+
+def load_slates(start=None, end=None, players=None, stat_types=None, columns=None):
+    return load("slates", start, end, players, stat_types, columns)
+
+
+def load_picks(start=None, end=None, players=None, columns=None):
+    return load("picks", start, end, players, None, columns)
+
+
+def backfill():
+    # Load every daily CSV already on disk into the dataset
+    for path in sorted(glob("data/mlb_slates/mlb_pitcher_slate_*.csv")):
+        date = re.search(r"(\d{4}-\d{2}-\d{2})", path).group(1)
+        write_slate(pd.read_csv(path), date)
+    for path in sorted(glob("best_lines/best_lines_*.csv")):
+        date = re.search(r"(\d{4}-\d{2}-\d{2})", path).group(1)
+        write_picks(pd.read_csv(path), date)
+
+
+if __name__ == "__main__":
+    backfill()
+    print(f"Backfilled {HISTORY_DIR}")
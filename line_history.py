@@ -0,0 +1,220 @@
+import os
+import sqlite3
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from find_best_lines import parse_odds
+
+"""
+Intraday line and odds history, one run per change.
+Every (slate date, player, book, market) is a series; a new row goes into `runs`
+only when that series' line or odds differ from its last run, so polling every
+minute costs nothing while a line sits still. A run with no line means the prop
+came off the board. `series` keeps the first and last run times, so "as of T"
+is one index seek per series and open/close never scans the runs in between.
+"""
+
+LINES_PATH = "data/line_history.sqlite"
+
+BOOKS = {
+    # book -> (line column, over odds column, under odds column)
+    "prizepicks": ("prizepicks_line", None, None),
+    "draftkings": ("dk_line", "dk_odds", "dk_odds"),
+    "underdog": ("line_ud", "over_odds_ud", "under_odds_ud"),
+}
+VALUES = ["line", "over_odds", "under_odds"]
+
+
+def connect(path=LINES_PATH):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS series (
+            series_id INTEGER PRIMARY KEY,
+            slate_date TEXT NOT NULL,
+            player_id INTEGER NOT NULL,
+            book TEXT NOT NULL,
+            market TEXT NOT NULL,
+            player TEXT,
+            first_ts INTEGER NOT NULL,
+            last_ts INTEGER NOT NULL,
+            seen_ts INTEGER NOT NULL,
+            runs INTEGER NOT NULL,
+            UNIQUE (slate_date, player_id, book, market)
+        );
+        CREATE INDEX IF NOT EXISTS series_by_player ON series (player_id, slate_date);
+        CREATE TABLE IF NOT EXISTS runs (
+            series_id INTEGER NOT NULL REFERENCES series (series_id),
+            ts INTEGER NOT NULL,
+            line REAL,
+            over_odds INTEGER,
+            under_odds INTEGER,
+            PRIMARY KEY (series_id, ts)
+        ) WITHOUT ROWID;
+    """)
+    return conn
+
+
+def to_long(slate):
+    # One row per (player, book, market); slates from before both DK sides were kept only have the
+    # favoured side, so the other odds stay empty
+    frames = []
+    dk_side = slate['dk_label'].astype(str).str.upper() if 'dk_label' in slate.columns else pd.Series('', index=slate.index)
+    for book, (line_col, over_col, under_col) in BOOKS.items():
+        if line_col not in slate.columns:
+            continue
+        over = parse_odds(slate[over_col]) if over_col in slate.columns else np.full(len(slate), np.nan)
+        under = parse_odds(slate[under_col]) if under_col in slate.columns else np.full(len(slate), np.nan)
+        if book == "draftkings" and 'dk_over_odds' in slate.columns:
+            over, under = parse_odds(slate['dk_over_odds']), parse_odds(slate['dk_under_odds'])
+        elif book == "draftkings":
+            over = np.where(dk_side == "OVER", over, np.nan)
+            under = np.where(dk_side == "UNDER", under, np.nan)
+        frame = pd.DataFrame({
+            'player_id': slate['player_id'].astype('int64').to_numpy(),
+            'book': book,
+            'market': slate['stat_type'].astype(str).to_numpy() if 'stat_type' in slate.columns else 'Pitcher Strikeouts',
+            'player': slate['player_pp'].to_numpy() if 'player_pp' in slate.columns else None,
+            'line': pd.to_numeric(slate[line_col], errors='coerce').to_numpy(dtype=float),
+            'over_odds': over,
+            'under_odds': under,
+        })
+        # A book that doesn't list the player at all isn't a series
+        frames.append(frame[frame[VALUES].notna().any(axis=1).to_numpy()])
+    return pd.concat(frames, ignore_index=True).drop_duplicates(subset=['player_id', 'book', 'market'])
+
+
+def _value(v):
+    if pd.isna(v):
+        return None
+    return v.item() if hasattr(v, 'item') else v
+
+
+def _same(a, b):
+    return ((a == b) | (a.isna() & b.isna())).all(axis=1)
+
+
+def record(slate, ts=None, slate_date=None, conn=None, books=None):
+    # Returns how many runs were written. `books` is the books that were actually fetched for this
+    # snapshot (default: all of BOOKS); only their missing series count as pulled, a book that failed
+    # to load says nothing about its lines.
+    ts = int(ts if ts is not None else time.time())
+    slate_date = slate_date or datetime.fromtimestamp(ts).date().isoformat()
+    own = conn is None
+    conn = conn or connect()
+
+    new = to_long(slate)
+    current = pd.read_sql_query("""
+        SELECT s.series_id, s.player_id, s.book, s.market, r.line, r.over_odds, r.under_odds
+        FROM series s JOIN runs r ON r.series_id = s.series_id AND r.ts = s.last_ts
+        WHERE s.slate_date = ?
+    """, conn, params=(slate_date,))
+    current[VALUES] = current[VALUES].astype(float)
+    joined = new.merge(current, on=['player_id', 'book', 'market'], how='outer', suffixes=('', '_last'), indicator=True)
+
+    added = joined[joined['_merge'] == 'left_only']
+    both = joined[joined['_merge'] == 'both']
+    moved = both[~_same(both[VALUES].set_axis(VALUES, axis=1), both[[f'{v}_last' for v in VALUES]].set_axis(VALUES, axis=1))]
+    # Gone from the feed: close the series with an empty run unless it's already closed
+    fetched = joined['book'].isin(list(BOOKS) if books is None else list(books))
+    pulled = joined[(joined['_merge'] == 'right_only') & fetched & joined[[f'{v}_last' for v in VALUES]].notna().any(axis=1)]
+
+    with conn:
+        for row in added.itertuples(index=False):
+            cur = conn.execute(
+                "INSERT INTO series (slate_date, player_id, book, market, player, first_ts, last_ts, seen_ts, runs) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)",
+                (slate_date, int(row.player_id), row.book, row.market, row.player, ts, ts, ts),
+            )
+            conn.execute("INSERT INTO runs VALUES (?, ?, ?, ?, ?)",
+                         (cur.lastrowid, ts, _value(row.line), _value(row.over_odds), _value(row.under_odds)))
+        runs = [(int(r.series_id), ts, _value(r.line), _value(r.over_odds), _value(r.under_odds)) for r in moved.itertuples(index=False)]
+        runs += [(int(r.series_id), ts, None, None, None) for r in pulled.itertuples(index=False)]
+        conn.executemany("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?)", runs)
+        conn.executemany("UPDATE series SET last_ts = ?, runs = runs + 1 WHERE series_id = ? AND last_ts < ?",
+                         [(ts, sid, ts) for sid, *_ in runs])
+        conn.executemany("UPDATE series SET seen_ts = ? WHERE series_id = ?",
+                         [(ts, int(sid)) for sid in both['series_id']])
+    if own:
+        conn.close()
+    return len(added) + len(runs)
+
+
+def _where(slate_date, players, books):
+    where, params = ["s.slate_date = ?"], [str(slate_date)]
+    if players is not None:
+        players = [int(p) for p in players]
+        where.append(f"s.player_id IN ({', '.join('?' * len(players))})")
+        params += players
+    if books is not None:
+        books = list(books)
+        where.append(f"s.book IN ({', '.join('?' * len(books))})")
+        params += books
+    return " AND ".join(where), params
+
+
+def as_of(when, slate_date=None, players=None, books=None, conn=None):
+    # What every series showed at `when` (datetime or epoch seconds); one PK seek per series
+    ts = int(when.timestamp()) if isinstance(when, datetime) else int(when)
+    slate_date = slate_date or datetime.fromtimestamp(ts).date().isoformat()
+    own = conn is None
+    conn = conn or connect()
+    where, params = _where(slate_date, players, books)
+    df = pd.read_sql_query(f"""
+        SELECT s.player_id, s.player, s.book, s.market, r.line, r.over_odds, r.under_odds, r.ts AS changed_at
+        FROM series s
+        JOIN runs r ON r.series_id = s.series_id
+         AND r.ts = (SELECT MAX(ts) FROM runs WHERE series_id = s.series_id AND ts <= ?)
+        WHERE {where}
+        ORDER BY s.player_id, s.book, s.market
+    """, conn, params=[ts] + params)
+    if own:
+        conn.close()
+    return df
+
+
+def open_close(slate_date, players=None, books=None, conn=None):
+    # First and last posted values per series. A pulled prop closes at its last real line.
+    own = conn is None
+    conn = conn or connect()
+    where, params = _where(slate_date, players, books)
+    df = pd.read_sql_query(f"""
+        SELECT s.player_id, s.player, s.book, s.market, s.runs - 1 AS moves,
+               o.line AS open_line, o.over_odds AS open_over, o.under_odds AS open_under, s.first_ts AS open_ts,
+               c.line AS close_line, c.over_odds AS close_over, c.under_odds AS close_under, c.ts AS close_ts
+        FROM series s
+        JOIN runs o ON o.series_id = s.series_id AND o.ts = s.first_ts
+        JOIN runs c ON c.series_id = s.series_id
+         AND c.ts = (SELECT MAX(ts) FROM runs WHERE series_id = s.series_id AND line IS NOT NULL)
+        WHERE {where}
+        ORDER BY s.player_id, s.book, s.market
+    """, conn, params=params)
+    if own:
+        conn.close()
+    return df
+
+
+def clv(start=None, end=None, book="prizepicks", conn=None):
+    # Closing-line value of the best_lines picks: how far the line moved our way after we took it
+    import history_store
+
+    picks = history_store.load_picks(start, end, columns=['player_id', 'player', 'source', 'pick', 'line_pp', 'result'])
+    picks = picks[picks['pick'].isin(['OVER', 'UNDER'])]
+    own = conn is None
+    conn = conn or connect()
+    closes = [open_close(d, players=g['player_id'].unique(), books=[book], conn=conn).assign(date=d)
+              for d, g in picks.groupby('date')]
+    if own:
+        conn.close()
+    if not closes:
+        return picks.assign(close_line=np.nan, clv=np.nan)
+
+    closes = pd.concat(closes, ignore_index=True)
+    closes = closes[closes['market'] == 'Pitcher Strikeouts'][['date', 'player_id', 'open_line', 'close_line', 'moves']]
+    out = picks.merge(closes, on=['date', 'player_id'], how='left')
+    direction = np.where(out['pick'] == 'OVER', 1, -1)
+    out['clv'] = (out['close_line'] - out['line_pp']) * direction
+    return out
@@ -0,0 +1,147 @@
+import time
+import traceback
+from datetime import date, datetime
+import pandas as pd
+
+import line_history
+import predict_strikeouts
+from find_best_lines import calculate_edges
+from merged_props import REQUIRED_BOOKS, build_slate, fetch_all_books
+from player_index import get_index
+from scrapes import fetch, scrape_draftkings, scrape_underdog
+
+"""
+Polls the books and reports line moves as they happen.
+Every poll is turned into a slate keyed by (player_id, stat_type), written to
+line_history and compared with the last one; only the rows whose line, odds or
+side changed (plus new players) get rescored. The player index, the RF model and
+the day's features stay loaded between polls, and each player's predicted
+strikeouts is computed once a day since it doesn't depend on the line.
+"""
+
+KEY = ['player_id', 'stat_type']
+MARKET_COLUMNS = ['prizepicks_line', 'dk_line', 'dk_over_odds', 'dk_under_odds', 'dk_label', 'line_ud', 'over_odds_ud', 'under_odds_ud']
+# Polling faster than this only gets the fetch layer's cached payloads back
+POLL_SECONDS = max(fetch.FRESH_SECONDS, 30)
+
+
+def snapshot(books, index):
+    dk = books["draftkings"] if books["draftkings"] is not None else pd.DataFrame(columns=scrape_draftkings.COLUMNS)
+    ud = books["underdog"] if books["underdog"] is not None else pd.DataFrame(columns=scrape_underdog.COLUMNS)
+    slate = build_slate(books["prizepicks"], dk, ud, index)
+    for col in MARKET_COLUMNS:
+        if col not in slate.columns:
+            slate[col] = None
+    return slate.drop_duplicates(subset=KEY).set_index(KEY).sort_index()
+
+
+def diff(old, new):
+    # Keys whose market columns differ, with two missing values counting as equal
+    common = new.index.intersection(old.index)
+    a = old.loc[common, MARKET_COLUMNS].astype(object)
+    b = new.loc[common, MARKET_COLUMNS].astype(object)
+    moved = (a != b) & ~(a.isna() & b.isna())
+    changed = moved.index[moved.any(axis=1)]
+    return changed, new.index.difference(old.index), old.index.difference(new.index)
+
+
+class LineWatcher:
+    def __init__(self):
+        self.index = get_index()
+        self.day = None
+        self.previous = None
+        self.lines = line_history.connect()
+
+    def warm(self):
+        # Model and features are per day; a new day drops every cached prediction
+        self.day = date.today()
+        self.artifact, self.feats = predict_strikeouts.load_model()
+        self.predicted = pd.Series(dtype=float)
+        self.previous = None
+
+    def predicted_ks(self, player_ids):
+        missing = pd.Index(player_ids).unique().difference(self.predicted.index)
+        if len(missing):
+            rows = pd.DataFrame({'player_id': missing}).merge(self.feats, on='player_id', how='left')
+            X = rows[predict_strikeouts.FEATURE_COLS].fillna(self.artifact['fill'])
+            fresh = pd.Series(self.artifact['model'].predict(X), index=missing)
+            self.predicted = pd.concat([self.predicted, fresh])
+        return self.predicted.reindex(player_ids).to_numpy()
+
+    def rescore(self, rows):
+        scored = calculate_edges(rows.reset_index())
+        scored['predicted_ks'] = self.predicted_ks(scored['player_id'])
+        scored['model_edge'] = scored['predicted_ks'] - scored['prizepicks_line']
+        return scored
+
+    def poll(self, books=None):
+        if self.day != date.today():
+            self.warm()
+        books = books if books is not None else fetch_all_books()
+        missing = [book for book in REQUIRED_BOOKS if books.get(book) is None]
+        if missing:
+            print(f"Skipping poll, no {', '.join(missing)}")
+            return None
+
+        current = snapshot(books, self.index)
+        self.index.save()
+        line_history.record(current.reset_index(), conn=self.lines,
+                            books=[book for book, df in books.items() if df is not None])
+        if self.previous is None:
+            changed, added, removed = current.index[0:0], current.index, current.index[0:0]
+        else:
+            changed, added, removed = diff(self.previous, current)
+
+        scored = self.rescore(current.loc[changed.union(added)])
+        report(scored, self.previous, changed, added, removed)
+        self.previous = current
+        return scored
+
+    def run(self, interval=None):
+        interval = interval or POLL_SECONDS
+        print(f"Watching lines every {interval}s, Ctrl-C to stop")
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    self.poll()
+                except Exception:
+                    # A bad poll (book down, odd payload) shouldn't stop the watcher
+                    traceback.print_exc()
+                time.sleep(max(0, interval - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            print("Stopped")
+
+
+def _fmt(v):
+    return "-" if pd.isna(v) else str(v)
+
+
+def report(scored, previous, changed, added, removed):
+    stamp = datetime.now().strftime("%H:%M:%S")
+    if previous is None:
+        print(f"[{stamp}] watching {len(added)} props")
+        return
+    if not (len(changed) or len(added) or len(removed)):
+        print(f"[{stamp}] no moves")
+        return
+    print(f"[{stamp}] {len(changed)} moved, {len(added)} new, {len(removed)} pulled")
+
+    moved = set(changed)
+    for row in scored.itertuples(index=False):
+        key = (row.player_id, row.stat_type)
+        if key in moved:
+            before = previous.loc[key]
+            parts = [f"{col} {_fmt(before[col])}->{_fmt(getattr(row, col))}" for col in MARKET_COLUMNS
+                     if _fmt(before[col]) != _fmt(getattr(row, col))]
+        else:
+            parts = [f"new at {_fmt(row.prizepicks_line)}"]
+        stat = f"{row.best_bet} {row.edge * 100:+.1f}%" if pd.notna(row.edge) else "no odds"
+        model = f"{row.predicted_ks:.2f} ({row.model_edge:+.2f})" if pd.notna(row.model_edge) else "-"
+        print(f"  {row.player_pp:<22} {', '.join(parts)} | stat {stat} | model {model}")
+    for player_id, stat_type in removed:
+        print(f"  {previous.loc[(player_id, stat_type), 'player_pp']:<22} pulled")
+
+
+if __name__ == "__main__":
+    LineWatcher().run()
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+from find_best_lines import implied_prob, parse_odds
+
+"""
+Turns each book's selections into one row per (player, market, line) with both
+sides' odds and their no-vig fair probabilities, then keeps each player's main
+line per market. That's what the slate joins on, so PrizePicks meets every
+book exactly once per player and market however many alt lines the book hangs.
+"""
+
+KEY = ['player_id', 'stat_type']
+# Book market names -> the PrizePicks stat_type they price
+MARKETS = {
+    'strikeout': 'Pitcher Strikeouts',
+}
+
+
+def market_names(names):
+    # Anything not in MARKETS keeps its own name, so it just won't match a PrizePicks stat
+    names = pd.Series(names, dtype=object).fillna('').astype(str)
+    out = names.copy()
+    lowered = names.str.lower()
+    for fragment, stat_type in MARKETS.items():
+        out = out.mask(lowered.str.contains(fragment, regex=False), stat_type)
+    return out.to_numpy(dtype=object)
+
+
+def devig(over_odds, under_odds):
+    # Multiplicative no-vig: each side's implied probability over the pair's total. NaN unless both sides are priced.
+    over = implied_prob(over_odds)
+    under = implied_prob(under_odds)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total = over + under
+        return over / total, under / total
+
+
+def pair_sides(player_id, stat_type, line, side, odds):
+    # One selection per row (DK style) -> one row per (player, market, line), hash-grouped, both sides as columns
+    side = pd.Series(side, dtype=object).astype(str).str.upper().to_numpy()
+    odds = parse_odds(odds)
+    df = pd.DataFrame({
+        'player_id': player_id, 'stat_type': stat_type,
+        'line': pd.to_numeric(pd.Series(line), errors='coerce').to_numpy(dtype=float),
+        'over_odds': np.where(side == 'OVER', odds, np.nan),
+        'under_odds': np.where(side == 'UNDER', odds, np.nan),
+    })
+    return df.groupby(KEY + ['line'], sort=False, dropna=True).first().reset_index()
+
+
+def main_lines(pairs):
+    # Per player and market, the line the book has closest to even, two-sided prices before one-sided
+    fair_over, fair_under = devig(pairs['over_odds'], pairs['under_odds'])
+    one_side = np.where(np.isnan(pairs['over_odds']), implied_prob(pairs['under_odds']), implied_prob(pairs['over_odds']))
+    balance = np.where(np.isnan(fair_over), 1 + np.abs(one_side - 0.5), np.abs(fair_over - 0.5))
+    pairs = pairs.assign(fair_over=fair_over, fair_under=fair_under, _balance=np.nan_to_num(balance, nan=np.inf))
+    best = pairs.groupby(KEY, sort=False)['_balance'].idxmin()
+    return pairs.loc[best.to_numpy()].drop(columns='_balance').reset_index(drop=True)
+
+
+def draftkings(dk_df):
+    # dk_line / dk_odds / dk_label keep their old meaning (the favoured side), both sides and fair odds come along
+    if dk_df.empty:
+        return pd.DataFrame(columns=KEY + ['dk_line', 'dk_odds', 'dk_label', 'dk_over_odds', 'dk_under_odds',
+                                           'dk_fair_over', 'dk_fair_under']).astype({'player_id': 'int64'})
+    pairs = pair_sides(dk_df['player_id'].to_numpy(), market_names(dk_df['market_name']),
+                       dk_df['dk_line'], dk_df['dk_label'], dk_df['dk_odds'])
+    main = main_lines(pairs)
+    # With one side posted, that side is the favourite by default
+    over_fav = np.where(main['fair_over'].notna(), main['fair_over'] >= main['fair_under'], main['over_odds'].notna())
+    return pd.DataFrame({
+        'player_id': main['player_id'],
+        'stat_type': main['stat_type'],
+        'dk_line': main['line'],
+        'dk_odds': np.where(over_fav, main['over_odds'], main['under_odds']),
+        'dk_label': np.where(over_fav, 'Over', 'Under'),
+        'dk_over_odds': main['over_odds'],
+        'dk_under_odds': main['under_odds'],
+        'dk_fair_over': main['fair_over'],
+        'dk_fair_under': main['fair_under'],
+    })
+
+
+def underdog(ud_df):
+    # Underdog already sends both sides on one row, alt lines still need collapsing
+    if ud_df.empty:
+        return pd.DataFrame(columns=KEY + ['line_ud', 'over_odds_ud', 'under_odds_ud', 'ud_fair_over', 'ud_fair_under']
+                            ).astype({'player_id': 'int64'})
+    pairs = pd.DataFrame({
+        'player_id': ud_df['player_id'].to_numpy(),
+        'stat_type': market_names(ud_df['stat_type']),
+        'line': pd.to_numeric(ud_df['line'], errors='coerce').to_numpy(dtype=float),
+        'over_odds': parse_odds(ud_df['over_odds']),
+        'under_odds': parse_odds(ud_df['under_odds']),
+    }).groupby(KEY + ['line'], sort=False, dropna=True).first().reset_index()
+    main = main_lines(pairs)
+    return main.rename(columns={
+        'line': 'line_ud', 'over_odds': 'over_odds_ud', 'under_odds': 'under_odds_ud',
+        'fair_over': 'ud_fair_over', 'fair_under': 'ud_fair_under',
+    })
@@ -1,99 +1,99 @@
 import pandas as pd
 import datetime
 import os
-import unicodedata
-import re
-
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import history_store
+import line_history
+import markets
+from player_index import get_index
+from scrapes import scrape_draftkings, scrape_underdog
+from scrapes.fetch import replaying
 from scrapes.scrape_prizepicks import scrape_prizepicks_mlb
 from scrapes.scrape_draftkings import scrape_draftkings_mlb
 from scrapes.scrape_underdog import scrape_underdog_mlb
 
-""" 
-There are name mismatches between the sites, so we need a consistent way to generate keys for players.
-Ex.) Jacob Latz vs Jake Latz, Germán Márquez vs German Marquez, Logan Allen vs Logan Allen (CLE), etc. 
-Use chatgpt for regex help bc Im not tryna do that rn.
-"""
-def name_key(name):
-    name = unicodedata.normalize('NFKD', name)
-    name = name.encode('ascii', 'ignore').decode('ascii')
-    name = name.lower().strip()
-    name = re.sub(r'\b(jr|sr|ii|iii|iv|v)\b\.?', '', name)
-    name = re.sub(r'\s*\([^)]*\)', '', name)
-    name = re.sub(r'\s+', ' ', name)
-
-    parts = name.split()
-    if len(parts) < 2:
-        return name
-
-    first_name = parts[0]
-    last_name = parts[-1]
-
-    first_initials = first_name[:2]  
-    key = first_initials + "_" + last_name
-    return key
-
-def odds_to_prob(odds):
-    if pd.isna(odds):
-        return None
-    odds = str(odds).replace('−', '-').strip()
-    try:
-        odds_val = int(odds)
-    except ValueError:
-        return None
-    if odds_val > 0:
-        prob = 100 / (odds_val + 100)
-    else:
-        prob = -odds_val / (-odds_val + 100)
-    return prob
-
-def filter_best_dk_lines(df):
-    df['dk_prob'] = df['dk_odds'].apply(odds_to_prob)
-    df_sorted = df.sort_values(['player_key', 'dk_prob'], ascending=[True, False])
-    df_filtered = df_sorted.drop_duplicates(subset=['player_key'], keep='first')
-    return df_filtered
-
-def save_props(df, output_dir="data/mlb_slates", filename_prefix="mlb_pitcher_slate"):
-    today = datetime.date.today().isoformat()
+def save_props(df, output_dir="data/mlb_slates", filename_prefix="mlb_pitcher_slate", slate_date=None, fetched=None):
+    replayed = slate_date is not None
+    slate_date = slate_date or datetime.date.today().isoformat()
     os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, f"{filename_prefix}_{today}.csv")
+    output_path = os.path.join(output_dir, f"{filename_prefix}_{slate_date}.csv")
     df.to_csv(output_path, index=False)
+    history_store.write_slate(df, slate_date)
+    if not replayed:
+        # Replays are rebuilt after the fact, their lines belong at the time they were fetched, not now
+        line_history.record(df, slate_date=slate_date, books=fetched)
     print(f"Saved MLB slate to {output_path}")
     return output_path
 
-def main():
-    pp_df = scrape_prizepicks_mlb()
-    dk_df = scrape_draftkings_mlb()
-    ud_df = scrape_underdog_mlb()
-
-    pp_df['player_key'] = pp_df['player'].apply(name_key)
-    dk_df['player_key'] = dk_df['player'].apply(name_key)
-    ud_df['player_key'] = ud_df['player'].apply(name_key)
-
-    mlb_slate = pd.merge(pp_df, dk_df, on='player_key', how='left', suffixes=('_pp', '_dk'))
-
-    mlb_slate = filter_best_dk_lines(mlb_slate)
-
-    mlb_slate = mlb_slate.merge(
-        ud_df.add_suffix('_ud'),
-        left_on='player_key',
-        right_on='player_key_ud',
-        how='left'
-    )
-
-    mlb_slate = mlb_slate.drop(columns=[
-        'player_dk', 'player_key', 'player_ud', 'market_name', 'dk_prob', 'player_key_ud','payout_multiplier_over_ud', 'payout_multiplier_under_ud'
-    ], errors='ignore')
+SCRAPERS = {
+    "prizepicks": scrape_prizepicks_mlb,
+    "draftkings": scrape_draftkings_mlb,
+    "underdog": scrape_underdog_mlb,
+}
+
+# The slate is built off PrizePicks, the other books are optional
+REQUIRED_BOOKS = ("prizepicks",)
+
+def fetch_all_books(scrapers=SCRAPERS):
+    # Hit every book at once so the slate takes as long as the slowest book, not the sum
+    results = {}
+    with ThreadPoolExecutor(max_workers=len(scrapers)) as pool:
+        futures = {pool.submit(scraper): book for book, scraper in scrapers.items()}
+        for future in as_completed(futures):
+            book = futures[future]
+            try:
+                results[book] = future.result()
+            except Exception as e:
+                print(f"Failed to fetch {book}: {e}")
+                results[book] = None
+    return results
+
+def build_slate(pp_df, dk_df, ud_df, index):
+    # Every book gets mapped to the same integer player_id, then each book is collapsed to one
+    # line per (player, market) so the joins are 1:1 however many alt lines it posts
+    pp_df['player_id'] = index.resolve_series(pp_df['player'], pp_df['team'])
+    dk_df['player_id'] = index.resolve_series(dk_df['player'])
+    ud_df['player_id'] = index.resolve_series(ud_df['player'])
+
+    mlb_slate = pp_df.rename(columns={'player': 'player_pp'})
+    mlb_slate = mlb_slate.merge(markets.draftkings(dk_df), on=markets.KEY, how='left')
+    mlb_slate = mlb_slate.merge(markets.underdog(ud_df), on=markets.KEY, how='left')
 
     columns_order = [
         'player_pp', 'team', 'stat_type', 'prizepicks_line',
         'dk_line', 'dk_odds', 'dk_label',
         'line_ud', 'over_odds_ud', 'under_odds_ud',
-        'payout_multiplier_over_ud', 'payout_multiplier_under_ud'
+        'payout_multiplier_over_ud', 'payout_multiplier_under_ud', 'player_id',
+        'dk_over_odds', 'dk_under_odds', 'dk_fair_over', 'dk_fair_under', 'ud_fair_over', 'ud_fair_under'
     ]
     columns_order = [col for col in columns_order if col in mlb_slate.columns]
     mlb_slate = mlb_slate[columns_order]
-
-    save_props(mlb_slate)
+    return mlb_slate
+
+def main(slate_date=None, books=None):
+    # With a date, rebuild that day's slate from the recorded raw payloads instead of the live books.
+    # `books` is fetch_all_books() output when the fetch already happened elsewhere (the pipeline).
+    if books is None and slate_date:
+        with replaying(as_of=f"{slate_date}T23:59:59"):
+            books = fetch_all_books()
+    elif books is None:
+        books = fetch_all_books()
+    missing = [book for book in REQUIRED_BOOKS if books.get(book) is None]
+    if missing:
+        print(f"Can't build slate without {', '.join(missing)}")
+        return
+
+    dk_df = books["draftkings"] if books["draftkings"] is not None else pd.DataFrame(columns=scrape_draftkings.COLUMNS)
+    ud_df = books["underdog"] if books["underdog"] is not None else pd.DataFrame(columns=scrape_underdog.COLUMNS)
+
+    index = get_index()
+    mlb_slate = build_slate(books["prizepicks"], dk_df, ud_df, index)
+    index.save()
+
+    save_props(mlb_slate, slate_date=slate_date, fetched=[book for book, df in books.items() if df is not None])
+    return mlb_slate
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -1,142 +1,119 @@
-from pybaseball import statcast, pitching_stats_range, statcast_pitcher, pitching_stats
-import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, r2_score
-import matplotlib.pyplot as plt
-from datetime import datetime, timedelta
+from datetime import datetime
 import pandas as pd
-import re
-import unicodedata
-import os
-from xgboost import XGBRegressor, plot_importance
-
-def fix_escaped_unicode(text):
-    if pd.isna(text):
-        return ""
-    try:
-        return bytes(text, "utf-8").decode("unicode_escape").encode("latin1").decode("utf-8")
-    except Exception:
-        return text
-
-def normalize_name(name: str) -> str:
-    if pd.isna(name):
-        return ""
-    n = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
-    n = n.lower().strip()
-    n = re.sub(r"\b(jr|sr|ii|iii|iv|v)\b\.?", "", n)
-    n = re.sub(r"\s*\([^)]*\)", "", n)
-    return re.sub(r"\s+", " ", n).strip()
+from player_index import fix_escaped_unicode, normalize_name, resolve_ids
+from model_registry import load_or_train, tuned_params
+from pitching_logs import pitching_range
+from feature_store import HISTORY_START, load as load_features, partition_digest
+import prediction_log
+
+STATS_PATH = 'data/pitcher_stats/pitching_stats_2023-2025.csv'
+STATCAST_PATH = 'data/pitcher_stats/pitcher_stats.csv'
+FEATURES = ['Age', '#days', 'SO9', 'K_BB_ratio', 'SO_per_IP', 'whiff_percent', 'barrel_batted_rate', 'GB/FB']
+TARGET = 'SO_per_game'
+# Bump when what train_model fits on changes (rows, target, features' meaning); 2: feature_store rows, 3: time-ordered holdout
+TRAINING_VERSION = 3
+XGB_PARAMS = tuned_params('xgb_strikeouts', {'n_estimators': 100, 'learning_rate': 0.05})
+# Predictions within this many strikeouts of the line are NO BET
+NO_BET_BAND = 0.5
+# Share of rows, most recent last appearance first, held out for the logged test metrics
+TEST_FRACTION = 0.2
 
 def save_pitching_stats():
     end_date = datetime.today()
     end_str = end_date.strftime('%Y-%m-%d')
 
-    df_pitching = pitching_stats_range('2023-04-01', end_str)
+    df_pitching = pitching_range(HISTORY_START, end_str)
     df_pitching['Name'] = df_pitching['Name'].apply(fix_escaped_unicode)
     df_pitching['Name'] = df_pitching['Name'].apply(normalize_name)
 
-    df_pitching.to_csv('data/pitcher_stats/pitching_stats_2023-2025.csv', index=False, encoding='utf-8')
+    df_pitching.to_csv(STATS_PATH, index=False, encoding='utf-8')
 
-def prepare_data():
-    df = pd.read_csv('data/pitcher_stats/pitching_stats_2023-2025.csv')
-    df_merge = pd.read_csv('data/pitcher_stats/pitcher_stats.csv')
-    df_merge[['last_name', 'first_name']] = df_merge["last_name, first_name"].str.split(",", expand=True)
-    df_merge['Name'] = (df_merge['first_name'].str.strip() + ' ' + df_merge['last_name'].str.strip()).apply(normalize_name)
-    df = pd.merge(df, df_merge, on='Name', how='inner')
-    df = df.drop(columns=['first_name', 'last_name', 'last_name, first_name'])
-    
-    df = df.replace([np.inf, -np.inf], np.nan)
-    df = df.dropna(subset=['SO', 'IP', 'SO9', 'ERA', 'WHIP', 'BB'])
-
-    df['SO_per_IP'] = df['SO'] / df['IP']
-    df['K_BB_ratio'] = df['SO'] / df['BB'].replace(0, np.nan)
-
-    features = ['Age', '#days', 'SO9', 'K_BB_ratio', 'SO_per_IP', 'whiff_percent', 'barrel_batted_rate', 'GB/FB']
-    df['SO_per_game'] = df['SO'] / df['G'].replace(0, np.nan)
-    target = 'SO_per_game'
-
-    df = df.dropna(subset=features)
+def prepare_data(df=None):
+    features = FEATURES
+    target = TARGET
 
-    X = df[features]
-    y = df[target]
+    if df is None:
+        df = load_features(columns=features + [target])
+    df = df.dropna(subset=features + [target])
 
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    # Split on time, not at random: the test set is the pitchers whose last appearance is most recent
+    # (#days since it is smallest), all of a day's pitchers on the same side, so the R² in the
+    # registry never comes from a model that saw starts later than the ones it's scored on
+    ordered = df.sort_values('#days', ascending=False, kind='stable')
+    boundary = ordered['#days'].iloc[int(len(ordered) * (1 - TEST_FRACTION))] if len(ordered) else 0
+    train, test = ordered[ordered['#days'] > boundary], ordered[ordered['#days'] <= boundary]
 
-    return X_train, X_test, y_train, y_test, features
+    return train[features], test[features], train[target], test[target], features
 
-def predict_today(model):
-    curr_date = datetime.today().strftime('%Y-%m-%d')
+def predict_slate(model, curr_date):
+    # Today's slate with SO_pred for every pitcher that has all the features, NaN for the rest
     df_props = pd.read_csv(f'data/mlb_slates/mlb_pitcher_slate_{curr_date}.csv')
-    df_props['Name'] = df_props['player_pp'].apply(fix_escaped_unicode)
-    df_props['Name'] = df_props['player_pp'].apply(normalize_name)
-
-    df_stats = pd.read_csv('data/pitcher_stats/pitching_stats_2023-2025.csv')
-    df_merge = pd.read_csv('data/pitcher_stats/pitcher_stats.csv')
+    if 'player_id' not in df_props.columns:
+        df_props['player_id'] = resolve_ids(df_props['player_pp'], df_props['team'])
 
-    df_merge[['last_name', 'first_name']] = df_merge["last_name, first_name"].str.split(",", expand=True)
-    df_merge['Name'] = (df_merge['first_name'].str.strip() + ' ' + df_merge['last_name'].str.strip()).apply(normalize_name)
-    df_stats = pd.merge(df_stats, df_merge, on='Name', how='inner')
-
-    df_stats_sorted = df_stats.sort_values(by=['Name', '#days'])
-    df_latest = df_stats_sorted.groupby('Name').first().reset_index()
-
-    df_today = df_latest[df_latest['Name'].isin(df_props['Name'])].copy()
-
-    df_today['SO_per_IP'] = df_today['SO'] / df_today['IP'].replace(0, np.nan)
-    df_today['K_BB_ratio'] = df_today['SO'] / df_today['BB'].replace(0, np.nan)
-    df_today = df_today.replace([np.inf, -np.inf], np.nan).dropna(subset=['Age', '#days', 'SO9', 'K_BB_ratio', 'SO_per_IP', 'whiff_percent', 'barrel_batted_rate', 'GB/FB'])
+    df_stats = load_features(curr_date, columns=FEATURES)
+    df_today = df_stats[df_stats['player_id'].isin(df_props['player_id'])].dropna(subset=FEATURES).copy()
 
     #features = ['Age', 'IP', 'SO9', 'ERA', 'WHIP', 'K_BB_ratio', 'SO_per_IP', 'GS', 'Pit', 'AB', 'BF']
-    features = ['Age', '#days', 'SO9', 'K_BB_ratio', 'SO_per_IP', 'whiff_percent', 'barrel_batted_rate', 'GB/FB']
+    features = FEATURES
 
     df_today['SO_pred'] = model.predict(df_today[features])
 
-    df_final = pd.merge(df_props, df_today[['Name', 'SO_pred']], on='Name', how='left')
+    return pd.merge(df_props, df_today[['player_id', 'SO_pred']], on='player_id', how='left')
+
+def predict_today(model):
+    curr_date = datetime.today().strftime('%Y-%m-%d')
+    df_final = predict_slate(model, curr_date)
 
     df_final['date'] = curr_date
     df_final['edge'] = df_final['SO_pred'] - df_final['prizepicks_line']
-    df_final['recommendation'] = df_final['edge'].apply(lambda x: 'OVER' if x > 0.5 else ('UNDER' if x < -0.5 else 'NO BET'))
+    df_final['recommendation'] = df_final['edge'].apply(lambda x: 'OVER' if x > NO_BET_BAND else ('UNDER' if x < -NO_BET_BAND else 'NO BET'))
     df_final['abs_edge'] = df_final['edge'].abs()
     df_final = df_final.sort_values(by='abs_edge', ascending=False)
 
     print(df_final[['player_pp', 'SO_pred', 'prizepicks_line', 'edge', 'recommendation']])
     
-    cols = ['date','player_pp', 'SO_pred', 'prizepicks_line', 'edge', 'recommendation']
+    cols = ['date', 'player_id', 'player_pp', 'SO_pred', 'prizepicks_line', 'edge', 'recommendation']
     df_final = df_final[cols].copy()
     save_predictions(df_final, curr_date)
     
 def save_predictions(df, date):
-    history_path = 'best_lines_ml/mlb_preds_history.csv'
     df['date'] = date
     df = df[df['recommendation'] != 'NO BET'].copy()
+    run_id = prediction_log.log_predictions(df, date, model='xgb_strikeouts')
+    print(f"Logged {len(df)} picks as run {run_id}")
 
-    separator = pd.DataFrame([['---'] * len(df.columns)], columns=df.columns)
+def train_model(df=None, params=None):
+    from sklearn.metrics import mean_squared_error, r2_score
+    from xgboost import XGBRegressor
 
+    X_train, X_test, y_train, y_test, features = prepare_data(df)
 
-    if os.path.exists(history_path):
-        existing = pd.read_csv(history_path)
-        combined = pd.concat([existing, separator, df], ignore_index=True)
-        combined.to_csv(history_path, index=False)
-    else:
-        df.to_csv(history_path, index=False)
+    #model = RandomForestRegressor(n_estimators=100, random_state=42)
+    model = XGBRegressor(**(params or XGB_PARAMS))
+    model.fit(X_train, y_train)
+
+    y_pred = model.predict(X_test)
+    metrics = {'r2': float(r2_score(y_test, y_pred)), 'mse': float(mean_squared_error(y_test, y_pred))}
+    return model, metrics
+
+def get_model():
+    # Refits only when the stats files, today's feature partition, XGB_PARAMS or TRAINING_VERSION change
+    return load_or_train('xgb_strikeouts', train_model, [STATS_PATH, STATCAST_PATH], XGB_PARAMS, FEATURES,
+                         sources=partition_digest(), version=TRAINING_VERSION)
 
 if __name__ == "__main__":
     save_pitching_stats()
     
-    X_train, X_test, y_train, y_test, features = prepare_data()
-    
-    #model = RandomForestRegressor(n_estimators=100, random_state=42)
-    model = XGBRegressor(n_estimators=100, learning_rate=0.05)
-
-    model.fit(X_train, y_train)
-    
-    y_pred = model.predict(X_test)
-    print("Test R²:", r2_score(y_test, y_pred))
-    print("Test MSE:", mean_squared_error(y_test, y_pred))
+    model, meta = get_model()
+    print("Test R²:", meta['metrics']['r2'])
+    print("Test MSE:", meta['metrics']['mse'])
     
     predict_today(model)
     
+    import matplotlib.pyplot as plt
+    from xgboost import plot_importance
+
     plot_importance(model, max_num_features=20)
     plt.show()
     #Results right now
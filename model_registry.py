@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import pickle
+from datetime import datetime
+
+"""
+Fitted models are saved under models/<name>/<fingerprint>.pkl next to a .json
+with the feature list, hyperparameters and metrics. The fingerprint covers the
+training files' contents, the feature-store partition the model was fit on, the
+model's TRAINING_VERSION and the hyperparameters, so a model only gets refit
+when one of those actually changes. Hyperparameters chosen by tuning.py live in
+model_config.json and are part of that fingerprint, so a new tuning run refits.
+"""
+
+REGISTRY_DIR = "models"
+# Tuned hyperparameters, checked in so every box trains the same models
+CONFIG_PATH = "model_config.json"
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def fingerprint(data_paths, params, features, sources=None, version=None):
+    # sources: digest of the feature-store partition trained on; version: the model's TRAINING_VERSION
+    h = hashlib.sha256()
+    for path in sorted(data_paths):
+        h.update(path.encode())
+        h.update(file_digest(path).encode())
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    h.update(json.dumps(list(features)).encode())
+    h.update(json.dumps({"sources": sources, "version": version}).encode())
+    return h.hexdigest()[:16]
+
+
+def _paths(name, fp):
+    base = os.path.join(REGISTRY_DIR, name, fp)
+    return f"{base}.pkl", f"{base}.json"
+
+
+def save(name, artifact, fp, params, features, metrics, data_paths, sources=None, version=None):
+    model_path, meta_path = _paths(name, fp)
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    with open(model_path, "wb") as f:
+        pickle.dump(artifact, f)
+
+    meta = {
+        "name": name,
+        "fingerprint": fp,
+        "trained_at": datetime.now().isoformat(timespec="seconds"),
+        "params": params,
+        "features": list(features),
+        "metrics": metrics,
+        "data": {path: file_digest(path) for path in data_paths},
+        "feature_sources": sources,
+        "version": version,
+    }
+    with open(meta_path, "w") as f:
+        json.dump(meta, f, indent=2, default=str)
+    with open(os.path.join(REGISTRY_DIR, name, "latest.json"), "w") as f:
+        json.dump(meta, f, indent=2, default=str)
+    return meta
+
+
+def load(name, fp):
+    model_path, meta_path = _paths(name, fp)
+    if not (os.path.exists(model_path) and os.path.exists(meta_path)):
+        return None, None
+    with open(model_path, "rb") as f:
+        artifact = pickle.load(f)
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return artifact, meta
+
+
+def load_or_train(name, train_fn, data_paths, params, features, sources=None, version=None):
+    # train_fn() -> (artifact, metrics); only called when nothing matches the current inputs
+    fp = fingerprint(data_paths, params, features, sources, version)
+    artifact, meta = load(name, fp)
+    if artifact is not None:
+        print(f"Loaded {name} model {fp} (trained {meta['trained_at']})")
+        return artifact, meta
+
+    print(f"Training {name} model {fp}")
+    artifact, metrics = train_fn()
+    meta = save(name, artifact, fp, params, features, metrics, data_paths, sources, version)
+    return artifact, meta
+
+
+def tuned_params(name, defaults):
+    # Hyperparameters for `name`: the defaults, overridden by whatever tuning.py last wrote to CONFIG_PATH
+    if not os.path.exists(CONFIG_PATH):
+        return dict(defaults)
+    with open(CONFIG_PATH) as f:
+        config = json.load(f)
+    return {**defaults, **config.get(name, {}).get("params", {})}
+
+
+def save_tuned(name, params, cv):
+    config = {}
+    if os.path.exists(CONFIG_PATH):
+        with open(CONFIG_PATH) as f:
+            config = json.load(f)
+    config[name] = {"params": params, "cv": cv, "tuned_at": datetime.now().isoformat(timespec="seconds")}
+    with open(CONFIG_PATH, "w") as f:
+        json.dump(config, f, indent=2, default=str)
+    return config[name]
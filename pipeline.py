@@ -0,0 +1,154 @@
+import os
+import resource
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import date, datetime
+
+"""
+Runs the daily stages in one interpreter. Each stage declares the files it reads
+and writes plus the stages it waits on; a stage whose outputs are already newer
+than its inputs (and from today) is skipped, stages with nothing between them run
+at the same time, and anything downstream of a failure is not run at all.
+Whatever a stage returns is kept in `results` for the stages after it.
+"""
+
+
+class Stage:
+    def __init__(self, name, func, inputs=(), outputs=(), after=(), always=False):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.after = list(after)
+        self.always = always
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def is_fresh(stage):
+    if stage.always or not stage.outputs:
+        return False
+    if not all(os.path.exists(p) for p in stage.outputs):
+        return False
+    today = date.today()
+    out_times = [os.path.getmtime(p) for p in stage.outputs]
+    if any(datetime.fromtimestamp(t).date() != today for t in out_times):
+        return False
+    in_times = [os.path.getmtime(p) for p in stage.inputs if os.path.exists(p)]
+    return not in_times or min(out_times) >= max(in_times)
+
+
+def run(stages, max_workers=4, force=False):
+    status = {}
+    results = {}
+    report = {}
+    lock = threading.Lock()
+
+    def execute(stage):
+        start = time.perf_counter()
+        rss_before = _peak_rss_mb()
+        try:
+            value = stage.func(results)
+            state = "ok"
+        except Exception:
+            traceback.print_exc()
+            value, state = None, "failed"
+        with lock:
+            results[stage.name] = value
+            report[stage.name] = {
+                "status": state,
+                "seconds": round(time.perf_counter() - start, 2),
+                # High-water RSS is per process; stages that overlapped share the number
+                "peak_rss_mb": round(_peak_rss_mb(), 1),
+                "rss_growth_mb": round(_peak_rss_mb() - rss_before, 1),
+            }
+        return state
+
+    pending = list(stages)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for stage in list(pending):
+                deps = [status.get(d) for d in stage.after]
+                if any(d in ("failed", "blocked") for d in deps):
+                    pending.remove(stage)
+                    status[stage.name] = "blocked"
+                    report[stage.name] = {"status": "blocked"}
+                    print(f"[{stage.name}] not run, an upstream stage failed")
+                elif all(d in ("ok", "skipped") for d in deps):
+                    pending.remove(stage)
+                    if not force and is_fresh(stage):
+                        status[stage.name] = "skipped"
+                        report[stage.name] = {"status": "skipped"}
+                        print(f"[{stage.name}] outputs are up to date, skipping")
+                    else:
+                        print(f"[{stage.name}] running")
+                        running[pool.submit(execute, stage)] = stage
+
+            if not running:
+                if pending:
+                    # Nothing can start and nothing will finish: a missing or circular dependency
+                    raise ValueError(f"Unresolvable dependencies for {[s.name for s in pending]}")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                status[stage.name] = future.result()
+
+    return results, report
+
+
+def print_report(report):
+    print(f"\n{'stage':<10} {'status':<8} {'seconds':>8} {'peak MB':>9} {'+MB':>7}")
+    for name, r in report.items():
+        print(f"{name:<10} {r['status']:<8} {r.get('seconds', ''):>8} {r.get('peak_rss_mb', ''):>9} {r.get('rss_growth_mb', ''):>7}")
+
+
+def daily_stages():
+    today = date.today().isoformat()
+    logs = "data/pitcher_stats/logs_last_30_days.csv"
+    slate = f"data/mlb_slates/mlb_pitcher_slate_{today}.csv"
+    best = f"best_lines/best_lines_{today}.csv"
+
+    # Imports live inside the stages so nothing heavy loads for a stage that gets skipped
+    def stats(results):
+        import get_pitcher_data
+        return get_pitcher_data.main()
+
+    def fetch(results):
+        import merged_props
+        return merged_props.fetch_all_books()
+
+    def scrape(results):
+        import merged_props
+        df = merged_props.main(books=results.get("fetch"))
+        if df is None:
+            raise RuntimeError("No slate was built")
+        return df
+
+    def picks(results):
+        import find_best_lines
+        return find_best_lines.main(slate=results.get("scrape"))
+
+    def grade(results):
+        import post_game_evaluation
+        return post_game_evaluation.main()
+
+    return [
+        Stage("stats", stats, outputs=[logs]),
+        # The books are fetched alongside stats; nothing to fetch once today's slate is built
+        Stage("fetch", fetch, outputs=[slate]),
+        # Player ids in the slate resolve against the 30-day logs, so the merge waits for both
+        Stage("scrape", scrape, outputs=[slate], after=["fetch", "stats"]),
+        Stage("picks", picks, inputs=[slate, logs], outputs=[best], after=["stats", "scrape"]),
+        # Grading reads the same daily log store the stats stage writes to
+        Stage("grade", grade, after=["stats"], always=True),
+    ]
@@ -0,0 +1,197 @@
+import os
+import time
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+import requests
+
+"""
+Per-day pitching lines from Baseball Reference, stored one file per date under
+data/pitcher_stats/daily. Each date is fetched once; range views (last 30 days,
+2023-to-date) are aggregated from the stored days instead of re-pulled.
+"""
+
+DAILY_DIR = "data/pitcher_stats/daily"
+# Baseball Reference blocks for an hour past about 10 requests a minute
+FETCH_INTERVAL = 6.5
+# A run stops after this many failed days in a row, it's most likely been blocked
+MAX_FAILURES = 3
+# No MLB games are played outside these months, those days are stored empty without asking
+SEASON_MONTHS = range(3, 12)
+SCHEDULE_URL = "https://statsapi.mlb.com/api/v1/schedule"
+# Regular season and postseason; spring training and exhibitions have no Baseball Reference lines
+GAME_TYPES = {'R', 'F', 'D', 'L', 'W'}
+
+COUNT_COLS = ['G', 'GS', 'W', 'L', 'SV', 'H', 'R', 'ER', 'BB', 'SO', 'HR', 'HBP', 'AB', '2B', '3B',
+              'IBB', 'GDP', 'SF', 'SB', 'CS', 'PO', 'BF', 'Pit']
+# Shares Baseball Reference only gives as rates; weighted by pitches / batters faced when combining days
+PITCH_RATE_COLS = ['Str', 'StL', 'StS']
+BATTED_RATE_COLS = ['GB/FB', 'LD', 'PU']
+COLUMN_ORDER = ['Name', 'Age', '#days', 'Lev', 'Tm', 'G', 'GS', 'W', 'L', 'SV', 'IP', 'H', 'R', 'ER', 'BB',
+                'SO', 'HR', 'HBP', 'ERA', 'AB', '2B', '3B', 'IBB', 'GDP', 'SF', 'SB', 'CS', 'PO', 'BF', 'Pit',
+                'Str', 'StL', 'StS', 'GB/FB', 'LD', 'PU', 'WHIP', 'BAbip', 'SO9', 'SO/W', 'mlbID']
+
+
+def day_path(day):
+    return os.path.join(DAILY_DIR, f"pitching_{day}.csv")
+
+
+def _to_date(d):
+    return d if isinstance(d, date) else datetime.strptime(str(d), "%Y-%m-%d").date()
+
+
+def date_range(start, end):
+    start, end = _to_date(start), _to_date(end)
+    return [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+
+
+def stored_dates():
+    if not os.path.isdir(DAILY_DIR):
+        return set()
+    return {f[len("pitching_"):-len(".csv")] for f in os.listdir(DAILY_DIR) if f.startswith("pitching_")}
+
+
+def in_season(day):
+    return _to_date(day).month in SEASON_MONTHS
+
+
+def games_on(day):
+    # MLB games played on `day` per the league schedule, None if the schedule couldn't be read
+    try:
+        resp = requests.get(SCHEDULE_URL, params={'sportId': 1, 'date': str(day)}, timeout=10)
+        resp.raise_for_status()
+        dates = resp.json().get('dates', [])
+    except (requests.RequestException, ValueError):
+        return None
+    games = [g for d in dates for g in d.get('games', [])]
+    return sum(g.get('gameType') in GAME_TYPES and g.get('status', {}).get('detailedState') not in ('Postponed', 'Cancelled')
+               for g in games)
+
+
+def _store(day, df):
+    os.makedirs(DAILY_DIR, exist_ok=True)
+    df.to_csv(day_path(day), index=False, encoding='utf-8')
+    return df
+
+
+def fetch_day(day):
+    # The day's lines, stored; None when nothing could be stored and the next run should retry
+    if not in_season(day):
+        return _store(day, pd.DataFrame(columns=COLUMN_ORDER))
+
+    from pybaseball import pitching_stats_range
+
+    try:
+        df = pitching_stats_range(day, day)
+    except requests.RequestException as e:
+        # Network trouble, leave the date missing so the next run tries again
+        print(f"Failed to fetch pitching logs for {day}: {e}")
+        return None
+    except Exception as e:
+        # No table on the page usually means no games, but a rate-limit page or a changed layout
+        # looks the same. Only a schedule with no games makes it safe to store the day empty.
+        if games_on(day) != 0:
+            print(f"Couldn't read pitching logs for {day}, will retry: {e!r}")
+            return None
+        df = pd.DataFrame(columns=COLUMN_ORDER)
+    return _store(day, df)
+
+
+def update_dates(dates):
+    # Only finished days get stored, today's games may still be going
+    today = date.today().isoformat()
+    have = stored_dates()
+    missing = sorted(d for d in set(dates) if d < today and d not in have)
+    failures = 0
+    last_request = None
+    for day in missing:
+        if in_season(day):
+            # Paced so a long backfill stays under Baseball Reference's limit
+            if last_request is not None:
+                time.sleep(max(0.0, FETCH_INTERVAL - (time.monotonic() - last_request)))
+            last_request = time.monotonic()
+            print(f"Fetching pitching logs for {day}")
+        if fetch_day(day) is not None:
+            failures = 0
+            continue
+        failures += 1
+        if failures >= MAX_FAILURES:
+            print(f"{failures} days in a row failed, stopping; the rest are fetched next run")
+            break
+    return missing
+
+
+def update(start, end):
+    return update_dates(date_range(start, end))
+
+
+def load_days(start, end):
+    frames = []
+    for day in date_range(start, end):
+        path = day_path(day)
+        if not os.path.exists(path):
+            continue
+        df = pd.read_csv(path)
+        if df.empty:
+            continue
+        frames.append(df.assign(date=day))
+    if not frames:
+        return pd.DataFrame(columns=COLUMN_ORDER + ['date'])
+    return pd.concat(frames, ignore_index=True)
+
+
+def ip_to_outs(ip):
+    # Baseball notation: 5.2 innings is 5 and 2/3, i.e. 17 outs
+    ip = pd.to_numeric(ip, errors='coerce').fillna(0)
+    whole = np.floor(ip)
+    return (whole * 3 + np.round((ip - whole) * 10)).astype(int)
+
+
+def outs_to_ip(outs):
+    return outs // 3 + (outs % 3) / 10
+
+
+def aggregate(logs, end):
+    # Collapse per-day lines into one row per pitcher, same columns pitching_stats_range(start, end) gives
+    if logs.empty:
+        return pd.DataFrame(columns=COLUMN_ORDER)
+
+    logs = logs.dropna(subset=['mlbID']).copy()
+    logs['mlbID'] = logs['mlbID'].astype(int)
+    logs['outs'] = ip_to_outs(logs['IP'])
+    for col in COUNT_COLS + PITCH_RATE_COLS + BATTED_RATE_COLS:
+        logs[col] = pd.to_numeric(logs[col], errors='coerce')
+    for col in PITCH_RATE_COLS:
+        logs[f'{col}_w'] = logs[col] * logs['Pit']
+    for col in BATTED_RATE_COLS:
+        logs[f'{col}_w'] = logs[col] * logs['BF']
+
+    logs = logs.sort_values('date')
+    grouped = logs.groupby('mlbID')
+    agg = grouped[COUNT_COLS + ['outs'] + [f'{c}_w' for c in PITCH_RATE_COLS + BATTED_RATE_COLS]].sum(min_count=1)
+    latest = grouped[['Name', 'Age', 'Lev', 'Tm', 'date']].last()
+    agg = agg.join(latest).reset_index()
+
+    innings = agg['outs'] / 3
+    safe_innings = innings.replace(0, np.nan)
+    agg['IP'] = outs_to_ip(agg['outs'])
+    agg['ERA'] = (9 * agg['ER'] / safe_innings).round(2)
+    agg['WHIP'] = ((agg['BB'] + agg['H']) / safe_innings).round(3)
+    agg['SO9'] = (9 * agg['SO'] / safe_innings).round(1)
+    agg['SO/W'] = (agg['SO'] / agg['BB'].replace(0, np.nan)).round(2)
+    balls_in_play = (agg['AB'] - agg['SO'] - agg['HR'] + agg['SF']).replace(0, np.nan)
+    agg['BAbip'] = ((agg['H'] - agg['HR']) / balls_in_play).round(3)
+    for col in PITCH_RATE_COLS:
+        agg[col] = (agg[f'{col}_w'] / agg['Pit'].replace(0, np.nan)).round(2)
+    for col in BATTED_RATE_COLS:
+        agg[col] = (agg[f'{col}_w'] / agg['BF'].replace(0, np.nan)).round(2)
+    agg['#days'] = (pd.Timestamp(_to_date(end)) - pd.to_datetime(agg['date'])).dt.days
+
+    return agg[COLUMN_ORDER].sort_values('Name').reset_index(drop=True)
+
+
+def pitching_range(start, end, refresh=True):
+    # Drop-in for pitching_stats_range(start, end) built from the stored days
+    if refresh:
+        update(start, end)
+    return aggregate(load_days(start, end), end)
@@ -0,0 +1,255 @@
+import os
+import re
+import difflib
+import hashlib
+import threading
+import unicodedata
+import pandas as pd
+
+"""
+One place to turn a book's spelling of a pitcher into the MLBAM player_id that
+pitcher_stats.csv (player_id) and the pybaseball logs (mlbID) already carry.
+Everything downstream joins on that integer instead of re-normalizing names.
+"""
+
+INDEX_PATH = "data/pitcher_stats/player_index.csv"
+STATCAST_PATH = "data/pitcher_stats/pitcher_stats.csv"
+LOG_PATHS = [
+    "data/pitcher_stats/logs_last_30_days.csv",
+    "data/pitcher_stats/pitching_stats_2023-2025.csv",
+]
+
+# Spellings the books use that don't line up with Baseball Reference / Savant
+BOOK_ALIASES = {
+    "jake latz": "jacob latz",
+}
+
+# Baseball Reference's Tm is a city; for the cities with two clubs the league in Lev says which
+CITY_TEAMS = {
+    "Arizona": "ARI", "Athletics": "ATH", "Oakland": "ATH", "Atlanta": "ATL", "Baltimore": "BAL",
+    "Boston": "BOS", "Chicago": {"NL": "CHC", "AL": "CWS"}, "Cincinnati": "CIN", "Cleveland": "CLE",
+    "Colorado": "COL", "Detroit": "DET", "Houston": "HOU", "Kansas City": "KC",
+    "Los Angeles": {"NL": "LAD", "AL": "LAA"}, "Miami": "MIA", "Milwaukee": "MIL", "Minnesota": "MIN",
+    "New York": {"NL": "NYM", "AL": "NYY"}, "Philadelphia": "PHI", "Pittsburgh": "PIT", "San Diego": "SD",
+    "San Francisco": "SF", "Seattle": "SEA", "St. Louis": "STL", "Tampa Bay": "TB", "Texas": "TEX",
+    "Toronto": "TOR", "Washington": "WSH",
+}
+# Other spellings the books use for the same clubs
+TEAM_ALIASES = {"AZ": "ARI", "CHW": "CWS", "OAK": "ATH", "WAS": "WSH"}
+
+FUZZY_CUTOFF = 0.85
+
+
+def fix_escaped_unicode(text):
+    if pd.isna(text):
+        return ""
+    try:
+        return bytes(text, "utf-8").decode("unicode_escape").encode("latin1").decode("utf-8")
+    except Exception:
+        return text
+
+def normalize_name(name: str) -> str:
+    if pd.isna(name):
+        return ""
+    n = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    n = n.lower().strip()
+    n = re.sub(r"\b(jr|sr|ii|iii|iv|v)\b\.?", "", n)
+    n = re.sub(r"\s*\([^)]*\)", "", n)
+    return re.sub(r"\s+", " ", n).strip()
+
+
+"""
+There are name mismatches between the sites, so we need a consistent way to generate keys for players.
+Ex.) Jacob Latz vs Jake Latz, Germán Márquez vs German Marquez, Logan Allen vs Logan Allen (CLE), etc.
+"""
+def name_key(name):
+    name = normalize_name(name)
+    parts = name.split()
+    if len(parts) < 2:
+        return name
+    return parts[0][:2] + "_" + parts[-1]
+
+
+def team_abbrs(tm, lev):
+    # ("Chicago", "Maj-AL") -> "CWS"; a traded pitcher's "Atlanta,Minnesota" -> "ATL,MIN"
+    if pd.isna(tm):
+        return None
+    leagues = sorted({part.strip()[-2:] for part in str(lev).split(",")}) if not pd.isna(lev) else []
+    teams = []
+    for city in str(tm).split(","):
+        team = CITY_TEAMS.get(city.strip())
+        if isinstance(team, dict):
+            # Lev lists every league a traded pitcher played in, so this can keep both clubs
+            teams.extend(team[league] for league in leagues if league in team)
+        elif team:
+            teams.append(team)
+    return ",".join(dict.fromkeys(teams)) or None
+
+
+def team_abbr(team):
+    # A book's team abbreviation in the form team_abbrs() stores
+    team = str(team).upper()
+    return TEAM_ALIASES.get(team, team)
+
+
+def _load_players():
+    # Every spelling seen per player_id, with the team and recency of that row
+    statcast = pd.read_csv(STATCAST_PATH)
+    last_first = statcast["last_name, first_name"].str.split(",", n=1, expand=True)
+    players = pd.DataFrame({
+        "player_id": statcast["player_id"].astype(int),
+        "name": (last_first[1].str.strip() + " " + last_first[0].str.strip()).map(normalize_name),
+        "teams": None,
+        "days": float("inf"),
+    })
+
+    frames = [players]
+    for path in LOG_PATHS:
+        if not os.path.exists(path):
+            continue
+        logs = pd.read_csv(path, usecols=["Name", "Tm", "Lev", "#days", "mlbID"]).dropna(subset=["mlbID"])
+        frames.append(pd.DataFrame({
+            "player_id": logs["mlbID"].astype(int),
+            "name": logs["Name"].map(fix_escaped_unicode).map(normalize_name),
+            "teams": [team_abbrs(tm, lev) for tm, lev in zip(logs["Tm"], logs["Lev"])],
+            "days": logs["#days"],
+        }))
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_index():
+    rows = _load_players()
+    # Team and recency come from each player's latest appearance, the spelling from Savant when it has one
+    players = rows.sort_values(["player_id", "days"]).drop_duplicates(subset=["player_id"])
+    players["name"] = players["player_id"].map(rows.drop_duplicates(subset=["player_id"]).set_index("player_id")["name"])
+
+    full = rows[["player_id", "name"]].assign(alias=rows["name"], alias_type="name")
+    keyed = rows[["player_id", "name"]].assign(alias=rows["name"].map(name_key), alias_type="key")
+    index = pd.concat([full, keyed], ignore_index=True).drop(columns=["name"])
+    index = index.merge(players, on="player_id")
+
+    # Hand-maintained book spellings and anything learned from earlier fuzzy matches survive rebuilds
+    if os.path.exists(INDEX_PATH):
+        old = pd.read_csv(INDEX_PATH)
+        learned = old.loc[old["alias_type"] == "learned", ["alias", "alias_type", "player_id"]]
+        index = pd.concat([index, learned.merge(players, on="player_id")[index.columns]], ignore_index=True)
+    for alias, target in BOOK_ALIASES.items():
+        match = players[players["name"] == target]
+        index = pd.concat([index, match.assign(alias=alias, alias_type="book")], ignore_index=True)
+
+    index = index.drop_duplicates(subset=["alias", "player_id"])
+    os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
+    index[["alias", "alias_type", "player_id", "name", "teams", "days"]].to_csv(INDEX_PATH, index=False)
+    return index
+
+
+def _index_is_stale():
+    if not os.path.exists(INDEX_PATH):
+        return True
+    if "teams" not in pd.read_csv(INDEX_PATH, nrows=0).columns:
+        # Written when teams were still cities
+        return True
+    built = os.path.getmtime(INDEX_PATH)
+    sources = [STATCAST_PATH] + [p for p in LOG_PATHS if os.path.exists(p)]
+    return any(os.path.getmtime(p) > built for p in sources)
+
+
+def surrogate_id(name):
+    digest = hashlib.sha1(name_key(name).encode()).hexdigest()
+    return -(int(digest[:12], 16) + 1)
+
+
+class PlayerIndex:
+    def __init__(self, index):
+        self.index = index
+        self.players = index.drop_duplicates(subset=["player_id"]).set_index("player_id")
+        self.aliases = index.groupby("alias")["player_id"].apply(list).to_dict()
+        self.by_last = {}
+        for player_id, name in self.players["name"].items():
+            self.by_last.setdefault(name.split()[-1] if name else "", []).append(player_id)
+        self._cache = {}
+        self._learned = []
+
+    def _pick(self, candidates, team):
+        candidates = list(dict.fromkeys(candidates))
+        if len(candidates) > 1 and team is not None:
+            abbr = team_abbr(team)
+            on_team = [c for c in candidates if abbr in str(self.players.at[c, "teams"]).split(",")]
+            if on_team:
+                candidates = on_team
+        # Still ambiguous (e.g. two Logan Allens, no team) -> whoever pitched most recently
+        return min(candidates, key=lambda c: self.players.at[c, "days"])
+
+    def _fuzzy(self, norm):
+        parts = norm.split()
+        if not parts:
+            return None
+        # Only compare against players sharing the last name (or its first letter), never the whole table
+        block = self.by_last.get(parts[-1]) or [
+            pid for last, ids in self.by_last.items() if last[:1] == parts[-1][:1] for pid in ids
+        ]
+        names = {self.players.at[pid, "name"]: pid for pid in block}
+        match = difflib.get_close_matches(norm, list(names), n=1, cutoff=FUZZY_CUTOFF)
+        return names[match[0]] if match else None
+
+    def resolve(self, name, team=None):
+        cache_key = (name, team)
+        if cache_key in self._cache:
+            return self._cache[cache_key]
+
+        norm = normalize_name(name)
+        norm = BOOK_ALIASES.get(norm, norm)
+        candidates = self.aliases.get(norm) or self.aliases.get(name_key(norm))
+        if candidates:
+            player_id = self._pick(candidates, team)
+        else:
+            player_id = self._fuzzy(norm)
+            if player_id is not None:
+                self._learned.append({"alias": norm, "alias_type": "learned", "player_id": player_id})
+
+        if player_id is None:
+            # Unknown to the stats tables; a negative id from the name key is the same in every run and
+            # process, so the books join to each other and the stores keyed on player_id stay consistent
+            player_id = surrogate_id(norm)
+
+        self._cache[cache_key] = int(player_id)
+        return int(player_id)
+
+    def resolve_series(self, names, teams=None):
+        # Resolve each distinct (name, team) once and broadcast back onto the rows
+        if teams is None:
+            teams = pd.Series([None] * len(names), index=names.index)
+        pairs = pd.DataFrame({"name": names.values, "team": teams.values}, index=names.index)
+        uniq = pairs.drop_duplicates()
+        uniq["player_id"] = [self.resolve(n, t) for n, t in zip(uniq["name"], uniq["team"])]
+        return pairs.merge(uniq, on=["name", "team"], how="left")["player_id"].set_axis(names.index).astype("int64")
+
+    def save(self):
+        if not self._learned:
+            return
+        learned = pd.DataFrame(self._learned).merge(
+            self.players[["name", "teams", "days"]], left_on="player_id", right_index=True
+        )
+        learned[["alias", "alias_type", "player_id", "name", "teams", "days"]].to_csv(
+            INDEX_PATH, mode="a", header=False, index=False
+        )
+        self._learned = []
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_index():
+    # Pipeline stages run on a thread pool; only the first caller builds the index
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = build_index() if _index_is_stale() else pd.read_csv(INDEX_PATH)
+                _index = PlayerIndex(index)
+    return _index
+
+
+def resolve_ids(names, teams=None):
+    return get_index().resolve_series(names, teams)
@@ -1,128 +1,137 @@
+import numpy as np
 import pandas as pd
 import os
 import re
 from datetime import datetime
 from glob import glob
-from pybaseball import pitching_stats_range
-from find_best_lines import normalize_name
+import eval_ledger
+import history_store
+import pitching_logs
+import prediction_log
+from player_index import resolve_ids
 
 
-def fetch_actual_stats(slate_date):
-    try:
-        logs = pitching_stats_range(slate_date, slate_date)
-    except Exception as e:
-        print(f"Failed to fetch stats for {slate_date}: {e}")
-        return {}
+def load_actuals(dates):
+    # Actual strikeouts per (date, player_id) out of the daily log store; only never-seen dates hit the network
+    dates = sorted(set(dates))
+    if not dates:
+        return pd.DataFrame(columns=['date', 'player_id', 'Actual_SO'])
 
-    logs = logs[(logs['GS'] > 0) | (logs['IP'] > 0)]
-    logs['player_norm'] = logs['Name'].apply(normalize_name)
-    return logs.set_index('player_norm')['SO'].to_dict()
+    pitching_logs.update_dates(dates)
+    logs = pitching_logs.load_days(dates[0], dates[-1])
+    logs = logs[logs['date'].isin(dates) & ((logs['GS'] > 0) | (logs['IP'] > 0))].dropna(subset=['mlbID'])
+    return pd.DataFrame({
+        'date': logs['date'],
+        'player_id': logs['mlbID'].astype(int),
+        'Actual_SO': pd.to_numeric(logs['SO'], errors='coerce'),
+    }).drop_duplicates(subset=['date', 'player_id'])
 
-def evaluate_best_lines_file(path):
-    m = re.search(r"best_lines_(\d{4}-\d{2}-\d{2})\.csv$", path)
-    if not m:
-        return
-    slate_date = m.group(1)
 
-    if slate_date >= datetime.today().strftime("%Y-%m-%d"):
-        print(f"Skipping {os.path.basename(path)} — game may not be finished.")
-        return
-
-    df_check = pd.read_csv(path)
-    if 'Result' in df_check.columns and df_check['Result'].notna().all():
-        print(f"Already evaluated {os.path.basename(path)}")
-        return
-
-    print(f"Evaluating {os.path.basename(path)} for {slate_date}")
-    actual = fetch_actual_stats(slate_date)
-    if not actual:
-        return
-
-    df = df_check.copy()
-    actual_sos = []
-    results = []
+def grade(so, line, pick, over='OVER', under='UNDER'):
+    so = pd.to_numeric(so, errors='coerce')
+    line = pd.to_numeric(line, errors='coerce')
+    gradable = so.notna() & line.notna() & pick.isin([over, under])
+    hit = ((pick == over) & (so > line)) | ((pick == under) & (so < line))
+    return np.select([~gradable, so == line, hit], ['', 'PUSH', 'HIT'], 'MISS')
 
-    for _, row in df.iterrows():
-        pn = normalize_name(row['Player'])
-        so = actual.get(pn, None)
-        actual_sos.append(so)
 
-        line = row.get('Line (PP)')
-        pick = row.get('Best Bet') or row.get('Pick')
+def attach_actuals(df, slate_date, player_ids, actuals):
+    day = actuals[actuals['date'] == slate_date][['player_id', 'Actual_SO']]
+    so = pd.DataFrame({'player_id': player_ids.values}).merge(day, on='player_id', how='left')['Actual_SO']
+    df['Actual_SO'] = so.values
+    return df
 
-        if so is None or pd.isna(line) or pick not in ('OVER', 'UNDER'):
-            results.append('')
-        else:
-            if so == line:
-                results.append('PUSH')
-            elif pick == 'OVER':
-                results.append('HIT' if so > line else 'MISS')
-            else:
-                results.append('HIT' if so < line else 'MISS')
-
-    df['Actual_SO'] = actual_sos
-    df['Result'] = results
-    df.to_csv(path, index=False)
-    print(f"Updated: {path}\n")
-
-    evaluate_slate_file(slate_date, actual)
 
-def evaluate_slate_file(slate_date, actual=None):
-    slate_path = f"data/mlb_slates/mlb_pitcher_slate_{slate_date}.csv"
+def needs_grading(ledger, path, kind, slate_date):
     if slate_date >= datetime.today().strftime("%Y-%m-%d"):
-        print(f"Skipping {os.path.basename(slate_path)} — game may not be finished.")
-        return
+        print(f"Skipping {os.path.basename(path)} — game may not be finished.")
+        return None
 
-    df = pd.read_csv(slate_path)
-    if 'Result' in df.columns and df['Result'].notna().all():
-        print(f"Already evaluated {os.path.basename(slate_path)}")
-        return
+    # Graded and unchanged since, don't even open it
+    if eval_ledger.is_graded(ledger, path):
+        return None
+    if eval_ledger.gave_up(ledger, path):
+        print(f"No actuals for {os.path.basename(path)} after {eval_ledger.RETRY_DAYS} days of tries, not grading it")
+        return None
 
-    print(f"Evaluating {os.path.basename(slate_path)}")
+    df = pd.read_csv(path)
+    if 'Result' in df.columns and df['Result'].notna().all():
+        print(f"Already evaluated {os.path.basename(path)}")
+        eval_ledger.mark_graded(ledger, path, kind, slate_date)
+        return None
+    return df
 
-    if actual is None:
-        actual = fetch_actual_stats(slate_date)
-        if not actual:
-            return
 
-    actual_sos = []
-    results = []
+def evaluate_best_lines_file(path, df, slate_date, actuals):
+    print(f"Evaluating {os.path.basename(path)} for {slate_date}")
+    player_ids = resolve_ids(df['Player'], df.get('Team'))
+    df = attach_actuals(df, slate_date, player_ids, actuals)
 
-    for _, row in df.iterrows():
-        pn = normalize_name(row['player_pp'])
-        so = actual.get(pn, None)
-        actual_sos.append(so)
+    pick = df['Best Bet'] if 'Best Bet' in df.columns else df['Pick']
+    df['Result'] = grade(df['Actual_SO'], df.get('Line (PP)'), pick)
+    df.to_csv(path, index=False)
+    history_store.write_picks(df, slate_date)
+    print(f"Updated: {path}\n")
 
-        line = row.get('prizepicks_line')
-        pick = row.get('dk_label')
+def evaluate_slate_file(path, df, slate_date, actuals):
+    print(f"Evaluating {os.path.basename(path)}")
+    player_ids = df['player_id'] if 'player_id' in df.columns else resolve_ids(df['player_pp'], df['team'])
+    df = attach_actuals(df, slate_date, player_ids, actuals)
 
-        if so is None or pd.isna(line) or pick not in ('Over', 'Under'):
-            results.append('')
-        else:
-            if so == line:
-                results.append('PUSH')
-            elif pick == 'Over':
-                results.append('HIT' if so > line else 'MISS')
-            else:
-                results.append('HIT' if so < line else 'MISS')
-
-    df['Actual_SO'] = actual_sos
-    df['Result'] = results
-    df.to_csv(slate_path, index=False)
-    print(f"Updated: {slate_path}\n")
+    df['Result'] = grade(df['Actual_SO'], df.get('prizepicks_line'), df['dk_label'], over='Over', under='Under')
+    df.to_csv(path, index=False)
+    history_store.write_slate(df, slate_date)
+    print(f"Updated: {path}\n")
 
-def main():
-    files = glob("best_lines/best_lines_*.csv")
-    for f in sorted(files):
-        evaluate_best_lines_file(f)
+def prediction_key(slate_date):
+    # The ledger tracks files; the ML picks of a date are tracked under the prediction log plus that date
+    return f"{prediction_log.LOG_PATH}#{slate_date}"
 
-    slate_files = glob("data/mlb_slates/mlb_pitcher_slate_*.csv")
-    for f in sorted(slate_files):
-        m = re.search(r"mlb_pitcher_slate_(\d{4}-\d{2}-\d{2})\.csv$", f)
+def pending_files(ledger, kind, pattern, regex):
+    pending = []
+    for f in sorted(glob(pattern)):
+        m = re.search(regex, f)
         if not m:
             continue
         slate_date = m.group(1)
-        evaluate_slate_file(slate_date)
+        df = needs_grading(ledger, f, kind, slate_date)
+        if df is not None:
+            pending.append((f, df, slate_date))
+    return pending
+
+def main():
+    ledger = eval_ledger.connect()
+    best_lines = pending_files(ledger, "best_lines", "best_lines/best_lines_*.csv", r"best_lines_(\d{4}-\d{2}-\d{2})\.csv$")
+    slates = pending_files(ledger, "slate", "data/mlb_slates/mlb_pitcher_slate_*.csv", r"mlb_pitcher_slate_(\d{4}-\d{2}-\d{2})\.csv$")
+
+    today = datetime.today().strftime("%Y-%m-%d")
+    pending_preds = [d for d in prediction_log.pending_dates()
+                     if d < today and not eval_ledger.gave_up(ledger, prediction_key(d))]
+
+    # Every date that still needs grading is resolved in one pass over the actuals store
+    actuals = load_actuals([d for _, _, d in best_lines + slates] + pending_preds)
+    graded_dates = set(actuals['date'])
+
+    for path, df, slate_date in best_lines:
+        if slate_date in graded_dates:
+            evaluate_best_lines_file(path, df, slate_date, actuals)
+            eval_ledger.mark_graded(ledger, path, "best_lines", slate_date)
+        else:
+            eval_ledger.record_attempt(ledger, path, "best_lines", slate_date)
+    for path, df, slate_date in slates:
+        if slate_date in graded_dates:
+            evaluate_slate_file(path, df, slate_date, actuals)
+            eval_ledger.mark_graded(ledger, path, "slate", slate_date)
+        else:
+            eval_ledger.record_attempt(ledger, path, "slate", slate_date)
+
+    graded = prediction_log.backfill_results(actuals)
+    if graded:
+        print(f"Filled in results for {graded} ML picks")
+    for d in pending_preds:
+        if d not in graded_dates:
+            eval_ledger.record_attempt(ledger, prediction_key(d), "predictions", d)
+    ledger.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
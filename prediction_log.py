@@ -0,0 +1,170 @@
+import argparse
+import os
+import sqlite3
+from datetime import datetime
+import pandas as pd
+
+"""
+Append-only log of the XGBoost picks (what used to be mlb_preds_history.csv).
+Each ml_preds run is one row in `runs` and its picks go to `predictions`
+tagged with that run_id, so appending a day never rereads the history.
+"""
+
+LOG_PATH = "best_lines_ml/mlb_preds.sqlite"
+CSV_PATH = "best_lines_ml/mlb_preds_history.csv"
+# Exports go next to the archived CSV, never over it: that file is what import_csv migrates from
+EXPORT_PATH = "best_lines_ml/mlb_preds_export.csv"
+
+COLUMNS = ['date', 'player_id', 'player_pp', 'SO_pred', 'prizepicks_line', 'edge', 'recommendation', 'actual_so', 'result']
+
+
+def connect(path=LOG_PATH):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            model TEXT
+        );
+        CREATE TABLE IF NOT EXISTS predictions (
+            run_id INTEGER NOT NULL REFERENCES runs (run_id),
+            date TEXT NOT NULL,
+            player_id INTEGER,
+            player_pp TEXT NOT NULL,
+            SO_pred REAL,
+            prizepicks_line REAL,
+            edge REAL,
+            recommendation TEXT,
+            actual_so REAL,
+            result TEXT
+        );
+        CREATE INDEX IF NOT EXISTS predictions_by_date ON predictions (date);
+        CREATE INDEX IF NOT EXISTS predictions_by_player ON predictions (player_id, date);
+        CREATE INDEX IF NOT EXISTS predictions_pending ON predictions (result) WHERE result IS NULL;
+    """)
+    return conn
+
+
+def _value(v):
+    if pd.isna(v):
+        return None
+    return v.item() if hasattr(v, 'item') else v
+
+
+def log_predictions(df, date, model=None, conn=None, created_at=None):
+    own = conn is None
+    conn = conn or connect()
+    with conn:
+        cur = conn.execute(
+            "INSERT INTO runs (date, created_at, model) VALUES (?, ?, ?)",
+            (date, created_at or datetime.now().isoformat(timespec="seconds"), model),
+        )
+        run_id = cur.lastrowid
+        rows = df.reindex(columns=COLUMNS[1:])
+        conn.executemany(
+            f"INSERT INTO predictions (run_id, date, {', '.join(COLUMNS[1:])}) VALUES (?, ?, {', '.join('?' * (len(COLUMNS) - 1))})",
+            [(run_id, date, *map(_value, row)) for row in rows.itertuples(index=False)],
+        )
+    if own:
+        conn.close()
+    return run_id
+
+
+def load(start=None, end=None, player=None, conn=None):
+    own = conn is None
+    conn = conn or connect()
+    where, params = [], []
+    if start is not None:
+        where.append("date >= ?")
+        params.append(str(start))
+    if end is not None:
+        where.append("date <= ?")
+        params.append(str(end))
+    if player is not None:
+        where.append("player_id = ?" if isinstance(player, int) else "player_pp = ?")
+        params.append(player)
+    sql = f"SELECT run_id, {', '.join(COLUMNS)} FROM predictions"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    df = pd.read_sql_query(sql + " ORDER BY date, run_id, rowid", conn, params=params)
+    if own:
+        conn.close()
+    return df
+
+
+def pending_dates(conn=None):
+    own = conn is None
+    conn = conn or connect()
+    dates = [r[0] for r in conn.execute("SELECT DISTINCT date FROM predictions WHERE result IS NULL ORDER BY date")]
+    if own:
+        conn.close()
+    return dates
+
+
+def backfill_results(actuals, conn=None):
+    # actuals: (date, player_id, Actual_SO) as returned by post_game_evaluation.load_actuals
+    from post_game_evaluation import grade
+
+    own = conn is None
+    conn = conn or connect()
+    pending = pd.read_sql_query(
+        "SELECT rowid, date, player_id, prizepicks_line, recommendation FROM predictions WHERE result IS NULL",
+        conn,
+    )
+    pending = pending[pending['date'].isin(set(actuals['date']))]
+    if not pending.empty:
+        pending = pending.merge(actuals, on=['date', 'player_id'], how='left')
+        pending['result'] = grade(pending['Actual_SO'], pending['prizepicks_line'], pending['recommendation'])
+        with conn:
+            conn.executemany(
+                "UPDATE predictions SET actual_so = ?, result = ? WHERE rowid = ?",
+                [(_value(so), res, int(rowid)) for so, res, rowid in zip(pending['Actual_SO'], pending['result'], pending['rowid'])],
+            )
+    if own:
+        conn.close()
+    return len(pending)
+
+
+def import_csv(path=CSV_PATH):
+    # Migration: every '---' separated block of the old CSV becomes its own run. Dates the log already
+    # has runs for are left alone, so running it again adds nothing.
+    from player_index import resolve_ids
+
+    df = pd.read_csv(path, dtype=str)
+    df.columns = [c.strip() for c in df.columns]
+    df['block'] = (df['date'].str.strip() == '---').cumsum()
+    df = df[df['date'].str.strip() != '---'].copy()
+    for col in ['SO_pred', 'prizepicks_line', 'edge']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    df['player_id'] = resolve_ids(df['player_pp'])
+    df['result'] = df['Result'].str.strip() if 'Result' in df.columns else None
+
+    conn = connect()
+    logged = {r[0] for r in conn.execute("SELECT DISTINCT date FROM runs")}
+    imported = 0
+    for _, block in df.groupby('block', sort=True):
+        date = block['date'].iloc[0]
+        if date in logged:
+            continue
+        log_predictions(block, date, model='xgb_strikeouts', conn=conn, created_at=f"{date}T00:00:00")
+        logged.add(date)
+        imported += 1
+    conn.close()
+    return imported
+
+
+def export_csv(path=EXPORT_PATH):
+    load().to_csv(path, index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["import", "export"])
+    args = parser.parse_args()
+    if args.command == "import":
+        import_csv()
+    else:
+        export_csv()
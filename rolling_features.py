@@ -0,0 +1,214 @@
+import json
+import os
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+
+import pitching_logs
+
+"""
+Rolling per-start form kept up to date one game day at a time.
+Every pitcher has a ring buffer of their last MAX_WINDOW starts, a running sum
+over the last 3, 5 and 10 of them, and exponentially weighted strikeouts and
+batters faced. A new start adds its line to each sum and takes off the start
+falling out of that window, so a game day costs O(1) per pitcher who started,
+however much history is behind them. The state is saved to data/rolling after
+each update with the range of days it covers; only days after the last one
+applied are read again, unless logs turn up from before the first one, which
+means starting over.
+Pitchers are looked up through an id -> row index, so one pitcher's vector is a
+single row of the arrays.
+"""
+
+STATE_PATH = "data/rolling/state.npz"
+WINDOWS = (3, 5, 10)
+MAX_WINDOW = max(WINDOWS)
+# Per-start values the windows sum; outs rather than IP so the sums stay exact
+STATS = ['SO', 'BF', 'outs', 'BB', 'Pit']
+# A start counts half as much five starts later
+EWM_HALFLIFE = 5
+EWM_ALPHA = 1 - 0.5 ** (1 / EWM_HALFLIFE)
+_SO, _BF, _OUTS, _BB, _PIT = range(len(STATS))
+
+
+def _layout():
+    # Saved state is only reused if it was built with the same windows, stats and decay
+    return json.dumps({'windows': WINDOWS, 'stats': STATS, 'halflife': EWM_HALFLIFE})
+
+
+def starts(day_logs):
+    # One row per starter from a day's pitching lines: player_id + STATS
+    day_logs = day_logs[pd.to_numeric(day_logs['GS'], errors='coerce') > 0].dropna(subset=['mlbID'])
+    out = pd.DataFrame({'player_id': day_logs['mlbID'].astype(int).to_numpy()})
+    for col in STATS:
+        if col == 'outs':
+            out[col] = pitching_logs.ip_to_outs(day_logs['IP']).to_numpy()
+        else:
+            out[col] = pd.to_numeric(day_logs[col], errors='coerce').fillna(0).to_numpy()
+    # Baseball Reference already gives one line per pitcher per day, this just makes sure of it
+    return out.groupby('player_id', sort=False).sum().reset_index()
+
+
+class RollingState:
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.index = {}
+        self.ring = np.zeros((0, MAX_WINDOW, len(STATS)), dtype=np.float32)
+        self.count = np.zeros(0, dtype=np.int32)
+        self.sums = np.zeros((0, len(WINDOWS), len(STATS)))
+        self.ewm = np.zeros((0, 2))
+        self.last = np.zeros(0, dtype=np.int32)
+        # First and last game day applied
+        self.start = None
+        self.through = None
+
+    def _rows(self, ids):
+        new = [i for i in dict.fromkeys(int(i) for i in ids) if i not in self.index]
+        if new:
+            # Arrays grow only when a pitcher makes their first start
+            n, k = len(self.ids), len(new)
+            self.index.update((pid, n + j) for j, pid in enumerate(new))
+            self.ids = np.concatenate([self.ids, np.asarray(new, dtype=np.int64)])
+            self.ring = np.concatenate([self.ring, np.zeros((k, MAX_WINDOW, len(STATS)), dtype=np.float32)])
+            self.count = np.concatenate([self.count, np.zeros(k, dtype=np.int32)])
+            self.sums = np.concatenate([self.sums, np.zeros((k, len(WINDOWS), len(STATS)))])
+            self.ewm = np.concatenate([self.ewm, np.zeros((k, 2))])
+            self.last = np.concatenate([self.last, np.zeros(k, dtype=np.int32)])
+        return np.fromiter((self.index[int(i)] for i in ids), dtype=np.int64, count=len(ids))
+
+    def add_day(self, day, day_starts):
+        # day_starts: one row per starter (see starts()). Days must come in order.
+        day = pitching_logs._to_date(day).isoformat()
+        if self.through is not None and day <= self.through:
+            raise ValueError(f"Rolling state is already through {self.through}, can't add {day}")
+        if len(day_starts):
+            rows = self._rows(day_starts['player_id'].to_numpy())
+            values = day_starts[STATS].to_numpy(dtype=np.float64)
+            seen = self.count[rows]
+            for j, w in enumerate(WINDOWS):
+                # The start w back leaves the window, if there was one
+                leaving = self.ring[rows, (seen - w) % MAX_WINDOW].astype(np.float64)
+                self.sums[rows, j] += values - np.where((seen >= w)[:, None], leaving, 0)
+            self.ring[rows, seen % MAX_WINDOW] = values
+            self.count[rows] = seen + 1
+
+            latest = values[:, [_SO, _BF]]
+            self.ewm[rows] = np.where((seen == 0)[:, None], latest, (1 - EWM_ALPHA) * self.ewm[rows] + EWM_ALPHA * latest)
+            self.last[rows] = date.fromisoformat(day).toordinal()
+        self.start = self.start or day
+        self.through = day
+
+    def advance(self, logs, through):
+        # Apply every day in `logs` (pitching_logs.load_days frame) after self.through up to `through`.
+        # Asking for an earlier day than the state has seen starts over from nothing.
+        through = pitching_logs._to_date(through).isoformat()
+        if self.through is not None and self.through > through:
+            self.__init__()
+        dates = logs['date'].astype(str)
+        pending = logs[(dates <= through) & ((dates > self.through) if self.through else True)]
+        for day, day_logs in pending.groupby('date', sort=True):
+            self.add_day(day, starts(day_logs))
+        if self.through is None or self.through < through:
+            self.through = through
+        return self
+
+    def _features(self, rows, as_of):
+        # Every pitcher in the index has at least one start, fewer than w just averages what there is
+        out = {'player_id': self.ids[rows], 'rolling_starts': self.count[rows]}
+        for j, w in enumerate(WINDOWS):
+            s = self.sums[rows, j]
+            starts_in = np.minimum(self.count[rows], w)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                out[f'r{w}_SO_avg'] = s[:, _SO] / starts_in
+                out[f'r{w}_IP_avg'] = s[:, _OUTS] / 3 / starts_in
+                out[f'r{w}_Pit_avg'] = s[:, _PIT] / starts_in
+                out[f'r{w}_K_rate'] = np.where(s[:, _BF] > 0, s[:, _SO] / s[:, _BF], np.nan)
+                out[f'r{w}_BB_rate'] = np.where(s[:, _BF] > 0, s[:, _BB] / s[:, _BF], np.nan)
+        out['ewm_SO_avg'] = self.ewm[rows, 0]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out['ewm_K_rate'] = np.where(self.ewm[rows, 1] > 0, self.ewm[rows, 0] / self.ewm[rows, 1], np.nan)
+        as_of = pitching_logs._to_date(as_of or date.today()).toordinal()
+        out['days_rest'] = as_of - self.last[rows]
+        return out
+
+    def frame(self, as_of=None):
+        # Every pitcher's current vector
+        return pd.DataFrame(self._features(np.arange(len(self.ids)), as_of))
+
+    def vector(self, player_id, as_of=None):
+        # One pitcher's current vector, None if they haven't started since HISTORY_START
+        row = self.index.get(int(player_id))
+        if row is None:
+            return None
+        return pd.Series({k: v[0] for k, v in self._features(np.array([row]), as_of).items()})
+
+    def save(self, path=STATE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, ids=self.ids, ring=self.ring, count=self.count, sums=self.sums, ewm=self.ewm,
+                     last=self.last, start=np.array(self.start or ""), through=np.array(self.through or ""), layout=np.array(_layout()))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=STATE_PATH):
+        state = cls()
+        if not os.path.exists(path):
+            return state
+        with np.load(path) as data:
+            if str(data['layout']) != _layout():
+                print(f"{path} was built with different windows, rebuilding")
+                return state
+            if 'start' not in data.files:
+                print(f"{path} doesn't say which days it covers, rebuilding")
+                return state
+            state.ids, state.ring, state.count = data['ids'], data['ring'], data['count']
+            state.sums, state.ewm, state.last = data['sums'], data['ewm'], data['last']
+            state.start, state.through = str(data['start']) or None, str(data['through']) or None
+        state.index = {int(pid): i for i, pid in enumerate(state.ids)}
+        return state
+
+
+def update(end=None, path=STATE_PATH):
+    # Fold stored log days after the saved state into it, stopping at the first day not stored yet
+    # so a failed fetch gets applied in order once it's retried. Stored days earlier than the state's
+    # first one rebuild it from scratch. Saves and returns the state.
+    from feature_store import HISTORY_START
+
+    end = pitching_logs._to_date(end or date.today() - timedelta(days=1))
+    state = RollingState.load(path)
+    have = pitching_logs.stored_dates()
+    if state.start and any(HISTORY_START <= d < state.start for d in have):
+        # Days backfilled before the state's first one would have to go in ahead of everything it holds
+        print(f"Pitching logs from before {state.start} were stored since the rolling state was built, rebuilding")
+        state = RollingState()
+    if state.through:
+        first = pitching_logs._to_date(state.through) + timedelta(days=1)
+    else:
+        # A fresh state starts wherever the store does, e.g. 30 days back if only `stats` has run
+        first = pitching_logs._to_date(max(HISTORY_START, min(have, default=HISTORY_START)))
+    if first > end:
+        return state
+    added = 0
+    for day in pitching_logs.date_range(first, end):
+        if day not in have:
+            print(f"No pitching logs stored for {day}, rolling features stop at {state.through}")
+            break
+        state.add_day(day, starts(pd.read_csv(pitching_logs.day_path(day))))
+        added += 1
+    if added:
+        state.save(path)
+    return state
+
+
+def current(as_of=None):
+    # Rolling vectors for the morning of `as_of` (default today), from the saved state.
+    # A date the saved state is already past gets replayed from the logs instead.
+    from feature_store import HISTORY_START
+
+    as_of = pitching_logs._to_date(as_of or date.today())
+    prev = as_of - timedelta(days=1)
+    state = update(prev)
+    if state.through and state.through > prev.isoformat():
+        state = RollingState().advance(pitching_logs.load_days(HISTORY_START, prev), prev)
+    return state.frame(as_of)
@@ -1,24 +1,10 @@
-import subprocess
-
-def run_script(script_name):
-    print(f"Running {script_name}...")
-    try:
-        subprocess.run(["python3", script_name], check=True)
-    except subprocess.CalledProcessError:
-        print(f"Error running {script_name}")
-
-def main():
-    scripts = [
-        "get_pitcher_data.py",
-        "merged_props.py",
-        "find_best_lines.py",
-        "post_game_evaluation.py"
-    ]
-
-    for script in scripts:
-        run_script(script)
+import sys
+import pipeline
 
+def main(force=False):
+    _, report = pipeline.run(pipeline.daily_stages(), force=force)
+    pipeline.print_report(report)
     print("\ncompleted.")
 
 if __name__ == "__main__":
-    main()
+    main(force="--force" in sys.argv[1:])
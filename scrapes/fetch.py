@@ -0,0 +1,108 @@
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from scrapes import raw_cache
+
+# (connect, read) timeout in seconds for every book request
+DEFAULT_TIMEOUT = (5, 20)
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Recorded payloads younger than this are served without touching the network
+FRESH_SECONDS = int(os.environ.get("MLB_FRESH_SECONDS", "60"))
+
+# When set, every request goes to the replay server instead of the books
+REPLAY_URL = os.environ.get("MLB_REPLAY_URL")
+REPLAY_AS_OF = os.environ.get("MLB_REPLAY_AS_OF")
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(book):
+    # One pooled session per book so keep-alive connections get reused across calls
+    with _sessions_lock:
+        session = _sessions.get(book)
+        if session is None:
+            retry = Retry(
+                total=MAX_RETRIES,
+                backoff_factor=BACKOFF_FACTOR,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=("GET",),
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=8)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[book] = session
+    return session
+
+
+def set_replay(url, as_of=None):
+    global REPLAY_URL, REPLAY_AS_OF
+    REPLAY_URL = url
+    REPLAY_AS_OF = as_of
+
+
+@contextmanager
+def replaying(as_of=None):
+    # Spin up a local replay server and point every scraper at it
+    from scrapes.replay_server import start_server
+
+    server = start_server()
+    host, port = server.server_address[:2]
+    previous = (REPLAY_URL, REPLAY_AS_OF)
+    set_replay(f"http://{host}:{port}", as_of)
+    try:
+        yield server
+    finally:
+        set_replay(*previous)
+        server.shutdown()
+        server.server_close()
+
+
+def _replay_json(book, full_url, timeout):
+    params = {"url": full_url}
+    if REPLAY_AS_OF:
+        params["as_of"] = REPLAY_AS_OF
+    response = get_session("replay").get(f"{REPLAY_URL}/{book}", params=params, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_json(book, url, params=None, headers=None, timeout=DEFAULT_TIMEOUT):
+    full_url = requests.Request("GET", url, params=params).prepare().url
+
+    if REPLAY_URL:
+        return _replay_json(book, full_url, timeout)
+
+    cached = raw_cache.lookup(book, full_url)
+    if cached is not None:
+        age = datetime.now() - datetime.fromisoformat(cached["fetched_at"])
+        if age < timedelta(seconds=FRESH_SECONDS):
+            return raw_cache.load_json(cached["sha"])
+
+        # Stale copy on disk, ask the book whether it changed
+        headers = dict(headers or {})
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    response = get_session(book).get(full_url, headers=headers, timeout=timeout)
+    if response.status_code == 304 and cached is not None:
+        raw_cache.refresh(book, cached)
+        return raw_cache.load_json(cached["sha"])
+
+    response.raise_for_status()
+    raw_cache.record(book, full_url, response.content,
+                     etag=response.headers.get("ETag"),
+                     last_modified=response.headers.get("Last-Modified"))
+    return response.json()
@@ -0,0 +1,109 @@
+import bisect
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+CACHE_DIR = "data/raw"
+OBJECTS_DIR = os.path.join(CACHE_DIR, "objects")
+
+_index_lock = threading.Lock()
+# book -> {'offset': bytes of index.jsonl parsed, 'urls': {url: entries sorted by fetched_at}}
+_indexes = {}
+
+
+def _index_path(book):
+    return os.path.join(CACHE_DIR, book, "index.jsonl")
+
+
+def _object_path(sha):
+    return os.path.join(OBJECTS_DIR, sha[:2], f"{sha}.json")
+
+
+def record(book, url, body, etag=None, last_modified=None, fetched_at=None):
+    # Payloads are stored by content hash, so an unchanged board costs one index line
+    sha = hashlib.sha256(body).hexdigest()
+    path = _object_path(sha)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(body)
+        os.replace(tmp, path)
+
+    return _append(book, {
+        "fetched_at": fetched_at or datetime.now().isoformat(timespec="seconds"),
+        "url": url,
+        "sha": sha,
+        "etag": etag,
+        "last_modified": last_modified,
+    })
+
+
+def refresh(book, entry):
+    # Server said 304, log that the same payload was still current now
+    return _append(book, dict(entry, fetched_at=datetime.now().isoformat(timespec="seconds")))
+
+
+def _append(book, entry):
+    with _index_lock:
+        os.makedirs(os.path.join(CACHE_DIR, book), exist_ok=True)
+        with open(_index_path(book), "a") as f:
+            f.write(json.dumps(entry) + "\n")
+    return entry
+
+
+def _fetched_at(entry):
+    return entry["fetched_at"]
+
+
+def _index(book):
+    # index.jsonl is parsed once per process; after that only lines appended since the last call are
+    # read, whoever appended them. Call with _index_lock held.
+    idx = _indexes.setdefault(book, {"offset": 0, "urls": {}})
+    path = _index_path(book)
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    if size < idx["offset"]:
+        # Truncated or replaced, start over
+        idx = _indexes[book] = {"offset": 0, "urls": {}}
+    if size > idx["offset"]:
+        with open(path, "rb") as f:
+            f.seek(idx["offset"])
+            data = f.read(size - idx["offset"])
+        # A line still being written is left for the next call
+        complete = data.rfind(b"\n") + 1
+        for line in data[:complete].splitlines():
+            if line.strip():
+                entry = json.loads(line)
+                bisect.insort(idx["urls"].setdefault(entry["url"], []), entry, key=_fetched_at)
+        idx["offset"] += complete
+    return idx
+
+
+def entries(book, url=None):
+    with _index_lock:
+        urls = _index(book)["urls"]
+        if url is not None:
+            return list(urls.get(url, []))
+        return sorted((e for rows in urls.values() for e in rows), key=_fetched_at)
+
+
+def lookup(book, url, as_of=None):
+    # Latest payload for this url fetched at or before as_of (ISO timestamps sort as strings).
+    # A bare date means the end of that day.
+    if as_of is not None and len(as_of) == len("YYYY-MM-DD"):
+        as_of = f"{as_of}T23:59:59"
+    with _index_lock:
+        rows = _index(book)["urls"].get(url, [])
+        i = len(rows) if as_of is None else bisect.bisect_right(rows, as_of, key=_fetched_at)
+        return rows[i - 1] if i else None
+
+
+def load_body(sha):
+    with open(_object_path(sha), "rb") as f:
+        return f.read()
+
+
+def load_json(sha):
+    return json.loads(load_body(sha))
@@ -0,0 +1,54 @@
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from scrapes import raw_cache
+
+"""
+Stand-in for the book APIs that serves recorded payloads out of data/raw.
+GET /<book>?url=<original request url>&as_of=<iso timestamp>
+"""
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        book = parsed.path.strip("/")
+        query = parse_qs(parsed.query)
+        url = query.get("url", [None])[0]
+        as_of = query.get("as_of", [None])[0]
+
+        entry = raw_cache.lookup(book, url, as_of) if book and url else None
+        if entry is None:
+            self.send_error(404, f"No recorded payload for {book} {url}")
+            return
+
+        body = raw_cache.load_body(entry["sha"])
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", f'"{entry["sha"]}"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(host="127.0.0.1", port=0):
+    # port=0 picks a free port; the bound address is on server.server_address
+    server = ThreadingHTTPServer((host, port), ReplayHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), ReplayHandler)
+    print(f"Replaying recorded payloads on http://{args.host}:{args.port}")
+    server.serve_forever()
@@ -1,5 +1,9 @@
-import requests
 import pandas as pd
+from scrapes.fetch import fetch_json
+
+COLUMNS = ["player", "dk_line", "dk_odds", "dk_label", "market_name"]
+# Markets whose name contains one of these are kept
+DESIRED_MARKETS = ["Strikeouts"]
 
 def scrape_draftkings_mlb():
     url = "https://sportsbook-nash.draftkings.com/api/sportscontent/dkusil/v1/leagues/84240/categories/1031/subcategories/18195"
@@ -10,8 +14,7 @@ def scrape_draftkings_mlb():
         "Accept": "*/*",
     }
 
-    response = requests.get(url, headers=headers)
-    data = response.json()
+    data = fetch_json("draftkings", url, headers=headers)
 
     market_map = {m['id']: m for m in data['markets']}
 
@@ -19,7 +22,7 @@ def scrape_draftkings_mlb():
     for sel in data['selections']:
         market = market_map.get(sel['marketId'], {})
         market_name = market.get('name', '')
-        if 'Strikeouts' not in market_name:
+        if not any(m in market_name for m in DESIRED_MARKETS):
             continue
 
         participants = sel.get('participants', [])
@@ -35,7 +38,7 @@ def scrape_draftkings_mlb():
             "market_name": market_name,
         })
 
-    return pd.DataFrame(dk_selections)
+    return pd.DataFrame(dk_selections, columns=COLUMNS)
 
 
 if __name__ == "__main__":
@@ -1,35 +1,70 @@
-import requests
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from scrapes.fetch import fetch_json
 
 DESIRED_STATS = ["Pitcher Strikeouts"]
 #DESIRED_STATS = ["Hits+Runs+RBIs"]
+COLUMNS = ["player", "team", "stat_type", "prizepicks_line"]
 
-def scrape_prizepicks_mlb():
-    url = "https://api.prizepicks.com/projections"
-    params = {"league_id": "2", "per_page": "250"}
-    headers = {"User-Agent": "Mozilla/5.0"}
+URL = "https://api.prizepicks.com/projections"
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+PER_PAGE = 250
+MAX_WORKERS = 4
 
-    response = requests.get(url, params=params, headers=headers)
-    data = response.json()
+def fetch_page(page=1, url=URL):
+    params = {"league_id": "2", "per_page": str(PER_PAGE), "page": str(page)}
+    return fetch_json("prizepicks", url, params=params, headers=HEADERS)
 
-    projections = data["data"]
-    included = {item["id"]: item for item in data["included"]}
+def parse_page(data, players, projections):
+    # Only keep the player attributes we use, so pages can be dropped as soon as they're parsed
+    for item in data.get("included", []):
+        if item.get("type") != "new_player":
+            continue
+        info = item.get("attributes", {})
+        players[str(item["id"])] = (info.get("name", "Unknown"), info.get("team", "Unknown"))
 
-    all_records = []
-    for proj in projections:
+    for proj in data.get("data", []):
         attr = proj["attributes"]
         stat_type = attr["stat_type"]
-        line_score = attr["line_score"]
         odds_type = attr.get("odds_type", "none")
 
         if odds_type != "standard" or stat_type not in DESIRED_STATS:
             continue
 
         player_id = str(proj["relationships"]["new_player"]["data"]["id"])
-        player_info = included.get(player_id, {}).get("attributes", {})
-        name = player_info.get("name", "Unknown")
-        team = player_info.get("team", "Unknown")
+        projections.append((player_id, stat_type, attr["line_score"]))
 
+def total_pages(data):
+    meta = data.get("meta", {}) or {}
+    pages = meta.get("total_pages") or meta.get("last_page")
+    return int(pages) if pages else None
+
+def scrape_prizepicks_mlb():
+    players = {}
+    projections = []
+
+    first = fetch_page(1)
+    pages = total_pages(first)
+    next_url = (first.get("links", {}) or {}).get("next")
+    parse_page(first, players, projections)
+    del first
+
+    if pages and pages > 1:
+        # Page count is known up front, pull the rest in parallel
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, pages - 1)) as pool:
+            futures = [pool.submit(fetch_page, page) for page in range(2, pages + 1)]
+            for future in as_completed(futures):
+                parse_page(future.result(), players, projections)
+    else:
+        # No page count in the response, fall back to following the next links
+        while next_url:
+            data = fetch_json("prizepicks", next_url, headers=HEADERS)
+            next_url = (data.get("links", {}) or {}).get("next")
+            parse_page(data, players, projections)
+
+    all_records = []
+    for player_id, stat_type, line_score in projections:
+        name, team = players.get(player_id, ("Unknown", "Unknown"))
         all_records.append({
             "player": name,
             "team": team,
@@ -37,7 +72,7 @@ def scrape_prizepicks_mlb():
             "prizepicks_line": line_score,
         })
 
-    return pd.DataFrame(all_records)
+    return pd.DataFrame(all_records, columns=COLUMNS)
 
 if __name__ == "__main__":
-    print(scrape_prizepicks_mlb())
\ No newline at end of file
+    print(scrape_prizepicks_mlb())
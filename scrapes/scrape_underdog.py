@@ -1,10 +1,15 @@
-import requests
 import pandas as pd
+from scrapes.fetch import fetch_json
+
+COLUMNS = [
+    "player", "stat_type", "line", "over_odds", "under_odds",
+    "payout_multiplier_over", "payout_multiplier_under",
+]
+DESIRED_STATS = ["strikeouts"]
 
 def scrape_underdog_mlb():
     url = "https://api.underdogfantasy.com/beta/v6/over_under_lines?sport_id=mlb"
-    response = requests.get(url)
-    data = response.json()
+    data = fetch_json("underdog", url)
 
     props = []
 
@@ -13,7 +18,7 @@ def scrape_underdog_mlb():
         appearance_stat = over_under.get("appearance_stat", {})
         stat = appearance_stat.get("stat")
 
-        if stat != "strikeouts":
+        if stat not in DESIRED_STATS:
             continue
 
         options = line.get("options", [])
@@ -30,7 +35,9 @@ def scrape_underdog_mlb():
             "payout_multiplier_under": under_option.get("payout_multiplier") if under_option else None,
         })
 
-    df = pd.DataFrame(props)
+    df = pd.DataFrame(props, columns=COLUMNS)
+    # Underdog sends the line as a string; the merged slate does arithmetic on it before any CSV round trip
+    df["line"] = pd.to_numeric(df["line"], errors="coerce")
 
     return df
 
@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import traceback
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+
+import strikeout_dist
+from find_best_lines import calculate_edges, load_slate
+
+"""
+Local HTTP service for the day's slate and picks.
+The slate, features and fitted models stay in memory, and every response is
+rendered to JSON bytes with its ETag when the data changes, not when it's asked
+for. A request is a dict lookup plus a socket write, and a matching
+If-None-Match gets a bodyless 304. Once the TTL runs out the next request
+triggers a refresh on a background thread, and requests keep getting the old
+snapshot until the new one is swapped in. A refresh that finds the same slate
+file and date just renews the TTL.
+
+GET /health
+GET /slate
+GET /picks?strategy=stat|rf|xgb&n=5
+GET /players/<player_id>
+"""
+
+TTL_SECONDS = 60
+HOST = "127.0.0.1"
+PORT = 8765
+STRATEGIES = ("stat", "rf", "xgb")
+MAX_N = 50
+
+
+def _render(obj):
+    body = json.dumps(obj, default=str, separators=(",", ":")).encode()
+    return body, '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+
+
+def _records(df):
+    # NaN -> null, numpy scalars -> plain JSON
+    return json.loads(df.to_json(orient="records"))
+
+
+def slate_path(day):
+    return f"data/mlb_slates/mlb_pitcher_slate_{day}.csv"
+
+
+class Snapshot:
+    # Everything a request can ask for, pre-rendered. Only /picks sizes get added later, each rendered once
+    def __init__(self, day, source, loaded_at):
+        self.day = day
+        self.source = source
+        self.loaded_at = loaded_at
+        self.responses = {}
+        self.ranked = {}
+        self.errors = {}
+
+    def put(self, key, obj):
+        self.responses[key] = _render(obj)
+
+
+class PickCache:
+    def __init__(self, ttl=TTL_SECONDS):
+        self.ttl = ttl
+        self.snapshot = None
+        self.expires = 0.0
+        self.models = {}
+        self.model_day = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def load_models(self, day):
+        # Fitted once per day; the registry only refits when its inputs changed
+        if self.model_day == day:
+            return
+        import predict_strikeouts
+        self.models = {'rf': predict_strikeouts.load_model(day), 'alpha': strikeout_dist.load_dispersion(day)}
+        try:
+            import ml_preds
+            self.models['xgb'], _ = ml_preds.get_model()
+        except Exception:
+            # xgb is optional here; its strategy just reports the error
+            traceback.print_exc()
+        self.model_day = day
+
+    def build(self, day, source):
+        import ml_preds
+        import predict_strikeouts
+
+        self.load_models(day)
+        snap = Snapshot(day, source, datetime.now().isoformat(timespec="seconds"))
+        slate = load_slate(day)
+
+        edges = calculate_edges(slate).dropna(subset=['edge'])
+        snap.ranked['stat'] = edges.sort_values('edge', ascending=False)[
+            ['player_id', 'player_pp', 'team', 'prizepicks_line', 'dk_line', 'line_ud', 'best_bet', 'edge', 'avg_line']
+        ].rename(columns={'player_pp': 'player', 'best_bet': 'pick'})
+
+        # Model picks are ordered like get_top_model's: biggest predicted-minus-line first
+        artifact, feats = self.models['rf']
+        rf = predict_strikeouts.predict(artifact, feats, slate)[['player_id', 'predicted_ks']].drop_duplicates('player_id')
+        projections = slate.merge(rf, on='player_id', how='left')
+        ranked = projections.dropna(subset=['predicted_ks']).assign(edge=lambda d: d['predicted_ks'] - d['prizepicks_line'])
+        ranked['pick'] = np.where(ranked['edge'] > 0, 'OVER', 'UNDER')
+        snap.ranked['rf'] = ranked.sort_values('edge', ascending=False)[
+            ['player_id', 'player_pp', 'team', 'prizepicks_line', 'predicted_ks', 'edge', 'pick']
+        ].rename(columns={'player_pp': 'player'})
+        if 'xgb' in self.models:
+            xgb = ml_preds.predict_slate(self.models['xgb'], day)[['player_id', 'SO_pred']].drop_duplicates('player_id')
+            projections = projections.merge(xgb, on='player_id', how='left')
+            ranked = projections.dropna(subset=['SO_pred']).assign(edge=lambda d: d['SO_pred'] - d['prizepicks_line'])
+            ranked['pick'] = np.where(ranked['edge'] > ml_preds.NO_BET_BAND, 'OVER',
+                                      np.where(ranked['edge'] < -ml_preds.NO_BET_BAND, 'UNDER', 'NO BET'))
+            snap.ranked['xgb'] = ranked.reindex(ranked['edge'].abs().sort_values(ascending=False).index)[
+                ['player_id', 'player_pp', 'team', 'prizepicks_line', 'SO_pred', 'edge', 'pick']
+            ].rename(columns={'player_pp': 'player'})
+        else:
+            snap.errors['xgb'] = "xgb model unavailable"
+
+        snap.put('/health', {'day': day, 'loaded_at': snap.loaded_at, 'props': len(slate),
+                             'strategies': sorted(snap.ranked), 'ttl': self.ttl})
+        snap.put('/slate', {'day': day, 'loaded_at': snap.loaded_at, 'props': _records(slate)})
+        for strategy, ranked in snap.ranked.items():
+            snap.ranked[strategy] = _records(ranked)
+
+        # Every book's line priced off whichever model has a number, xgb first like the README's pick
+        mean_col = 'SO_pred' if 'SO_pred' in projections.columns else 'predicted_ks'
+        priced = strikeout_dist.price_books(projections, mean_col, self.models['alpha'])
+        priced = priced.drop(columns=['player', 'mean']).groupby('player_id')
+        keep = [c for c in ('player_id', 'player_pp', 'team', 'stat_type', 'prizepicks_line', 'dk_line', 'line_ud',
+                            'predicted_ks', 'SO_pred') if c in projections.columns]
+        for row in _records(projections[keep].drop_duplicates('player_id')):
+            pid = row['player_id']
+            lines = _records(priced.get_group(pid).drop(columns='player_id')) if pid in priced.groups else []
+            snap.put(f"/players/{pid}", {'day': day, 'projection': row, 'lines': lines})
+        return snap
+
+    def _source(self, day):
+        path = slate_path(day)
+        return (path, os.path.getmtime(path)) if os.path.exists(path) else None
+
+    def refresh(self):
+        try:
+            day = date.today().isoformat()
+            source = self._source(day)
+            current = self.snapshot
+            if source is None:
+                print(f"No slate for {day} yet")
+            elif current is None or (current.day, current.source) != (day, source):
+                self.snapshot = self.build(day, source)
+                print(f"Loaded {day} slate at {self.snapshot.loaded_at}")
+        except Exception:
+            # Keep serving the last good snapshot
+            traceback.print_exc()
+        finally:
+            self.expires = time.monotonic() + self.ttl
+            self._refreshing = False
+
+    def get(self):
+        # Stale-while-revalidate: only the very first load makes a request wait
+        if self.snapshot is None:
+            with self._lock:
+                if self.snapshot is None:
+                    self.refresh()
+        elif time.monotonic() > self.expires:
+            with self._lock:
+                start = not self._refreshing
+                self._refreshing = True
+            if start:
+                threading.Thread(target=self.refresh, daemon=True).start()
+        return self.snapshot
+
+    def respond(self, path, query):
+        # -> (status, body, etag)
+        snap = self.get()
+        if snap is None:
+            return (503, *_render({'error': 'no slate loaded yet'}))
+        if path in snap.responses:
+            return (200, *snap.responses[path])
+        if path == '/picks':
+            strategy = query.get('strategy', ['stat'])[0]
+            try:
+                n = min(int(query.get('n', ['5'])[0]), MAX_N)
+            except ValueError:
+                return (400, *_render({'error': 'n must be an integer'}))
+            if strategy not in snap.ranked:
+                error = snap.errors.get(strategy, f"unknown strategy, one of {', '.join(STRATEGIES)}")
+                return (404, *_render({'error': error}))
+            # Each (strategy, n) is rendered once per snapshot
+            key = f"/picks?strategy={strategy}&n={n}"
+            if key not in snap.responses:
+                snap.put(key, {'day': snap.day, 'strategy': strategy, 'picks': snap.ranked[strategy][:n]})
+            return (200, *snap.responses[key])
+        if path.startswith('/players/'):
+            return (404, *_render({'error': 'player not on today\'s slate'}))
+        return (404, *_render({'error': 'not found'}))
+
+
+def make_handler(cache):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            status, body, etag = cache.respond(url.path.rstrip('/') or '/', parse_qs(url.query))
+            if status == 200 and self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', f'max-age={cache.ttl}')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Pollers hit this every few seconds, keep the console for refreshes and errors
+            pass
+
+    return Handler
+
+
+def serve(host=HOST, port=PORT, ttl=TTL_SECONDS):
+    cache = PickCache(ttl)
+    cache.get()
+    server = ThreadingHTTPServer((host, port), make_handler(cache))
+    print(f"Serving picks on http://{host}:{port} (refresh every {ttl}s), Ctrl-C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopped")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve()
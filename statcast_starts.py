@@ -0,0 +1,218 @@
+import os
+import shutil
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import requests
+
+import pitching_logs
+
+"""
+Pitch-level Statcast boiled down to one row per pitcher per game.
+Pitches are pulled a few days at a time. Each chunk is cut to the columns we use
+and downcast, then reduced to per-appearance counts (called strikes, whiffs and
+swings per pitch group, fastball velocity sums) before the next chunk is fetched.
+Only those counts are written, one Parquet partition per game date under
+data/statcast/starts, so a season never sits in memory as pitches. Counts rather
+than rates are stored so any window of starts can be rolled up exactly.
+`form` turns the last few starts before a date into CSW%, whiff% by pitch group
+and a velocity trend.
+"""
+
+STARTS_DIR = "data/statcast/starts"
+CHUNK_DAYS = 3
+PITCH_COLUMNS = {
+    'pitcher': 'int32', 'game_pk': 'int32', 'game_date': 'str', 'inning_topbot': 'category',
+    'at_bat_number': 'int16', 'pitch_number': 'int16', 'pitch_type': 'category',
+    'description': 'category', 'events': 'category', 'release_speed': 'float32',
+}
+PITCH_GROUPS = {
+    'fastball': ['FF', 'FA', 'SI', 'FC'],
+    'breaking': ['SL', 'ST', 'SV', 'CU', 'KC', 'CS', 'KN', 'SC'],
+    'offspeed': ['CH', 'FS', 'FO', 'EP'],
+}
+# Fastball velocity is tracked on four-seamers and sinkers only, cutters sit a few mph lower
+VELO_TYPES = ['FF', 'SI']
+CALLED = {'called_strike'}
+WHIFFS = {'swinging_strike', 'swinging_strike_blocked', 'foul_tip', 'missed_bunt'}
+SWINGS = WHIFFS | {'foul', 'foul_bunt', 'hit_into_play', 'bunt_foul_tip'}
+STRIKEOUTS = {'strikeout', 'strikeout_double_play'}
+SCHEMA = pa.schema(
+    [("pitcher", pa.int32()), ("game_pk", pa.int32()), ("starter", pa.bool_()),
+     ("pitches", pa.int16()), ("batters", pa.int16()), ("strikeouts", pa.int16()),
+     ("called", pa.int16()), ("whiffs", pa.int16()), ("swings", pa.int16())]
+    + [(f"{kind}_{g}", pa.int16()) for g in PITCH_GROUPS for kind in ("pitches", "whiffs", "swings")]
+    + [("fb_velo_sum", pa.float32()), ("fb_velo_n", pa.int16())]
+)
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+FORM_STARTS = 5
+
+
+def fetch_chunk(start, end):
+    from pybaseball import statcast
+    return statcast(start_dt=start, end_dt=end, verbose=False)
+
+
+def slim(pitches):
+    # Only the columns aggregate() reads, in the smallest types that hold them
+    pitches = pitches[list(PITCH_COLUMNS)].dropna(subset=['pitcher', 'game_pk'])
+    out = {}
+    for col, dtype in PITCH_COLUMNS.items():
+        if dtype == 'str':
+            out[col] = pd.to_datetime(pitches[col]).dt.strftime('%Y-%m-%d')
+        elif dtype.startswith('int'):
+            out[col] = pd.to_numeric(pitches[col], errors='coerce').fillna(0).astype(dtype)
+        else:
+            out[col] = pitches[col].astype(dtype)
+    return pd.DataFrame(out)
+
+
+def aggregate(pitches):
+    # One row per (game_date, pitcher, game_pk) of summed counts
+    if pitches.empty:
+        return pd.DataFrame(columns=['date'] + SCHEMA.names)
+    desc = pitches['description'].astype(str)
+    ptype = pitches['pitch_type'].astype(str)
+    events = pitches['events'].astype(str)
+    counts = pd.DataFrame({
+        'date': pitches['game_date'].to_numpy(),
+        'pitcher': pitches['pitcher'].to_numpy(),
+        'game_pk': pitches['game_pk'].to_numpy(),
+        'pitches': 1,
+        # The last pitch of a plate appearance carries its event
+        'batters': pitches['events'].notna().to_numpy().astype(np.int16),
+        'strikeouts': events.isin(STRIKEOUTS).to_numpy().astype(np.int16),
+        'called': desc.isin(CALLED).to_numpy().astype(np.int16),
+        'whiffs': desc.isin(WHIFFS).to_numpy().astype(np.int16),
+        'swings': desc.isin(SWINGS).to_numpy().astype(np.int16),
+    })
+    for group, types in PITCH_GROUPS.items():
+        in_group = ptype.isin(types).to_numpy()
+        counts[f'pitches_{group}'] = in_group.astype(np.int16)
+        counts[f'whiffs_{group}'] = (in_group & counts['whiffs'].astype(bool)).astype(np.int16)
+        counts[f'swings_{group}'] = (in_group & counts['swings'].astype(bool)).astype(np.int16)
+    velo = pitches['release_speed'].where(ptype.isin(VELO_TYPES).to_numpy())
+    counts['fb_velo_sum'] = velo.fillna(0).to_numpy(dtype=np.float32)
+    counts['fb_velo_n'] = velo.notna().to_numpy().astype(np.int16)
+
+    starts = counts.groupby(['date', 'pitcher', 'game_pk'], sort=False).sum().reset_index()
+    # The starter threw the first pitch of their side's half innings
+    first = pitches.sort_values(['at_bat_number', 'pitch_number']).drop_duplicates(['game_pk', 'inning_topbot'])
+    opened = set(zip(first['game_pk'], first['pitcher']))
+    starts['starter'] = [(g, p) in opened for g, p in zip(starts['game_pk'], starts['pitcher'])]
+    return starts
+
+
+def write_day(starts, day):
+    path = os.path.join(STARTS_DIR, f"date={day}")
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    table = pa.Table.from_pandas(starts[SCHEMA.names], schema=SCHEMA, preserve_index=False)
+    pq.write_table(table, os.path.join(path, "part-0.parquet"))
+
+
+def stored_dates():
+    if not os.path.isdir(STARTS_DIR):
+        return set()
+    return {d[len("date="):] for d in os.listdir(STARTS_DIR) if d.startswith("date=")}
+
+
+def _chunks(days, size):
+    # Runs of at most `size` consecutive days, so a request never spans a gap like the off-season
+    chunk = []
+    for day in days:
+        if chunk and (len(chunk) == size or
+                      pitching_logs._to_date(day) - pitching_logs._to_date(chunk[-1]) != timedelta(days=1)):
+            yield chunk
+            chunk = []
+        chunk.append(day)
+    if chunk:
+        yield chunk
+
+
+def ingest(start, end=None, chunk_days=CHUNK_DAYS):
+    # Fetch -> slim -> aggregate -> write, one chunk at a time; finished days already on disk are skipped
+    from pybaseball.statcast import StatcastException
+
+    end = end or (date.today() - timedelta(days=1)).isoformat()
+    have = stored_dates()
+    # Off-season days are never asked for, Savant has nothing for them
+    missing = [d for d in pitching_logs.date_range(start, end)
+               if d not in have and d < date.today().isoformat() and pitching_logs.in_season(d)]
+    written = 0
+    for days in _chunks(missing, chunk_days):
+        try:
+            pitches = fetch_chunk(days[0], days[-1])
+        except (requests.RequestException, StatcastException) as e:
+            # Network trouble or a Savant error, the days stay missing and the next run retries them
+            print(f"Failed to fetch Statcast {days[0]} to {days[-1]}: {e}")
+            continue
+        if pitches is None or pitches.empty:
+            # Savant sends back a frame with no columns at all when nothing was played
+            starts = aggregate(pd.DataFrame(columns=list(PITCH_COLUMNS)))
+        elif not set(PITCH_COLUMNS) <= set(pitches.columns):
+            print(f"Statcast {days[0]} to {days[-1]} is missing {sorted(set(PITCH_COLUMNS) - set(pitches.columns))}, skipped")
+            continue
+        else:
+            starts = aggregate(slim(pitches))
+        del pitches
+        by_day = dict(tuple(starts.groupby('date'))) if not starts.empty else {}
+        for day in days:
+            # Days without games still get an empty partition, so they aren't asked for again
+            write_day(by_day.get(day, starts.iloc[0:0]), day)
+            if day in by_day:
+                written += len(by_day[day])
+        print(f"Statcast {days[0]} to {days[-1]}: {sum(len(by_day.get(d, [])) for d in days)} appearances")
+    return written
+
+
+def load(start=None, end=None, pitchers=None, starters_only=True):
+    if not os.path.isdir(STARTS_DIR):
+        return pd.DataFrame(columns=['date'] + SCHEMA.names)
+    expr = ds.field("starter") if starters_only else None
+    for e in ((ds.field("date") >= str(start)) if start else None,
+              (ds.field("date") <= str(end)) if end else None,
+              ds.field("pitcher").isin([int(p) for p in pitchers]) if pitchers is not None else None):
+        if e is not None:
+            expr = e if expr is None else expr & e
+    dataset = ds.dataset(STARTS_DIR, format="parquet", partitioning=PARTITIONING)
+    return dataset.to_table(filter=expr).to_pandas()
+
+
+def form(as_of=None, starts=FORM_STARTS, history=None):
+    # Per pitcher (player_id), rates over their last `starts` starts before `as_of`.
+    # `history` is a load() frame to cut from instead of reading the store, for callers stepping through days.
+    as_of = str(as_of or date.today().isoformat())
+    if history is None:
+        history = load(end=(pitching_logs._to_date(as_of) - timedelta(days=1)).isoformat())
+    else:
+        history = history[history['date'] < as_of]
+    if history.empty:
+        return pd.DataFrame({'player_id': pd.Series(dtype='int64')})
+    history = history.sort_values(['pitcher', 'date'])
+    recent = history.groupby('pitcher').tail(starts)
+    sums = recent.drop(columns=['date', 'game_pk', 'starter']).groupby('pitcher').sum()
+
+    out = pd.DataFrame(index=sums.index)
+    out['sc_starts'] = recent.groupby('pitcher').size()
+    out['sc_csw'] = (sums['called'] + sums['whiffs']) / sums['pitches']
+    out['sc_whiff'] = sums['whiffs'] / sums['swings'].replace(0, np.nan)
+    out['sc_k_rate'] = sums['strikeouts'] / sums['batters'].replace(0, np.nan)
+    for group in PITCH_GROUPS:
+        out[f'sc_whiff_{group}'] = sums[f'whiffs_{group}'] / sums[f'swings_{group}'].replace(0, np.nan)
+        out[f'sc_usage_{group}'] = sums[f'pitches_{group}'] / sums['pitches']
+    out['sc_fb_velo'] = sums['fb_velo_sum'] / sums['fb_velo_n'].replace(0, np.nan)
+
+    # Velocity trend: least-squares slope of per-start fastball velo over those starts, mph per start
+    recent = recent.assign(velo=recent['fb_velo_sum'] / recent['fb_velo_n'].replace(0, np.nan),
+                           n=recent.groupby('pitcher').cumcount())
+    recent = recent.dropna(subset=['velo'])
+    g = recent.groupby('pitcher')
+    x_mean, y_mean = g['n'].transform('mean'), g['velo'].transform('mean')
+    cov = ((recent['n'] - x_mean) * (recent['velo'] - y_mean)).groupby(recent['pitcher']).sum()
+    var = ((recent['n'] - x_mean) ** 2).groupby(recent['pitcher']).sum()
+    out['sc_velo_trend'] = cov / var.replace(0, np.nan)
+    return out.rename_axis('player_id').reset_index()
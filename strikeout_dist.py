@@ -0,0 +1,129 @@
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+
+import pitching_logs
+from feature_store import HISTORY_START
+from find_best_lines import add_parsed_odds, implied_prob, parse_odds
+
+"""
+Strikeout distributions on top of the point models.
+A start's strikeouts are negative binomial around the model's prediction
+(SO_pred / predicted_ks), with the overdispersion fitted from how much
+pitchers' per-start totals vary around their own average in the daily logs.
+`side_probs` takes one mean per pitcher and any number of lines per pitcher and
+returns P(over)/P(under) for all of them from one CDF table, so every book's
+line is priced in the same call.
+"""
+
+# Strikeouts in a start never get near this, it's just the width of the CDF table
+MAX_K = 30
+# Pitchers need this many starts in the window to say anything about spread
+MIN_STARTS = 3
+DISPERSION_DAYS = 365
+# book -> (line column, over odds column, under odds column)
+BOOK_LINES = {
+    'prizepicks': ('prizepicks_line', None, None),
+    'draftkings': ('dk_line', 'dk_over_odds', 'dk_under_odds'),
+    'underdog': ('line_ud', 'over_odds_ud_am', 'under_odds_ud_am'),
+}
+# book -> no-vig P(over), P(under) columns, where the book priced both sides
+BOOK_FAIR = {
+    'draftkings': ('dk_fair_over', 'dk_fair_under'),
+    'underdog': ('ud_fair_over', 'ud_fair_under'),
+}
+
+
+def fit_dispersion(logs):
+    # Method of moments: Var = mu + alpha * mu^2 per pitcher, pooled with n - 1 weights.
+    # 0 means no overdispersion (Poisson).
+    logs = logs[pd.to_numeric(logs['GS'], errors='coerce') > 0].dropna(subset=['mlbID'])
+    so = pd.to_numeric(logs['SO'], errors='coerce')
+    per = so.groupby(logs['mlbID'].astype(int)).agg(['count', 'mean', 'var'])
+    per = per[per['count'] >= MIN_STARTS]
+    if per.empty:
+        return 0.0
+    w = per['count'] - 1
+    alpha = (w * (per['var'] - per['mean'])).sum() / (w * per['mean'] ** 2).sum()
+    return float(max(alpha, 0.0))
+
+
+def load_dispersion(as_of=None):
+    # Fitted on the year of daily logs before `as_of`
+    end = pitching_logs._to_date(as_of or date.today())
+    start = max(pitching_logs._to_date(HISTORY_START), end - timedelta(days=DISPERSION_DAYS))
+    return fit_dispersion(pitching_logs.load_days(start, end - timedelta(days=1)))
+
+
+def cdf_table(mean, alpha=0.0):
+    # P(K <= k) for k = 0..MAX_K, one row per mean
+    mean = np.asarray(mean, dtype=float)[:, None]
+    k = np.arange(1, MAX_K + 1)
+    if alpha > 0:
+        r = 1 / alpha
+        p0 = np.exp(-r * np.log1p(mean * alpha))
+        steps = (k - 1 + r) / k * (mean / (r + mean))
+    else:
+        p0 = np.exp(-mean)
+        steps = mean / k
+    pmf = np.concatenate([p0, p0 * np.cumprod(steps, axis=1)], axis=1)
+    return np.minimum(np.cumsum(pmf, axis=1), 1.0)
+
+
+def side_probs(mean, lines, alpha=0.0):
+    # mean: (n,), lines: (n,) or (n, m) with NaN where a book has no line -> P(over), P(under), same shape as lines
+    lines = np.asarray(lines, dtype=float)
+    flat = lines.ndim == 1
+    lines = lines[:, None] if flat else lines
+    cdf = np.concatenate([np.zeros((len(lines), 1)), cdf_table(mean, alpha)], axis=1)
+    missing = np.isnan(lines)
+    filled = np.where(missing, 0, lines)
+    # cdf[:, k + 1] is P(K <= k), column 0 is P(K <= -1)
+    at_or_below = np.take_along_axis(cdf, np.clip(np.floor(filled), -1, MAX_K).astype(int) + 1, axis=1)
+    below = np.take_along_axis(cdf, np.clip(np.ceil(filled) - 1, -1, MAX_K).astype(int) + 1, axis=1)
+    over = np.where(missing, np.nan, 1 - at_or_below)
+    under = np.where(missing, np.nan, below)
+    return (over[:, 0], under[:, 0]) if flat else (over, under)
+
+
+def price_books(slate, mean_col, alpha=0.0):
+    # One row per (pitcher, book) line: model P(over)/P(under) next to the book's implied probability
+    slate = add_parsed_odds(slate.dropna(subset=[mean_col]).copy())
+    books = [b for b, (line_col, _, _) in BOOK_LINES.items() if line_col in slate.columns]
+    lines = np.column_stack([pd.to_numeric(slate[BOOK_LINES[b][0]], errors='coerce') for b in books])
+    p_over, p_under = side_probs(slate[mean_col].to_numpy(dtype=float), lines, alpha)
+
+    def column(col, parse=False):
+        if col is None or col not in slate.columns:
+            return np.full(len(slate), np.nan)
+        return parse_odds(slate[col]) if parse else pd.to_numeric(slate[col], errors='coerce').to_numpy(dtype=float)
+
+    dk_side = slate['dk_label'].astype(str).str.upper().to_numpy() if 'dk_label' in slate.columns else np.full(len(slate), '')
+    frames = []
+    for i, book in enumerate(books):
+        _, over_col, under_col = BOOK_LINES[book]
+        over_odds, under_odds = column(over_col, parse=True), column(under_col, parse=True)
+        if book == 'draftkings':
+            # Older slates only carry the side in dk_label
+            over_odds = np.where(np.isnan(over_odds) & (dk_side == 'OVER'), slate['dk_odds_am'], over_odds)
+            under_odds = np.where(np.isnan(under_odds) & (dk_side == 'UNDER'), slate['dk_odds_am'], under_odds)
+        fair_over, fair_under = (column(c) for c in BOOK_FAIR.get(book, (None, None)))
+        frames.append(pd.DataFrame({
+            'player_id': slate['player_id'].to_numpy(),
+            'player': slate['player_pp'].to_numpy(),
+            'book': book,
+            'line': lines[:, i],
+            'mean': slate[mean_col].to_numpy(dtype=float),
+            'p_over': p_over[:, i],
+            'p_under': p_under[:, i],
+            'implied_over': implied_prob(over_odds),
+            'implied_under': implied_prob(under_odds),
+            'fair_over': fair_over,
+            'fair_under': fair_under,
+        }))
+    out = pd.concat(frames, ignore_index=True).dropna(subset=['line'])
+    # Edge against the no-vig probability so the book's hold isn't counted against the model;
+    # a side priced alone has nothing to de-vig against and falls back to its implied probability
+    out['edge_over'] = out['p_over'] - out['fair_over'].fillna(out['implied_over'])
+    out['edge_under'] = out['p_under'] - out['fair_under'].fillna(out['implied_under'])
+    return out.sort_values(['player', 'book'], ignore_index=True)
@@ -0,0 +1,294 @@
+import hashlib
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+
+import feature_store
+import ml_preds
+import model_registry
+import pitching_logs
+import predict_strikeouts
+import rolling_features
+import statcast_starts
+
+"""
+Walk-forward hyperparameter search for the strikeout models.
+Each fold is fit the way the model is fit in production: its own train_model on
+the feature table as it stood the morning of the fold's first test day
+(feature_store.features_as_of), one row per pitcher with the model's own
+target. It's then scored on what the predictions are used for, the strikeouts
+each pitcher actually threw in the starts of the following block of days, with
+the features from the morning of each start. Test rows are cached in one .npz
+sorted by date and each fold's training table in its own, so nothing is rebuilt
+between configs and nothing from the future leaks into training.
+
+Configs are raced with successive halving: all of them are scored on the most
+recent folds, the worst two thirds are dropped, and the rest move on to more
+folds. Every (config, fold) fit is its own task on a process pool. The winner
+and its out-of-sample error go into model_config.json through
+model_registry.save_tuned, which the models read their params from.
+"""
+
+CACHE_DIR = "data/tuning"
+COLUMNS = list(dict.fromkeys(ml_preds.FEATURES + predict_strikeouts.FEATURE_COLS + ['l30_SO_avg']))
+# Training tables also carry the production targets
+TRAIN_COLUMNS = list(dict.fromkeys(COLUMNS + [ml_preds.TARGET, predict_strikeouts.TARGET]))
+MODELS = {
+    'xgb': {
+        'name': 'xgb_strikeouts', 'features': ml_preds.FEATURES, 'complete_rows': True,
+        'defaults': {'n_estimators': 100, 'learning_rate': 0.05},
+        'grid': {
+            'n_estimators': [50, 100, 200, 400],
+            'learning_rate': [0.02, 0.05, 0.1],
+            'max_depth': [2, 3, 4, 6],
+            'min_child_weight': [1, 5, 20],
+            'subsample': [0.7, 1.0],
+            'colsample_bytree': [0.7, 1.0],
+        },
+    },
+    'rf': {
+        'name': 'rf_strikeouts', 'features': predict_strikeouts.FEATURE_COLS, 'complete_rows': False,
+        'defaults': {'n_estimators': 100, 'random_state': 42},
+        'grid': {
+            'n_estimators': [100, 300],
+            'max_depth': [None, 6, 10],
+            'min_samples_leaf': [1, 3, 5, 10],
+            'max_features': [1.0, 0.5, 'sqrt'],
+        },
+    },
+}
+FOLDS = 6
+TEST_DAYS = 14
+# Configs kept per halving round is 1 / ETA of those raced
+ETA = 3
+# Fits need this many complete training rows, like backtest's refits
+MIN_TRAIN_ROWS = 10
+
+# Per-process copy of the logs (panel building) or the panel and training tables (fitting), set by the initializers
+_logs = None
+_statcast = None
+_rolling = None
+_starts = None
+_panel = None
+_train = None
+
+
+# --- panel --------------------------------------------------------------------
+
+def _init_builder(start, end):
+    global _logs, _statcast, _rolling, _starts
+    _logs = pitching_logs.load_days(feature_store.HISTORY_START, end)
+    _statcast = pd.read_csv(feature_store.STATCAST_PATH)
+    _starts = statcast_starts.load(end=end)
+    # Days reach a worker in increasing order, so its rolling state only ever moves forward
+    _rolling = rolling_features.RollingState()
+
+
+def day_rows(day):
+    # That day's starters: features from the morning, strikeouts from the box score
+    starts = _logs[(_logs['date'] == day) & (pd.to_numeric(_logs['GS'], errors='coerce') > 0)].dropna(subset=['mlbID'])
+    if starts.empty or not (_logs['date'] < day).any():
+        return None
+    y = pd.DataFrame({'player_id': starts['mlbID'].astype(int).to_numpy(),
+                      'SO': pd.to_numeric(starts['SO'], errors='coerce').to_numpy()}).dropna()
+    feats = feature_store.features_as_of(day, _logs, _statcast, _rolling, _starts)
+    rows = y.merge(feats.reindex(columns=['player_id'] + COLUMNS), on='player_id', how='left')
+    return rows.assign(day=date.fromisoformat(day).toordinal())
+
+
+def _digest(start, end):
+    # Stored daily files (name, size, mtime) plus the Savant table; any change rebuilds the panel
+    h = hashlib.sha256()
+    for day in pitching_logs.date_range(feature_store.HISTORY_START, end):
+        path = pitching_logs.day_path(day)
+        if os.path.exists(path):
+            st = os.stat(path)
+            h.update(f"{day}:{st.st_size}:{st.st_mtime_ns}".encode())
+    h.update(model_registry.file_digest(feature_store.STATCAST_PATH).encode())
+    h.update(",".join(COLUMNS).encode())
+    return h.hexdigest()[:16]
+
+
+def _cached(path, digest):
+    if os.path.exists(path):
+        with np.load(path) as cached:
+            return str(cached['digest']) == digest
+    return False
+
+
+def build_panel(start, end, workers=None):
+    # Test rows, one per start. Cached per (start, end); rebuilt only when the logs or Savant file change
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, f"panel_{start}_{end}.npz")
+    digest = _digest(start, end)
+    if _cached(path, digest):
+        return path
+
+    days = pitching_logs.date_range(start, end)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_builder, initargs=(start, end)) as pool:
+        frames = [f for f in pool.map(day_rows, days, chunksize=8) if f is not None]
+    if not frames:
+        raise ValueError(f"No starts with prior history between {start} and {end}")
+    panel = pd.concat(frames, ignore_index=True).sort_values('day', kind='stable')
+    np.savez(path, X=panel[COLUMNS].to_numpy(dtype=np.float32), y=panel['SO'].to_numpy(dtype=np.float32),
+             day=panel['day'].to_numpy(dtype=np.int64), columns=np.array(COLUMNS), digest=np.array(digest))
+    print(f"Built {len(panel)} starts over {panel['day'].nunique()} days into {path}")
+    return path
+
+
+def build_training(cutoffs, end):
+    # The feature table each fold trains on: what feature_store held the morning of its first test day
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    digest = _digest(feature_store.HISTORY_START, end)
+    paths = {c: os.path.join(CACHE_DIR, f"train_{date.fromordinal(c).isoformat()}.npz") for c in cutoffs}
+    todo = sorted(c for c, path in paths.items() if not _cached(path, digest))
+    if todo:
+        _init_builder(feature_store.HISTORY_START, end)
+        for cutoff in todo:
+            feats = feature_store.features_as_of(date.fromordinal(cutoff).isoformat(), _logs, _statcast, _rolling, _starts)
+            feats = feats.reindex(columns=TRAIN_COLUMNS)
+            np.savez(paths[cutoff], X=feats.to_numpy(dtype=np.float32), columns=np.array(TRAIN_COLUMNS),
+                     digest=np.array(digest))
+    return paths
+
+
+def walk_forward(day, folds=FOLDS, test_days=TEST_DAYS):
+    # (cutoff, test_start, test_stop), most recent fold first. Rows are sorted by day, so a fold
+    # tests on rows[test_start:test_stop] and trains on the feature table as of `cutoff`, its first test day.
+    unique = np.unique(day)
+    out = []
+    for k in range(folds):
+        hi = len(unique) - k * test_days
+        lo = hi - test_days
+        if lo < test_days:
+            break
+        out.append((int(unique[lo]), int(np.searchsorted(day, unique[lo])),
+                    int(np.searchsorted(day, unique[hi - 1], side='right'))))
+    return out
+
+
+# --- fitting ------------------------------------------------------------------
+
+def _init_fitter(path, train_paths):
+    global _panel, _train
+    with np.load(path) as data:
+        _panel = {key: data[key] for key in ('X', 'y', 'day', 'columns')}
+    _train = {}
+    for cutoff, train_path in train_paths.items():
+        with np.load(train_path) as data:
+            _train[cutoff] = pd.DataFrame(data['X'], columns=list(data['columns']))
+
+
+def _test_rows(model, rows):
+    columns = list(_panel['columns'])
+    X = pd.DataFrame(_panel['X'][rows], columns=columns)[MODELS[model]['features']]
+    y = _panel['y'][rows]
+    if MODELS[model]['complete_rows']:
+        # Same as prediction time: ml_preds only scores pitchers with every feature
+        keep = X.notna().all(axis=1).to_numpy()
+        X, y = X[keep], y[keep]
+    return X, y
+
+
+def fit_fold(model, params, fold):
+    # -> (sum of squared errors, test rows)
+    cutoff, test_start, test_stop = fold
+    train = _train[cutoff]
+    X_test, y_test = _test_rows(model, slice(test_start, test_stop))
+    # One thread per fit, the pool already runs one fit per core
+    params = {**params, 'n_jobs': 1}
+
+    if model == 'xgb':
+        if train.dropna(subset=ml_preds.FEATURES + [ml_preds.TARGET]).shape[0] < MIN_TRAIN_ROWS or len(y_test) == 0:
+            return 0.0, 0
+        reg, _ = ml_preds.train_model(train, params)
+        pred = reg.predict(X_test)
+    else:
+        if train[predict_strikeouts.TARGET].notna().sum() < MIN_TRAIN_ROWS or len(y_test) == 0:
+            return 0.0, 0
+        artifact, _ = predict_strikeouts.train_model(train, params)
+        pred = artifact['model'].predict(X_test.fillna(artifact['fill']))
+    return float(((pred - y_test) ** 2).sum()), len(y_test)
+
+
+def configs(model, limit=None, seed=0):
+    grid = MODELS[model]['grid']
+    combos = [{**MODELS[model]['defaults'], **dict(zip(grid, values))} for values in itertools.product(*grid.values())]
+    if limit and limit < len(combos):
+        rng = np.random.default_rng(seed)
+        combos = [combos[i] for i in sorted(rng.choice(len(combos), limit, replace=False))]
+    return combos
+
+
+def race(model, candidates, folds, pool):
+    # Successive halving over folds; returns one row per (config, fold) scored
+    scores = {}
+    alive = list(range(len(candidates)))
+    rungs = sorted({min(len(folds), ETA ** r) for r in range(int(math.log(len(folds), ETA)) + 2)})
+    for used in rungs:
+        tasks = [(c, f) for c in alive for f in range(used) if (c, f) not in scores]
+        results = pool.map(fit_fold, [model] * len(tasks), [candidates[c] for c, _ in tasks], [folds[f] for _, f in tasks])
+        scores.update(zip(tasks, results))
+
+        rmse = {c: _rmse([scores[(c, f)] for f in range(used)]) for c in alive}
+        alive = sorted(alive, key=rmse.get)
+        if used < len(folds):
+            alive = alive[:max(1, math.ceil(len(alive) / ETA))]
+        print(f"  {model}: {len(tasks)} fits on {used} fold(s), best rmse {rmse[alive[0]]:.3f}, {len(alive)} left")
+    return scores, alive[0]
+
+
+def _rmse(results):
+    sse = sum(r[0] for r in results)
+    n = sum(r[1] for r in results)
+    return math.sqrt(sse / n) if n else math.inf
+
+
+def baseline_rmse(folds):
+    # Each pitcher's last-30-day strikeouts per game, the number a model has to beat
+    col = list(_panel['columns']).index('l30_SO_avg')
+    sse, n = 0.0, 0
+    for _, test_start, test_stop in folds:
+        pred = _panel['X'][test_start:test_stop, col]
+        y = _panel['y'][test_start:test_stop]
+        pred = np.where(np.isnan(pred), np.nanmean(_panel['y'][:test_start]), pred)
+        sse, n = sse + float(((pred - y) ** 2).sum()), n + len(y)
+    return math.sqrt(sse / n) if n else math.inf
+
+
+def tune(models=('xgb', 'rf'), start=None, end=None, folds=FOLDS, test_days=TEST_DAYS, limit=None,
+         workers=None, write=True):
+    end = end or (date.today() - timedelta(days=1)).isoformat()
+    start = start or feature_store.HISTORY_START
+    path = build_panel(start, end, workers)
+    with np.load(path) as data:
+        splits = walk_forward(data['day'], folds, test_days)
+    if not splits:
+        raise ValueError(f"Not enough days for a {test_days}-day test fold")
+    train_paths = build_training([cutoff for cutoff, _, _ in splits], end)
+    _init_fitter(path, train_paths)
+    print(f"{len(_panel['y'])} starts, {len(splits)} folds of {test_days} days")
+
+    winners = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_fitter, initargs=(path, train_paths)) as pool:
+        for model in models:
+            candidates = configs(model, limit)
+            scores, best = race(model, candidates, splits, pool)
+            results = [scores[(best, f)] for f in range(len(splits))]
+            params = dict(candidates[best])
+            cv = {
+                'rmse': round(_rmse(results), 4),
+                'baseline_rmse': round(baseline_rmse(splits), 4),
+                'target': 'per-start SO, fit on the production training table as of each fold',
+                'folds': len(splits), 'test_days': test_days, 'window': [start, end],
+                'starts': int(sum(r[1] for r in results)), 'configs': len(candidates),
+            }
+            winners[model] = {'params': params, 'cv': cv}
+            print(f"{MODELS[model]['name']}: {params} rmse {cv['rmse']} (l30 baseline {cv['baseline_rmse']})")
+            if write:
+                model_registry.save_tuned(MODELS[model]['name'], params, cv)
+    return winners